@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Times parsing and serializing large YAML and XML request bodies
+
+Each body is parsed as the template parser used to (trying JSON, then XML,
+then YAML with the pure Python loader) and as it does now, going by the
+Content-Type of the template. YAML bodies are serialized, as each fuzz case
+is, with the pure Python dumper and with the one used now (the C dumper, if
+PyYAML was built with libyaml).
+
+Usage: python scripts/body_bench.py [number of items] [repeats]
+"""
+import json
+import sys
+import timeit
+import xml.etree.ElementTree as ElementTree
+
+import yaml
+
+from syntribos.clients.http.parser import RequestCreator
+from syntribos.clients.http.parser import RequestHelperMixin
+
+
+def make_body(num_items):
+    return {"servers": [
+        {"name": "server-{0}".format(i), "flavor": i % 8,
+         "metadata": {"key": "value {0}".format(i), "tags": ["a", "b"]},
+         "networks": [{"uuid": "net-{0}".format(i), "fixed_ip": "10.0.0.1"}]}
+        for i in range(num_items)]}
+
+
+def to_xml(body):
+    root = ElementTree.Element("servers")
+    for server in body["servers"]:
+        ele = ElementTree.SubElement(root, "server", name=server["name"])
+        for key, value in server["metadata"].items():
+            ElementTree.SubElement(ele, "meta", key=key).text = str(value)
+        for net in server["networks"]:
+            ElementTree.SubElement(ele, "network", uuid=net["uuid"])
+    return ElementTree.tostring(root).decode()
+
+
+def sniff(data):
+    """Parses a body as RequestCreator._parse_data did before"""
+    try:
+        return json.loads(data), "json"
+    except ValueError:
+        pass
+    try:
+        return ElementTree.fromstring(data), "xml"
+    except Exception:
+        pass
+    return yaml.safe_load(data), "yaml"
+
+
+def report(name, before, after):
+    print("{0:<16} {1:>9.4f}s {2:>9.4f}s {3:>7.1f}x".format(
+        name, before, after, before / after))
+
+
+def main(num_items=2000, repeats=5):
+    body = make_body(num_items)
+    yaml_data = yaml.dump(body, default_flow_style=False)
+    xml_data = to_xml(body)
+    print("YAML body: {0} bytes, XML body: {1} bytes".format(
+        len(yaml_data), len(xml_data)))
+    print("PyYAML built with libyaml: {0}".format(
+        getattr(yaml, "__with_libyaml__", False)))
+    print("{0:<16} {1:>10} {2:>10} {3:>8}".format(
+        "", "before", "after", "gain"))
+
+    def best(func):
+        return min(timeit.repeat(func, number=1, repeat=repeats))
+
+    yaml_lines = yaml_data.splitlines()
+    report("parse yaml",
+           best(lambda: sniff(yaml_data)),
+           best(lambda: RequestCreator._parse_data(
+               yaml_lines, "application/yaml")))
+    xml_lines = xml_data.splitlines()
+    report("parse xml",
+           best(lambda: sniff(xml_data)),
+           best(lambda: RequestCreator._parse_data(
+               xml_lines, "application/xml")))
+    report("serialize yaml",
+           best(lambda: yaml.dump(body)),
+           best(lambda: RequestHelperMixin._string_data(body, "yaml")))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
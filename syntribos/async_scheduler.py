@@ -0,0 +1,164 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Scheduler for the "asyncio" HTTP engine (Python 3 only)"""
+import asyncio
+from concurrent import futures
+import logging
+import threading
+
+from syntribos.clients.http.async_client import AsyncHTTPTransport
+from syntribos.clients.http.async_client import AsyncSynHTTPClient
+
+try:
+    import contextvars
+except ImportError:
+    contextvars = None
+
+LOG = logging.getLogger(__name__)
+
+
+class AsyncScheduler(object):
+    """Sends test requests from an event loop instead of worker threads
+
+    A drop-in replacement for :class:`syntribos.scheduler.Scheduler`. Work
+    items are consumed by `num_tasks` coroutines sharing one event loop, so
+    many more requests can be in flight at once than there are threads.
+
+    For each item, `prefetch(*args)` is called to get the request the item
+    will send. It runs in a thread pool of its own, as making the request
+    (e.g. serializing a fuzzed body) would hold up the event loop; the loop
+    only sends it. If it returns a request, the request is sent
+    asynchronously and the response handed to
+    `on_response(response, signals, *args)`. The item itself, `func(*args)`,
+    then runs in a small thread pool, where it analyzes the response without
+    blocking the event loop.
+
+    :param int num_tasks: Number of requests that may be in flight at once
+    :param int queue_size: Maximum number of items waiting to be run
+    :param int num_threads: Number of threads used to run the items, and to
+        make their requests
+    :param prefetch: Returns the request object to send for an item, or None
+        if the item sends its own requests
+    :param on_response: Hands a response to the item that requested it
+    """
+
+    def __init__(self, num_tasks, queue_size=None, num_threads=None,
+                 prefetch=None, on_response=None, client=None):
+        self.num_tasks = max(1, num_tasks)
+        self.prefetch = prefetch
+        self.on_response = on_response
+        self.client = client or AsyncSynHTTPClient(
+            AsyncHTTPTransport(max_idle=self.num_tasks))
+        self.executor = futures.ThreadPoolExecutor(max(1, num_threads or 1))
+        # Apart from `executor`, whose items may be waiting for a request
+        # another item is yet to make, see syntribos.tests.fuzz.fanout
+        self.prefetch_executor = futures.ThreadPoolExecutor(
+            max(1, num_threads or 1))
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self._call(self._setup(queue_size or self.num_tasks * 2))
+
+    def _call(self, coro):
+        """Runs `coro` on the event loop, blocking until it returns."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def _setup(self, queue_size):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self._running = asyncio.Event()
+        self._running.set()
+        self.tasks = [asyncio.ensure_future(self._work())
+                      for _ in range(self.num_tasks)]
+
+    def submit(self, job, func, *args):
+        """Queue `func(*args)` to be run as part of `job`
+
+        `func` may return a tuple of ``(failures, errors)`` which is added
+        to the job's counters. This call blocks while the queue is full.
+        """
+        # Counted first, so that the job can't be done before it is
+        job.add()
+        try:
+            self._call(self.queue.put((job, func, args)))
+        except BaseException:
+            job.add(-1)
+            raise
+
+    async def _work(self):
+        while True:
+            job, func, args = await self.queue.get()
+            await self._running.wait()
+            failures, errors = 0, 0
+            try:
+                request = await self._prefetch(*args)
+                if request is not None:
+                    response, signals = await self.client.send_request_async(
+                        request)
+                    self.on_response(response, signals, *args)
+                failures, errors = await self.loop.run_in_executor(
+                    self.executor, func, *args) or (0, 0)
+            except Exception:
+                LOG.exception("Unhandled exception in scheduled work item")
+                errors = 1
+            finally:
+                job.finish(failures, errors)
+                self.queue.task_done()
+
+    async def _prefetch(self, *args):
+        """Calls `prefetch(*args)` in `prefetch_executor`
+
+        The context variables it sets (e.g. the template log records are
+        written for, see :class:`syntribos.runner.TemplateLogHandler`) are
+        then set in the task sending the request, as if the task called it.
+        """
+        if not self.prefetch:
+            return None
+        if contextvars is None:
+            return await self.loop.run_in_executor(
+                self.prefetch_executor, self.prefetch, *args)
+        context = contextvars.copy_context()
+        request = await self.loop.run_in_executor(
+            self.prefetch_executor, context.run, self.prefetch, *args)
+        for var, value in context.items():
+            var.set(value)
+        return request
+
+    def pause(self):
+        """Stop tasks from starting new items."""
+        self.loop.call_soon_threadsafe(self._running.clear)
+
+    def resume(self):
+        self.loop.call_soon_threadsafe(self._running.set)
+
+    def join(self):
+        """Block until every submitted item has been run."""
+        self._call(self.queue.join())
+
+    async def _teardown(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.client.transport.close()
+
+    def shutdown(self):
+        """Stop the event loop and thread pool once the queue has drained."""
+        self.resume()
+        self.join()
+        self._call(self._teardown())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.executor.shutdown()
+        self.prefetch_executor.shutdown()
@@ -0,0 +1,419 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""asyncio transport for the "asyncio" HTTP engine (Python 3 only)"""
+import asyncio
+import datetime
+import logging
+import ssl
+import time
+import zlib
+
+import requests
+import requests.exceptions as rex
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from six.moves.urllib.parse import urlsplit
+
+import syntribos.checks.http as http_checks
+from syntribos.clients.http.client import SynHTTPClient
+from syntribos.clients.http import debug_logger
+from syntribos.clients.http import pool
+from syntribos.clients.http import response_cache
+from syntribos.clients.http import throttle
+import syntribos.signal
+
+LOG = logging.getLogger(__name__)
+DEFAULT_HEADERS = {
+    "User-Agent": requests.utils.default_user_agent(),
+    "Accept-Encoding": "gzip, deflate",
+    "Accept": "*/*",
+    "Connection": "keep-alive",
+}
+NO_BODY_STATUSES = (204, 304)
+
+
+class AsyncHTTPTransport(object):
+    """Sends prepared requests over asyncio streams
+
+    Speaks just enough HTTP/1.1 to send a request and read its response
+    (content-length, chunked and read-until-close bodies; gzip and deflate
+    content encodings). Idle keep-alive connections are kept per scheme,
+    host and port and reused by later requests. Requests wait for their
+    host's :class:`syntribos.clients.http.throttle.HostLimiter`.
+
+    Responses are returned as :class:`requests.Response` objects and
+    failures are raised as :mod:`requests.exceptions`, so that checks and
+    signals behave exactly as they do for the "requests" engine.
+
+    :param int max_idle: Maximum idle connections kept per host
+    """
+
+    def __init__(self, max_idle=10):
+        self.max_idle = max_idle
+        self.idle = {}
+        self.ssl_context = ssl.create_default_context()
+        self.ssl_context.check_hostname = False
+        self.ssl_context.verify_mode = ssl.CERT_NONE
+
+    async def send(self, prepared, timeout=10):
+        """Sends a :class:`requests.PreparedRequest`, returns the response
+
+        :param prepared: The request to send
+        :param float timeout: Seconds to wait for the connection, and for the
+            response once the request has been sent
+        :rtype: :class:`requests.Response`
+        """
+        parts = urlsplit(prepared.url)
+        if parts.scheme not in ("http", "https"):
+            raise rex.InvalidSchema(
+                "No connection adapters were found for {0!r}".format(
+                    prepared.url), request=prepared)
+        if not parts.hostname:
+            raise rex.InvalidURL(
+                "Invalid URL {0!r}: No host supplied".format(prepared.url),
+                request=prepared)
+        limiter = throttle.get_limiter(prepared.url)
+        await self._acquire(limiter)
+        start = time.time()
+        try:
+            resp = await self._send(prepared, parts, timeout)
+        except (rex.ConnectionError, rex.Timeout):
+            limiter.release(time.time() - start, failed=True)
+            raise
+        except BaseException:
+            limiter.release(time.time() - start)
+            raise
+        limiter.release(time.time() - start,
+                        failed=resp.status_code in throttle.THROTTLE_STATUSES)
+        return resp
+
+    @staticmethod
+    async def _acquire(limiter):
+        """Waits for a slot, and the rate limit, of the request's host."""
+        loop = asyncio.get_event_loop()
+
+        def wake(future):
+            if not future.done():
+                future.set_result(None)
+
+        while True:
+            future = loop.create_future()
+            if limiter.try_acquire(
+                    lambda: loop.call_soon_threadsafe(wake, future)):
+                break
+            await future
+        delay = limiter.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+    async def _send(self, prepared, parts, timeout):
+        key = (parts.scheme, parts.hostname,
+               parts.port or (443 if parts.scheme == "https" else 80))
+        request_bytes = self._serialize(prepared, parts)
+
+        conn = self._get_idle(key)
+        if conn is not None:
+            try:
+                return await self._exchange(
+                    conn, key, request_bytes, prepared, timeout)
+            except rex.ConnectionError:
+                # The server may have closed the idle connection; retry once
+                # on a fresh one
+                pass
+        conn = await self._connect(key, prepared, timeout)
+        return await self._exchange(
+            conn, key, request_bytes, prepared, timeout)
+
+    async def _exchange(self, conn, key, request_bytes, prepared, timeout):
+        pool.stats.increment("requests")
+        start = time.time()
+        try:
+            conn[1].write(request_bytes)
+            resp = await asyncio.wait_for(
+                self._read_response(conn[0], prepared.method), timeout)
+        except asyncio.TimeoutError:
+            conn[1].close()
+            raise rex.ReadTimeout(
+                "Read timed out. (read timeout={0})".format(timeout),
+                request=prepared)
+        except rex.RequestException:
+            conn[1].close()
+            raise
+        except (OSError, asyncio.IncompleteReadError, EOFError) as exc:
+            conn[1].close()
+            raise rex.ConnectionError(exc, request=prepared)
+        return self._build_response(conn, key, prepared, resp, start)
+
+    def _get_idle(self, key):
+        conns = self.idle.get(key)
+        while conns:
+            conn = conns.pop()
+            if not conn[0].at_eof() and not conn[1].is_closing():
+                return conn
+            conn[1].close()
+        return None
+
+    def _release(self, key, conn):
+        conns = self.idle.setdefault(key, [])
+        if len(conns) < self.max_idle:
+            conns.append(conn)
+        else:
+            conn[1].close()
+
+    async def _connect(self, key, prepared, timeout):
+        scheme, host, port = key
+        ssl_context = self.ssl_context if scheme == "https" else None
+        pool.stats.increment("connections_opened")
+        try:
+            return await asyncio.wait_for(
+                asyncio.open_connection(host, port, ssl=ssl_context),
+                timeout)
+        except asyncio.TimeoutError:
+            raise rex.ConnectTimeout(
+                "Connection to {0} timed out. (connect timeout={1})".format(
+                    host, timeout), request=prepared)
+        except ssl.SSLError as exc:
+            raise rex.SSLError(exc, request=prepared)
+        except OSError as exc:
+            raise rex.ConnectionError(exc, request=prepared)
+
+    @staticmethod
+    def _serialize(prepared, parts):
+        path = parts.path or "/"
+        if parts.query:
+            path = "{0}?{1}".format(path, parts.query)
+        body = prepared.body
+        if body is None:
+            body = b""
+        elif not isinstance(body, bytes):
+            body = body.encode("utf-8")
+        # Like requests' session defaults, these are kept on the prepared
+        # request so that they show up in the logs and results
+        for name, value in DEFAULT_HEADERS.items():
+            prepared.headers.setdefault(name, value)
+        if body and "Content-Length" not in prepared.headers:
+            prepared.headers["Content-Length"] = str(len(body))
+        lines = ["{0} {1} HTTP/1.1".format(prepared.method, path)]
+        if "Host" not in prepared.headers:
+            lines.append("Host: {0}".format(parts.netloc.rpartition("@")[2]))
+        for name, value in prepared.headers.items():
+            if isinstance(value, bytes):
+                value = value.decode("latin-1")
+            lines.append("{0}: {1}".format(name, value))
+        head = "\r\n".join(lines) + "\r\n\r\n"
+        return head.encode("latin-1") + body
+
+    async def _read_response(self, reader, method):
+        status, reason, headers = await self._read_head(reader)
+        while 100 <= status < 200 and status != 101:
+            status, reason, headers = await self._read_head(reader)
+        reusable = "close" not in headers.get("Connection", "").lower()
+        if method == "HEAD" or status in NO_BODY_STATUSES or status < 200:
+            body = b""
+        elif "chunked" in headers.get("Transfer-Encoding", "").lower():
+            body = await self._read_chunked(reader)
+        elif "Content-Length" in headers:
+            try:
+                length = int(headers["Content-Length"])
+            except ValueError:
+                raise rex.InvalidHeader("Invalid Content-Length header")
+            body = await reader.readexactly(length)
+        else:
+            body = await reader.read()
+            reusable = False
+        return status, reason, headers, body, reusable
+
+    @staticmethod
+    async def _read_head(reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise EOFError("Connection closed before a response was read")
+        try:
+            _, status, reason = (status_line.decode("latin-1").rstrip(
+                "\r\n").split(" ", 2) + [""])[:3]
+            status = int(status)
+        except ValueError:
+            raise rex.ConnectionError(
+                "Invalid status line {0!r}".format(status_line))
+        headers = CaseInsensitiveDict()
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            name, value = name.strip(), value.strip()
+            if name in headers:
+                headers[name] = "{0}, {1}".format(headers[name], value)
+            else:
+                headers[name] = value
+        return status, reason, headers
+
+    @staticmethod
+    async def _read_chunked(reader):
+        chunks = []
+        while True:
+            size_line = await reader.readline()
+            try:
+                size = int(size_line.split(b";")[0].strip(), 16)
+            except ValueError:
+                raise rex.ChunkedEncodingError(
+                    "Invalid chunk size {0!r}".format(size_line))
+            if size == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+    def _build_response(self, conn, key, prepared, resp, start):
+        status, reason, headers, body, reusable = resp
+        if reusable:
+            self._release(key, conn)
+        else:
+            conn[1].close()
+        response = requests.Response()
+        response.status_code = status
+        response.reason = reason
+        response.headers = headers
+        response._content = self._decode(body, headers, prepared)
+        response._content_consumed = True
+        response.url = prepared.url
+        response.request = prepared
+        response.encoding = get_encoding_from_headers(headers)
+        response.elapsed = datetime.timedelta(seconds=time.time() - start)
+        return response
+
+    @staticmethod
+    def _decode(body, headers, prepared):
+        encoding = headers.get("Content-Encoding", "").lower()
+        try:
+            if encoding == "gzip":
+                return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+            elif encoding == "deflate":
+                try:
+                    return zlib.decompress(body)
+                except zlib.error:
+                    return zlib.decompress(body, -zlib.MAX_WBITS)
+        except zlib.error as exc:
+            raise rex.ContentDecodingError(exc, request=prepared)
+        return body
+
+    def close(self):
+        """Closes all idle connections."""
+        for conns in self.idle.values():
+            for conn in conns:
+                conn[1].close()
+        self.idle = {}
+
+
+class AsyncSynHTTPClient(SynHTTPClient):
+    """A :class:`SynHTTPClient` that can also send requests asynchronously
+
+    `send_request_async` is the coroutine counterpart of `send_request`: it
+    logs the transaction the same way, and registers the same signals
+    (exceptions, status code and content type) on the response. Identical
+    requests share the response cache, and wait for one another rather than
+    being sent at once.
+    """
+
+    def __init__(self, transport=None):
+        super(AsyncSynHTTPClient, self).__init__()
+        self.transport = transport or AsyncHTTPTransport()
+        self._in_flight = {}
+
+    async def request_async(self, method, url, headers=None, params=None,
+                            data=None, sanitize=False,
+                            requestslib_kwargs=None):
+        """Sends a request through the asyncio transport
+
+        Takes the same arguments as :meth:`SynHTTPClient.request`.
+
+        :returns: tuple of (response, signals)
+        """
+        requestslib_kwargs = requestslib_kwargs or {}
+        cache = response_cache.get_cache()
+        if cache is None or set(requestslib_kwargs) - {"timeout"}:
+            return await self._request_async(
+                method, url, headers, params, data, sanitize,
+                requestslib_kwargs)
+        key = response_cache.request_key(
+            method, url, dict(self.default_headers, **(headers or {})),
+            params, data)
+        result = cache.get(key)
+        if result is not None:
+            return result
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            result = await asyncio.shield(in_flight)
+            if result is None:
+                return await self._request_async(
+                    method, url, headers, params, data, sanitize,
+                    requestslib_kwargs)
+            cache.count_avoided(key)
+            return cache.share(result)
+        in_flight = asyncio.get_event_loop().create_future()
+        self._in_flight[key] = in_flight
+        result = None
+        try:
+            result = await self._request_async(
+                method, url, headers, params, data, sanitize,
+                requestslib_kwargs)
+            cache.put(key, result)
+        finally:
+            del self._in_flight[key]
+            in_flight.set_result(result)
+        return result
+
+    async def _request_async(self, method, url, headers, params, data,
+                             sanitize, requestslib_kwargs):
+        kwargs = {"headers": headers, "params": params, "data": data,
+                  "sanitize": sanitize,
+                  "requestslib_kwargs": requestslib_kwargs}
+        kwargs_copy, logline_obj = debug_logger.format_call(
+            (self, method, url), kwargs)
+        timeout = requestslib_kwargs.get("timeout") or 10
+
+        response = None
+        signals = syntribos.signal.SignalHolder()
+        start = time.time()
+        try:
+            prepared = requests.Request(
+                method, url, params=params or {}, data=data,
+                headers=dict(self.default_headers, **(headers or {}))
+            ).prepare()
+            response = await self.transport.send(prepared, timeout)
+        except Exception as exc:
+            debug_logger.handle_exception(LOG, logging.DEBUG, exc, signals)
+
+        if len(signals) > 0 and response is None:
+            debug_logger.log_failure(LOG, logging.DEBUG, start)
+            return (response, signals)
+
+        debug_logger.log_transaction(
+            LOG, logging.DEBUG, response, kwargs_copy, logline_obj)
+        signals.register(http_checks.check_status_code(response))
+        signals.register(http_checks.check_content_type(response))
+        return (response, signals)
+
+    async def send_request_async(self, request_obj):
+        """Coroutine counterpart of :meth:`SynHTTPClient.send_request`
+
+        :param request_obj: A RequestObject generated by a parser
+        :type request_obj: :class:`syntribos.clients.http.parser.RequestObject`
+        :returns: tuple of (response, signals)
+        """
+        return await self.request_async(
+            request_obj.method, request_obj.url,
+            headers=request_obj.headers, params=request_obj.params,
+            data=request_obj.data, sanitize=request_obj.sanitize)
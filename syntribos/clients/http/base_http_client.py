@@ -13,10 +13,10 @@
 # limitations under the License.
 import logging
 
-import requests
 from requests.packages import urllib3
 
 from syntribos.clients.http.debug_logger import log_http_transaction
+from syntribos.clients.http import pool
 
 urllib3.disable_warnings()
 
@@ -79,5 +79,5 @@ class HTTPClient(object):
             {'headers': headers, 'params': params, 'verify': verify,
              'data': data, 'allow_redirects': False}, **requestslib_kwargs)
 
-        # Make the request
-        return requests.request(method, url, **requestslib_kwargs)
+        # Make the request, over a pooled keep-alive connection
+        return pool.get_session().request(method, url, **requestslib_kwargs)
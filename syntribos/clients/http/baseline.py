@@ -0,0 +1,130 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Baseline responses shared by the test types of a template
+
+Each test type sends the request of a template, unmodified, to get the
+baseline its test cases are compared against. The test types of a template
+send identical requests, so the first response is kept, keyed by the
+prepared request, and handed to every other test type asking for it. A
+template using meta variables that change with each request (e.g. a random
+value) does not share its baseline.
+"""
+import json
+import logging
+import threading
+import time
+
+from oslo_config import cfg
+import six
+
+from syntribos.signal import SignalHolder
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+
+
+def request_key(request):
+    """Returns a hashable key identifying a prepared request
+
+    :param request: A prepared request
+    :type request: :class:`syntribos.clients.http.parser.RequestObject`
+    """
+    parts = [request.method, request.url]
+    for part in (request.headers, request.params, request.data):
+        if isinstance(part, dict):
+            part = json.dumps(part, sort_keys=True, default=str)
+        elif part is not None and not isinstance(part, six.string_types):
+            part = repr(part)
+        parts.append(part)
+    return tuple(parts)
+
+
+class BaselineCache(object):
+    """Keeps the response to each baseline request
+
+    :param float refresh_interval: Seconds after which a baseline is sent
+        again. 0 keeps it for the whole run
+    """
+
+    def __init__(self, refresh_interval=0):
+        self.refresh_interval = refresh_interval
+        self.entries = {}
+        self.sent = 0
+        self.reused = 0
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, entry):
+        return (not self.refresh_interval or
+                time.time() - entry[0] < self.refresh_interval)
+
+    def send(self, client, request):
+        """Sends `request` with `client`, unless its response is cached
+
+        Test types asking for the same baseline at once wait for the first
+        one to get its response, rather than sending their own.
+
+        :param client: Client sending the request
+        :type client: :class:`syntribos.clients.http.client.SynHTTPClient`
+        :param request: A prepared request
+        :returns: tuple of (response, signals). The signals are a copy,
+            which the caller may add to
+        """
+        key = request_key(request)
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            entry = self.entries.get(key)
+            if entry is not None and self._is_fresh(entry):
+                self.reused += 1
+                LOG.debug("Reusing baseline response to %s %s",
+                          request.method, request.url)
+            else:
+                response, signals = client.send_request(request)
+                entry = (time.time(), response, signals)
+                self.sent += 1
+                if response is not None:
+                    self.entries[key] = entry
+        return entry[1], SignalHolder(entry[2])
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self._locks.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Returns the baseline cache of this process
+
+    Baselines are kept for ``[syntribos] baseline_refresh`` seconds.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    refresh = CONF.syntribos.baseline_refresh
+                except (cfg.NoSuchOptError, cfg.NoSuchGroupError):
+                    refresh = 0
+                _cache = BaselineCache(refresh)
+    return _cache
+
+
+def send_baseline(client, request):
+    """Sends a baseline request, see :meth:`BaselineCache.send`."""
+    return get_cache().send(client, request)
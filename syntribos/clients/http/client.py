@@ -13,6 +13,7 @@
 # limitations under the License.
 import syntribos.checks.http as http_checks
 from syntribos.clients.http.base_http_client import HTTPClient
+from syntribos.clients.http import response_cache
 
 
 class SynHTTPClient(HTTPClient):
@@ -22,6 +23,9 @@ class SynHTTPClient(HTTPClient):
     It aliases `send_request` to `request` so logging/exception handling is
     done in one place, for all requests. Also checks for bad HTTP status codes
     and adds a signal if one is found.
+
+    When ``[syntribos] response_cache`` is set, identical requests share one
+    response (see :mod:`syntribos.clients.http.response_cache`).
     """
 
     def request(self, method, url, headers=None, params=None, data=None,
@@ -41,6 +45,18 @@ class SynHTTPClient(HTTPClient):
         elif not requestslib_kwargs.get("timeout", None):
             requestslib_kwargs["timeout"] = 10
 
+        cache = response_cache.get_cache()
+        if cache is None or set(requestslib_kwargs) - {"timeout"}:
+            return self._send(method, url, headers, params, data, sanitize,
+                              requestslib_kwargs)
+        key = response_cache.request_key(
+            method, url, dict(self.default_headers, **(headers or {})),
+            params, data)
+        return cache.send(key, lambda: self._send(
+            method, url, headers, params, data, sanitize, requestslib_kwargs))
+
+    def _send(self, method, url, headers, params, data, sanitize,
+              requestslib_kwargs):
         response, signals = super(SynHTTPClient, self).request(
             method, url, headers=headers, params=params, data=data,
             sanitize=sanitize,
@@ -17,8 +17,10 @@ import importlib
 import json
 import re
 import sys
+import threading
 import types
 import uuid
+import weakref
 import xml.etree.ElementTree as ElementTree
 
 from oslo_config import cfg
@@ -28,10 +30,38 @@ from six.moves.urllib import parse as urlparse
 import yaml
 
 from syntribos._i18n import _
+from syntribos.clients.http import template_cache
 
 CONF = cfg.CONF
+# Generators and meta variables of the templates being run, by the UUID
+# placeholder standing for them in the requests, see VariableScope
 _iterators = {}
 _string_var_objs = {}
+_PLACEHOLDER_RE = re.compile(r"[0-9a-f]{32,}")
+_PLACEHOLDER_LEN = 32
+# Templates parsed during this run, see RequestCreator.create_request
+_compiled = {}
+_compile_lock = threading.RLock()
+# Fuzz index (see syntribos.tests.fuzz.datagen.FuzzIndex) of each part of the
+# requests handed out by a CompiledTemplate, shared by its copies
+_fuzz_indexes = weakref.WeakKeyDictionary()
+# Functions called by templates, by (module dotted path, function name)
+_callables = {}
+# The C (libyaml) loader and dumper are used if PyYAML was built with them
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YamlDumper = getattr(yaml, "CDumper", yaml.Dumper)
+# Locks of the templates being compiled, by key, see compile_template
+_key_locks = {}
+
+
+class _ParseState(threading.local):
+    """The template being parsed by a thread, see parse_request"""
+    parsing = False
+    meta_vars = None
+    scope = None
+
+
+_parse_state = _ParseState()
 
 
 class RequestCreator(object):
@@ -40,11 +70,29 @@ class RequestCreator(object):
     METAVAR = r"(\|[^\|]*\|)"
     FUNC_WITH_ARGS = r"([^:]+):([^:]+):(\[.+\])"
     FUNC_NO_ARGS = r"([^:]+):([^:]+)"
+    EXTERNAL_RE = re.compile(EXTERNAL)
+    METAVAR_RE = re.compile(METAVAR)
+    # Data type of the request body, by a name found in its Content-Type
+    BODY_TYPES = (("json", "json"), ("xml", "xml"), ("yaml", "yaml"),
+                  ("yml", "yaml"))
+    # Errors raised when a request body is not of a data type, by data type
+    BODY_ERRORS = {"json": (TypeError, ValueError), "xml": (Exception,),
+                   "yaml": (yaml.YAMLError,)}
+    # Meta variables used outside of parse_request
+    meta_vars = None
 
     @classmethod
     def create_request(cls, string, endpoint, meta_vars=None):
         """Parse the HTTP request template into its components
 
+        Each template is only parsed once per run: the request returned is a
+        copy of the one parsed the first time the template was seen (see
+        :class:`CompiledTemplate`). Templates calling functions as they are
+        parsed (see :attr:`CompiledTemplate.volatile`) aren't kept: each
+        request after the first is parsed again, as the values returned by
+        the functions (e.g. tokens) may expire, and generators can only be
+        gone through once.
+
         :param str string: HTTP request template
         :param str endpoint: URL of the target to be tested
         :param dict meta_vars: Default None, dict parsed from meta.json
@@ -52,7 +100,139 @@ class RequestCreator(object):
         :returns: RequestObject with method, url, params, etc. for use by
                   runner
         """
-        cls.meta_vars = meta_vars
+        compiled = cls.compile_template(string, endpoint, meta_vars)
+        request = compiled.get_request()
+        if request is None:
+            # Its variables are released along with the template
+            request = cls.parse_request(string, endpoint, meta_vars,
+                                        scope=compiled.scope)
+        return request
+
+    @classmethod
+    def compile_template(cls, string, endpoint, meta_vars=None):
+        """Returns the :class:`CompiledTemplate` of a template
+
+        The template is parsed the first time it is seen during the run.
+        Parse errors are raised every time, as nothing is kept for the
+        template. Several templates may be compiled at once, by different
+        threads; a template is only parsed by one of them.
+        """
+        key = (string, endpoint,
+               json.dumps(meta_vars, sort_keys=True, default=str))
+        with _compile_lock:
+            compiled = _compiled.get(key)
+            if compiled is not None:
+                return compiled
+            key_lock = _key_locks.setdefault(key, threading.Lock())
+        # Other templates are compiled at the same time, see
+        # syntribos.runner.Runner.compile_templates
+        with key_lock:
+            try:
+                with _compile_lock:
+                    compiled = _compiled.get(key)
+                if compiled is None:
+                    compiled = cls._compile(string, endpoint, meta_vars, key)
+            finally:
+                with _compile_lock:
+                    if _key_locks.get(key) is key_lock:
+                        del _key_locks[key]
+        return compiled
+
+    @classmethod
+    def _compile(cls, string, endpoint, meta_vars, key):
+        """Loads or parses a template, must hold the lock of `key`"""
+        compiled = cls._load_template(key)
+        if compiled is None:
+            scope = VariableScope()
+            try:
+                request = cls.parse_request(string, endpoint, meta_vars,
+                                            scope)
+            except Exception:
+                scope.release()
+                raise
+            compiled = CompiledTemplate(request, scope, key)
+            compiled.save()
+        with _compile_lock:
+            _compiled[key] = compiled
+        return compiled
+
+    @staticmethod
+    def _load_template(key):
+        """Returns the template kept by the template cache, or None"""
+        cache = template_cache.get_cache()
+        entry = cache.load(key) if cache is not None else None
+        if entry is None:
+            return None
+        scope = VariableScope()
+        for placeholder, var_obj in entry["var_objs"].items():
+            scope.add(_string_var_objs, placeholder, var_obj)
+        compiled = CompiledTemplate(entry["request"], scope=scope, key=key)
+        compiled.fuzz_index.update(entry["indexes"])
+        compiled.saved_indexes = set(entry["indexes"])
+        return compiled
+
+    @classmethod
+    def hold_template(cls, string, endpoint, meta_vars=None):
+        """Returns the :class:`CompiledTemplate` of a template, held until
+        :meth:`CompiledTemplate.release` is called
+
+        The variables of a template are kept while it is held (e.g. while its
+        test cases are run), and released with its last hold.
+        """
+        while True:
+            compiled = cls.compile_template(string, endpoint, meta_vars)
+            with _compile_lock:
+                # It may have been released by its last holder meanwhile
+                if _compiled.get(compiled.key) is compiled:
+                    compiled.holders += 1
+                    return compiled
+
+    @classmethod
+    def may_be_volatile(cls, string, meta_vars=None):
+        """Returns whether parsing a template may call functions
+
+        Found without parsing the template: it has CALL_EXTERNAL calls, or
+        references meta variables with a type (see
+        :meth:`replace_one_variable`). The :class:`CompiledTemplate` of any
+        other template isn't :attr:`volatile <CompiledTemplate.volatile>`.
+
+        :param str string: HTTP request template
+        :param dict meta_vars: Meta variables of the template
+        :rtype: bool
+        """
+        if cls.EXTERNAL_RE.search(string):
+            return True
+        for match in cls.METAVAR_RE.finditer(string):
+            var_dict = (meta_vars or {}).get(match.group(1).strip("|"))
+            # _create_var_obj renames "type" as it is parsed
+            if isinstance(var_dict, dict) and (
+                    var_dict.get("type") or var_dict.get("var_type")):
+                return True
+        return False
+
+    @classmethod
+    def parse_request(cls, string, endpoint, meta_vars=None, scope=None):
+        """Parses a template, without going through the run's cache
+
+        :param scope: If given, the generators and meta variables referenced
+            by the request are added to it
+        :type scope: :class:`VariableScope`
+        :rtype: :class:`syntribos.clients.http.parser.RequestObject`
+        """
+        # Templates may be parsed by several threads at once
+        state = _parse_state
+        saved = state.parsing, state.meta_vars, state.scope
+        # meta.json entries are changed as they are read, so parse a copy
+        state.parsing = True
+        state.meta_vars = copy.deepcopy(meta_vars)
+        state.scope = scope
+        try:
+            return cls._parse_request(string, endpoint)
+        finally:
+            state.parsing, state.meta_vars, state.scope = saved
+
+    @classmethod
+    def _parse_request(cls, string, endpoint):
         string = cls.call_external_functions(string)
         action_field = str(uuid.uuid4()).replace("-", "")
         string = string.replace(cls.ACTION_FIELD, action_field)
@@ -83,18 +263,21 @@ class RequestCreator(object):
         :returns: VariableObject holding the attributes defined in the JSON
                   object read in from meta.json
         """
-        if not cls.meta_vars:
+        meta_vars = cls.meta_vars
+        if _parse_state.parsing:
+            meta_vars = _parse_state.meta_vars
+        if not meta_vars:
             msg = ("Template contains reference to meta variable of the form "
                    "'|{}|', but no valid meta.json file was found in the "
                    "templates directory. Check that your templates reference "
                    "a meta.json file that is correctly formatted.".format(var))
             raise TemplateParseException(msg)
 
-        if var not in cls.meta_vars:
+        if var not in meta_vars:
             msg = _("Expected to find %s in meta.json, but didn't. "
                     "Check your templates") % var
             raise TemplateParseException(msg)
-        var_dict = cls.meta_vars[var]
+        var_dict = meta_vars[var]
         if "type" in var_dict:
             var_dict["var_type"] = var_dict.pop("type")
         var_obj = VariableObject(var, prefix=prefix, suffix=suffix, **var_dict)
@@ -163,6 +346,9 @@ class RequestCreator(object):
             if match:
                 replaced_key = match.group(0).strip("|")
                 key_obj = cls._create_var_obj(replaced_key)
+                scope = _parse_state.scope
+                if key_obj.var_type and scope is not None:
+                    scope.volatile = True
                 replaced_key = cls.replace_one_variable(key_obj)
                 new_key = re.sub(cls.METAVAR, replaced_key, key)
                 del dic[key]
@@ -190,23 +376,54 @@ class RequestCreator(object):
 
         For every meta variable reference found in the string, it generates
         a VariableObject. It then associates each VariableObject with a uuid,
-        as a key value pair, which is storedin the global dict variable
-        `_str_var_obs`. It then replaces all meta variable references in the
-        string with the uuid key to the VariableObject
+        as a key value pair, which is stored in `_string_var_objs` (see
+        :class:`VariableScope`). It then replaces all meta variable
+        references in the string with the uuid key to the VariableObject
+
+        The string is gone through once, see :meth:`_tokenize`.
 
         :param str string: String to be evaluated
         :returns: string with all metavariable references replaced
         """
-        while True:
-            match = re.search(cls.METAVAR, string)
-            if not match:
+        parts = []
+        for literal, match in cls._tokenize(cls.METAVAR_RE, string):
+            parts.append(literal)
+            if match is None:
                 break
             obj_ref_uuid = str(uuid.uuid4()).replace("-", "")
-            var_name = match.group(1).strip("|")
-            var_obj = cls._create_var_obj(var_name)
-            _string_var_objs[obj_ref_uuid] = var_obj
-            string = re.sub(cls.METAVAR, obj_ref_uuid, string, count=1)
-        return string
+            var_obj = cls._create_var_obj(match.group(1).strip("|"))
+            _add_variable(_parse_state.scope, _string_var_objs, obj_ref_uuid,
+                          var_obj)
+            parts.append(obj_ref_uuid)
+        return "".join(parts)
+
+    @staticmethod
+    def _tokenize(pattern, string):
+        """Splits `string` at the matches of `pattern`, in one pass
+
+        :param pattern: Compiled regular expression
+        :param str string: String to be split
+        :returns: Generator of (literal, match) tuples: the literal text
+            before each match, and the match, None after the last literal
+        """
+        last = 0
+        for match in pattern.finditer(string):
+            yield string[last:match.start()], match
+            last = match.end()
+        yield string[last:], None
+
+    @staticmethod
+    def _get_callable(dot_path, func_name):
+        """Returns the function `func_name` of the module `dot_path`
+
+        Modules are imported, and functions looked up, once per run.
+        """
+        key = (dot_path, func_name)
+        func = _callables.get(key)
+        if func is None:
+            mod = importlib.import_module(dot_path)
+            func = _callables[key] = getattr(mod, func_name)
+        return func
 
     @classmethod
     def _parse_url_line(cls, line, endpoint):
@@ -254,6 +471,10 @@ class RequestCreator(object):
     def _parse_data(cls, lines, content_type=""):
         """Parse the body of the HTTP request (e.g. POST variables)
 
+        The body is parsed as the data type named by the Content-Type header
+        of the template (JSON, XML or YAML), see :data:`BODY_TYPES`. Without
+        such a header, each of them is tried in turn.
+
         :param list lines: lines of the HTTP body
         :param content_type: Content-type header in template if any
 
@@ -261,11 +482,39 @@ class RequestCreator(object):
         """
         postdat_regex = r"([\w%]+=[\w%]+&?)+"
         data = "\n".join(lines).strip()
-        data_type = "text"
         if not data:
             return '', None
 
-        try:
+        content_type = content_type.lower()
+        for name, data_type in cls.BODY_TYPES:
+            if name in content_type:
+                try:
+                    return cls._parse_body(data, data_type)
+                except cls.BODY_ERRORS[data_type]:
+                    msg = ("The Content-Type header in this template is %s "
+                           "but syntribos cannot parse the request body as "
+                           "%s" % (content_type, data_type))
+                    raise TemplateParseException(msg)
+        for data_type in ("json", "xml", "yaml"):
+            try:
+                return cls._parse_body(data, data_type)
+            except cls.BODY_ERRORS[data_type]:
+                pass
+        if not re.match(postdat_regex, data):
+            raise TypeError(_("Make sure that your request body is"
+                              "valid JSON, XML, or YAML data - be "
+                              "sure to check for typos."))
+        return data, "text"
+
+    @classmethod
+    def _parse_body(cls, data, data_type):
+        """Parses a request body as `data_type`, one of "json", "xml" or
+        "yaml"
+
+        :raises: One of :data:`BODY_ERRORS` if the body is not of that type
+        :returns: tuple of (object representation of the body, data type)
+        """
+        if data_type == "json":
             data = json.loads(data)
             # TODO(cneill): Make this less hacky
             if isinstance(data, list):
@@ -274,45 +523,17 @@ class RequestCreator(object):
                 return cls._replace_dict_variables(data), 'json'
             else:
                 return cls._replace_str_variables(data), 'str'
-        except TemplateParseException:
-            raise
-        except (TypeError, ValueError):
-            if 'json' in content_type:
-                msg = ("The Content-Type header in this template is %s but "
-                       "syntribos cannot parse the request body as json" %
-                       content_type)
-                raise TemplateParseException(msg)
-            try:
-                data = ElementTree.fromstring(data)
-                data_type = 'xml'
-            except Exception:
-                if 'xml' in content_type:
-                    msg = ("The Content-Type header in this template is %s "
-                           "but syntribos cannot parse the request body as xml"
-                           % content_type)
-                    raise TemplateParseException(msg)
-                try:
-                    data = yaml.safe_load(data)
-                    data_type = 'yaml'
-                except yaml.YAMLError:
-                    if 'yaml' in content_type:
-                        msg = ("The Content-Type header in this template is %s"
-                               "but syntribos cannot parse the request body as"
-                               "yaml"
-                               % content_type)
-                        raise TemplateParseException(msg)
-                    if not re.match(postdat_regex, data):
-                        raise TypeError(_("Make sure that your request body is"
-                                          "valid JSON, XML, or YAML data - be "
-                                          "sure to check for typos."))
-        except Exception:
-            raise
-        return data, data_type
+        elif data_type == "xml":
+            return ElementTree.fromstring(data), 'xml'
+        return yaml.load(data, Loader=_YamlLoader), 'yaml'
 
     @classmethod
     def call_external_functions(cls, string):
         """Parse external function calls in the body of request templates
 
+        The template is gone through once, see :meth:`_tokenize`; the values
+        returned by the functions are placed in it as they are.
+
         :param str string: full HTTP request template as a string
         :rtype: str
         :returns: the request, with EXTERNAL calls filled in with their values
@@ -320,24 +541,24 @@ class RequestCreator(object):
         """
         if not isinstance(string, six.string_types):
             return string
-        while True:
-            match = re.search(cls.EXTERNAL, string)
-            if not match:
+        scope = _parse_state.scope
+        parts = []
+        for literal, match in cls._tokenize(cls.EXTERNAL_RE, string):
+            parts.append(literal)
+            if match is None:
                 break
-            dot_path = match.group(1)
-            func_name = match.group(2)
-            arg_list = match.group(3) or "[]"
-            mod = importlib.import_module(dot_path)
-            func = getattr(mod, func_name)
-            args = json.loads(arg_list)
+            if scope is not None:
+                scope.volatile = True
+            func = cls._get_callable(match.group(1), match.group(2))
+            args = json.loads(match.group(3) or "[]")
             val = func(*args)
             if isinstance(val, types.GeneratorType):
                 local_uuid = str(uuid.uuid4()).replace("-", "")
-                string = re.sub(cls.EXTERNAL, local_uuid, string, count=1)
-                _iterators[local_uuid] = val
+                parts.append(local_uuid)
+                _add_variable(scope, _iterators, local_uuid, val)
             else:
-                string = re.sub(cls.EXTERNAL, str(val), string, count=1)
-        return string
+                parts.append(str(val))
+        return "".join(parts)
 
     @classmethod
     def call_one_external_function(cls, string, args):
@@ -352,10 +573,7 @@ class RequestCreator(object):
 
         if match:
             try:
-                dot_path = match.group(1)
-                func_name = match.group(2)
-                mod = importlib.import_module(dot_path)
-                func = getattr(mod, func_name)
+                func = cls._get_callable(match.group(1), match.group(2))
 
                 if func_string_has_args and not args:
                     arg_list = match.group(3)
@@ -372,8 +590,7 @@ class RequestCreator(object):
                 func_str = func_lst[0]
                 dot_path = ".".join(func_str.split(".")[:-1])
                 func_name = func_str.split(".")[-1]
-                mod = importlib.import_module(dot_path)
-                func = getattr(mod, func_name)
+                func = cls._get_callable(dot_path, func_name)
                 val = func(*args)
             except Exception:
                 msg = _("The reference to the function %s failed to parse "
@@ -422,6 +639,169 @@ class TemplateParseException(Exception):
     pass
 
 
+class VariableScope(object):
+    """The generators and meta variables of one template
+
+    They are referenced in its requests by UUID placeholders, looked up in
+    :data:`_iterators` and :data:`_string_var_objs` (see
+    :func:`find_placeholders`). The scope keeps track of the placeholders
+    it added there, and removes them when the template is done with.
+
+    :ivar bool volatile: Whether parsing the template called functions
+        (e.g. through ``CALL_EXTERNAL``), so that it can't be kept by
+        :mod:`syntribos.clients.http.template_cache`
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.volatile = False
+        self._lock = threading.Lock()
+
+    def add(self, registry, key, value):
+        """Adds `value` to `registry` (one of :data:`_iterators` or
+        :data:`_string_var_objs`) as `key`, in this scope
+        """
+        registry[key] = value
+        with self._lock:
+            self.keys.append(key)
+
+    def release(self):
+        """Removes the generators and meta variables of the scope"""
+        with self._lock:
+            keys, self.keys = self.keys, []
+        for key in keys:
+            _iterators.pop(key, None)
+            _string_var_objs.pop(key, None)
+
+
+def _add_variable(scope, registry, key, value):
+    """Adds `value` to `registry` in `scope`, or for the whole run if
+    `scope` is None
+    """
+    if scope is None:
+        registry[key] = value
+    else:
+        scope.add(registry, key, value)
+
+
+def find_placeholders(string):
+    """Finds the placeholders of generators and meta variables in `string`
+
+    Placeholders are the 32 hexadecimal digits of a UUID, so `string` is
+    searched once for runs of such digits, each looked up directly.
+
+    :returns: Generator of (start, placeholder) tuples, in order
+    """
+    if not (_iterators or _string_var_objs):
+        return
+    for match in _PLACEHOLDER_RE.finditer(string):
+        run = match.group(0)
+        pos = 0
+        while pos + _PLACEHOLDER_LEN <= len(run):
+            key = run[pos:pos + _PLACEHOLDER_LEN]
+            if key in _iterators or key in _string_var_objs:
+                yield match.start() + pos, key
+                pos += _PLACEHOLDER_LEN
+            else:
+                pos += 1
+
+
+class CompiledTemplate(object):
+    """A parsed template, handing out copies of its request
+
+    Test types each get their own copy of the request, as they change it.
+    The copies have the same fuzzable positions, which are found once for
+    all of them (see :func:`syntribos.tests.fuzz.datagen.get_index`).
+
+    The request of a :attr:`volatile` template is only handed out once:
+    the values returned by the functions it calls (e.g. tokens, or
+    generators referenced by a UUID, see :data:`_iterators`) can't be
+    shared, so each later request is parsed again (see
+    :meth:`RequestCreator.create_request`).
+
+    The generators and meta variables of the template are kept in its
+    `scope`, released with the last hold on the template (see
+    :meth:`RequestCreator.hold_template`).
+
+    :param request: The parsed request
+    :type request: :class:`RequestObject`
+    :param scope: The generators and meta variables of the template
+    :type scope: :class:`VariableScope`
+    :param tuple key: Key of the template in the run's parsed templates
+    """
+
+    def __init__(self, request, scope=None, key=None):
+        self.request = request
+        self.scope = scope
+        self.key = key
+        self.copies = 0
+        self.holders = 0
+        self.fuzz_index = None if self.volatile else {}
+        self.saved_indexes = set()
+        self._lock = threading.Lock()
+
+    def save(self):
+        """Keeps the template in the template cache, if it is used
+
+        Fuzz indexes are only kept for the parts of the request which are
+        structured (their positions don't depend on meta variables).
+        """
+        cache = template_cache.get_cache()
+        if (cache is None or self.key is None or self.scope is None or
+                self.volatile):
+            return
+        fuzz_index = dict(self.fuzz_index or {})
+        indexes = dict(
+            (fuzz_type, index) for fuzz_type, index in fuzz_index.items()
+            if all(path[0][0] != "span" for path, _, _ in index.positions))
+        var_objs = dict((key, _string_var_objs[key]) for key in
+                        list(self.scope.keys) if key in _string_var_objs)
+        cache.save(self.key, self.request, var_objs, indexes)
+        self.saved_indexes = set(fuzz_index)
+
+    @property
+    def volatile(self):
+        """Whether parsing the template called functions, whose values
+        (e.g. tokens) may not be valid for as long as the template is held
+        """
+        return self.scope is not None and self.scope.volatile
+
+    def release(self):
+        """Drops a hold on the template
+
+        With the last one, the template is forgotten, and its scope
+        released; it is parsed (or loaded) again if seen later in the run.
+        The fuzz indexes found for it are kept by the template cache.
+        """
+        with _compile_lock:
+            self.holders -= 1
+            if self.holders > 0:
+                return
+            if _compiled.get(self.key) is self:
+                del _compiled[self.key]
+            if set(self.fuzz_index or {}) - self.saved_indexes:
+                self.save()
+            if self.scope is not None:
+                self.scope.release()
+
+    def get_request(self):
+        """Returns a copy of the parsed request
+
+        :rtype: :class:`RequestObject`
+        :returns: The copy, or None if the template is :attr:`volatile` and
+            its request was already handed out
+        """
+        with self._lock:
+            self.copies += 1
+            first = self.copies == 1
+        if self.volatile and not first:
+            return None
+        request = copy.deepcopy(self.request)
+        if self.fuzz_index is not None:
+            _fuzz_indexes[request] = self.fuzz_index
+        return request
+
+
 class RequestHelperMixin(object):
     """Class that helps with fuzzing requests."""
 
@@ -512,23 +892,42 @@ class RequestHelperMixin(object):
             h = html_parser.HTMLParser()
             return h.unescape(str_data.decode())
         elif data_type == 'yaml':
-            return yaml.dump(data)
+            return yaml.dump(data, Dumper=_YamlDumper)
         else:
             return data
 
     @staticmethod
     def _replace_iter(string):
-        """Replaces action field IDs and meta-variable references."""
+        """Replaces action field IDs and meta-variable references.
+
+        Each placeholder found (see :func:`find_placeholders`) is evaluated
+        once, and replaced everywhere in the string by the same value.
+        """
         if not isinstance(string, six.string_types):
             return string
-        for k, v in list(_iterators.items()):
-            if k in string:
-                string = string.replace(k, six.next(v))
-        for k, v in _string_var_objs.items():
-            if k in string:
-                str_val = str(RequestCreator.replace_one_variable(v))
-                string = string.replace(k, str_val)
-        return string
+        parts = []
+        values = {}
+        last = 0
+        for start, key in find_placeholders(string):
+            value = values.get(key)
+            if value is None:
+                iterator = _iterators.get(key)
+                var_obj = _string_var_objs.get(key)
+                if iterator is not None:
+                    value = six.next(iterator)
+                elif var_obj is not None:
+                    value = str(RequestCreator.replace_one_variable(var_obj))
+                else:
+                    # Released since it was found
+                    continue
+                values[key] = value
+            parts.append(string[last:start])
+            parts.append(value)
+            last = start + len(key)
+        if not parts:
+            return string
+        parts.append(string[last:])
+        return "".join(parts)
 
     @staticmethod
     def _remove_braces(string):
@@ -0,0 +1,238 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import ssl
+import threading
+import time
+
+from oslo_config import cfg
+import requests
+from requests.adapters import HTTPAdapter
+from six.moves import http_cookiejar
+from urllib3 import connection
+from urllib3 import connectionpool
+
+from syntribos.clients.http import throttle
+
+CONF = cfg.CONF
+
+
+class ConnectionStats(object):
+    """Counts requests, and the connections and TLS sessions they used
+
+    :ivar int requests: Number of requests sent
+    :ivar int connections_opened: Number of new connections opened
+    :ivar int tls_sessions_resumed: Number of TLS handshakes which resumed an
+        earlier session, instead of doing a full handshake
+    :ivar int requests_avoided: Number of requests not sent, because an
+        identical request's response was shared (see
+        :mod:`syntribos.clients.http.response_cache`)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.connections_opened = 0
+            self.tls_sessions_resumed = 0
+            self.requests_avoided = 0
+
+    def increment(self, name, num=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + num)
+
+    def merge(self, stats):
+        """Adds the counts from a dict made by :meth:`to_dict`."""
+        for name in ("requests", "connections_opened",
+                     "tls_sessions_resumed", "requests_avoided"):
+            self.increment(name, stats.get(name, 0))
+
+    @property
+    def connections_reused(self):
+        """Number of requests sent over an already open connection."""
+        return max(0, self.requests - self.connections_opened)
+
+    def to_dict(self):
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": self.connections_reused,
+            "tls_sessions_resumed": self.tls_sessions_resumed,
+            "requests_avoided": self.requests_avoided
+        }
+
+
+stats = ConnectionStats()
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """SSL context which resumes the last TLS session with each host
+
+    Connections made with this context do not verify certificates, like every
+    other request syntribos sends.
+    """
+
+    def __init__(self, *args, **kwargs):
+        # The protocol is handled by SSLContext.__new__
+        super(ResumingSSLContext, self).__init__()
+        self.check_hostname = False
+        self.verify_mode = ssl.CERT_NONE
+        self.sessions = {}
+
+    def wrap_socket(self, sock, server_hostname=None, **kwargs):
+        if hasattr(ssl.SSLSocket, "session") and "session" not in kwargs:
+            kwargs["session"] = self.sessions.get(server_hostname)
+        sslsock = super(ResumingSSLContext, self).wrap_socket(
+            sock, server_hostname=server_hostname, **kwargs)
+        if getattr(sslsock, "session_reused", False):
+            stats.increment("tls_sessions_resumed")
+        self.save_session(sslsock)
+        return sslsock
+
+    def save_session(self, sslsock):
+        """Remembers the session of `sslsock`, to resume it later
+
+        With TLS 1.3, the session ticket only arrives after the handshake, so
+        this is called again before the connection is closed.
+        """
+        try:
+            session = sslsock.session
+        except (AttributeError, ValueError):
+            return
+        if session is not None:
+            self.sessions[sslsock.server_hostname] = session
+
+
+class _CountingConnectionMixin(object):
+    def connect(self):
+        stats.increment("connections_opened")
+        return super(_CountingConnectionMixin, self).connect()
+
+
+class CountingHTTPConnection(_CountingConnectionMixin,
+                             connection.HTTPConnection):
+    pass
+
+
+class CountingHTTPSConnection(_CountingConnectionMixin,
+                              connection.HTTPSConnection):
+    def close(self):
+        context = getattr(self, "ssl_context", None)
+        if self.sock is not None and hasattr(context, "save_session"):
+            context.save_session(self.sock)
+        super(CountingHTTPSConnection, self).close()
+
+
+class CountingHTTPConnectionPool(connectionpool.HTTPConnectionPool):
+    ConnectionCls = CountingHTTPConnection
+
+
+class CountingHTTPSConnectionPool(connectionpool.HTTPSConnectionPool):
+    ConnectionCls = CountingHTTPSConnection
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """Transport adapter keeping connections open between requests
+
+    Connections are pooled per scheme, host and port (by urllib3) and shared
+    by every thread; TLS connections resume earlier sessions with the host.
+    Requests wait for their host's :class:`throttle.HostLimiter`.
+    """
+
+    def __init__(self, pool_size=10, **kwargs):
+        self.ssl_context = ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        super(PooledHTTPAdapter, self).__init__(
+            pool_connections=pool_size, pool_maxsize=pool_size, **kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False,
+                         **pool_kwargs):
+        pool_kwargs["ssl_context"] = self.ssl_context
+        super(PooledHTTPAdapter, self).init_poolmanager(
+            connections, maxsize, block=block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool
+        }
+
+    def send(self, request, **kwargs):
+        limiter = throttle.get_limiter(request.url)
+        limiter.acquire()
+        stats.increment("requests")
+        start = time.time()
+        try:
+            resp = super(PooledHTTPAdapter, self).send(request, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            limiter.release(time.time() - start, failed=True)
+            raise
+        except Exception:
+            limiter.release(time.time() - start)
+            raise
+        limiter.release(time.time() - start,
+                        failed=resp.status_code in throttle.THROTTLE_STATUSES)
+        return resp
+
+
+class SessionPool(object):
+    """Hands out one :class:`requests.Session` per thread
+
+    All of the sessions share one :class:`PooledHTTPAdapter`, so that a
+    connection opened by one thread can be reused by every other. Sessions
+    never store cookies, so that each request is sent exactly as it was
+    built, as with :func:`requests.request`.
+
+    :param int pool_size: Connections kept open per host
+    """
+
+    def __init__(self, pool_size=10):
+        self.adapter = PooledHTTPAdapter(pool_size)
+        self.local = threading.local()
+
+    def get_session(self):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.cookies.set_policy(
+                http_cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+            session.mount("http://", self.adapter)
+            session.mount("https://", self.adapter)
+            self.local.session = session
+        return session
+
+    def close(self):
+        self.adapter.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_session():
+    """Returns the calling thread's session from the shared pool
+
+    The pool is sized by ``[syntribos] pool_size``, defaulting to the number
+    of threads, so every worker can keep a connection open to the target.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                try:
+                    size = (CONF.syntribos.pool_size or
+                            CONF.syntribos.threads)
+                except (cfg.NoSuchOptError, cfg.NoSuchGroupError):
+                    size = 10
+                _pool = SessionPool(max(1, size))
+    return _pool.get_session()
@@ -0,0 +1,202 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Responses shared by identical requests
+
+Test types often send byte-identical requests: the payload files of e.g.
+SQL_INJECTION, STRING_VALIDATION and USER_DEFINED overlap, and each test type
+fuzzes the same parameters. When ``[syntribos] response_cache`` is set, the
+response to each request is kept, keyed by its method, URL, headers, params
+and body, and handed to any later identical request instead of sending it
+again. Identical requests made at once share the one being sent.
+
+Each request sharing a response gets its own signals, computed from the
+response, so checks behave as if it had been sent.
+"""
+import collections
+import json
+import logging
+import threading
+
+from oslo_config import cfg
+import six
+
+import syntribos.checks.http as http_checks
+from syntribos.clients.http import pool
+from syntribos.signal import SignalHolder
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+
+
+def request_key(method, url, headers=None, params=None, data=None):
+    """Returns a hashable key identifying a request
+
+    :param str method: Request method
+    :param str url: URL to request
+    :param dict headers: Headers sent, including the client's defaults
+    :param dict params: Query parameters
+    :param data: Request body
+    """
+    parts = [method.upper(), url]
+    for part in (headers, params, data):
+        if not part:
+            part = None
+        elif isinstance(part, dict):
+            part = json.dumps(part, sort_keys=True, default=str)
+        elif not isinstance(part, (six.string_types, six.binary_type)):
+            part = repr(part)
+        parts.append(part)
+    return tuple(parts)
+
+
+class _InFlight(object):
+    """A request being sent, which identical requests wait for"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class ResponseCache(object):
+    """Keeps the responses to requests, and coalesces identical requests
+
+    Only responses are kept: a request which failed (e.g. timed out) is only
+    shared with the identical requests waiting for it, and sent again by
+    later ones.
+
+    :param int max_entries: Number of responses kept, the least recently
+        used being dropped first. 0 keeps every response
+    """
+
+    def __init__(self, max_entries=0):
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+        self.avoided = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def share(result):
+        """Returns a (response, signals) tuple for another request
+
+        The signals of a response are computed again, so that each request
+        gets its own; those of a failed request are copied.
+        """
+        response, signals = result
+        if response is None:
+            return response, SignalHolder(signals)
+        signals = SignalHolder()
+        signals.register(http_checks.check_status_code(response))
+        signals.register(http_checks.check_content_type(response))
+        return response, signals
+
+    def count_avoided(self, key):
+        """Counts a request which was not sent, sharing a response"""
+        with self._lock:
+            self.avoided += 1
+        pool.stats.increment("requests_avoided")
+        LOG.debug("Reusing response to %s %s", key[0], key[1])
+
+    def _touch(self, key):
+        """Returns the kept result for `key`, must hold the lock"""
+        result = self.entries.get(key)
+        if result is not None and self.max_entries:
+            self.entries[key] = self.entries.pop(key)
+        return result
+
+    def get(self, key):
+        """Returns the kept response to `key`, see :meth:`share`
+
+        :returns: tuple of (response, signals), or None if no response to
+            `key` is kept
+        """
+        with self._lock:
+            result = self._touch(key)
+        if result is None:
+            return None
+        self.count_avoided(key)
+        return self.share(result)
+
+    def put(self, key, result):
+        """Keeps `result`, a tuple of (response, signals), unless it failed"""
+        if result[0] is None:
+            return
+        with self._lock:
+            self.entries[key] = result
+            if self.max_entries:
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+
+    def send(self, key, send):
+        """Returns the result of `send`, unless `key` was already requested
+
+        :param tuple key: Key of the request, see :func:`request_key`
+        :param send: Callable sending the request, returning a tuple of
+            (response, signals)
+        :returns: tuple of (response, signals)
+        """
+        sender = False
+        with self._lock:
+            result = self._touch(key)
+            if result is None:
+                in_flight = self._in_flight.get(key)
+                sender = in_flight is None
+                if sender:
+                    in_flight = self._in_flight[key] = _InFlight()
+        if result is not None:
+            self.count_avoided(key)
+            return self.share(result)
+        if not sender:
+            in_flight.event.wait()
+            if in_flight.result is None:
+                return send()
+            self.count_avoided(key)
+            return self.share(in_flight.result)
+        try:
+            in_flight.result = send()
+            self.put(key, in_flight.result)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            in_flight.event.set()
+        return in_flight.result
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Returns the response cache of this process
+
+    :returns: A :class:`ResponseCache` keeping
+        ``[syntribos] response_cache_size`` responses, or None if
+        ``[syntribos] response_cache`` isn't set
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    if not CONF.syntribos.response_cache:
+                        return None
+                    size = CONF.syntribos.response_cache_size
+                except (cfg.NoSuchOptError, cfg.NoSuchGroupError):
+                    return None
+                _cache = ResponseCache(size)
+    return _cache
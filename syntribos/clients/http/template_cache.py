@@ -0,0 +1,149 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Parsed templates kept on disk between runs
+
+When ``[syntribos] template_cache`` is set, each parsed template is written
+to ``[syntribos] template_cache_dir`` (``cache/templates`` under the
+syntribos root by default), with the meta variables its placeholders stand
+for and the fuzzable positions found for it (see
+:class:`syntribos.tests.fuzz.datagen.FuzzIndex`). A later run parsing the
+same template, with the same endpoint and meta variables, loads it instead.
+
+Meta variables are kept unevaluated: those of type function or generator are
+called again when requests are made. Templates whose parsing calls functions
+(``CALL_EXTERNAL``, or meta variables used as keys being evaluated) are not
+kept, see :attr:`syntribos.clients.http.parser.VariableScope.volatile`.
+"""
+import copy
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+
+from oslo_config import cfg
+from six.moves import cPickle as pickle
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+
+# Changed whenever what is kept for a template, or how it is parsed, changes
+CACHE_VERSION = 2
+
+
+def template_hash(key):
+    """Returns the name of the cache entry of a template
+
+    :param tuple key: (template, endpoint, meta variables as JSON) tuple
+    """
+    content = json.dumps([CACHE_VERSION, list(sys.version_info[:2])] +
+                         list(key))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class TemplateCache(object):
+    """Parsed templates, one file per template in `directory`
+
+    :param str directory: Directory of the cache, made if needed
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.loaded = 0
+        self.saved = 0
+        self._lock = threading.Lock()
+
+    def get_path(self, key):
+        return os.path.join(self.directory, template_hash(key) + ".pickle")
+
+    def load(self, key):
+        """Returns what was kept for a template
+
+        :returns: dict of "request", "var_objs" (by placeholder) and
+            "indexes" (by part of the request), or None if the template
+            isn't kept, or can't be read
+        """
+        try:
+            with open(self.get_path(key), "rb") as fp:
+                entry = pickle.load(fp)
+        except (IOError, OSError):
+            return None
+        except Exception as e:
+            LOG.debug("Parsing template again, cache entry unusable: %s", e)
+            return None
+        if not isinstance(entry, dict) or entry.get("key") != list(key):
+            return None
+        with self._lock:
+            self.loaded += 1
+        return entry
+
+    def save(self, key, request, var_objs, indexes=None):
+        """Keeps a parsed template
+
+        :param tuple key: Key of the template, see :func:`template_hash`
+        :param request: The parsed request
+        :type request: :class:`syntribos.clients.http.parser.RequestObject`
+        :param dict var_objs: Meta variables of the request's placeholders
+        :param dict indexes: Fuzz indexes of the request's parts
+        """
+        var_objs = copy.deepcopy(var_objs)
+        for var_obj in var_objs.values():
+            # Functions are called again in each run
+            var_obj.function_return_value = None
+        entry = {"key": list(key), "request": request, "var_objs": var_objs,
+                 "indexes": dict(indexes or {})}
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory,
+                                            suffix=".tmp")
+            with os.fdopen(fd, "wb") as fp:
+                pickle.dump(entry, fp, pickle.HIGHEST_PROTOCOL)
+            # The entry is renamed into place, so it is never read half
+            # written
+            os.rename(tmp_path, self.get_path(key))
+        except (IOError, OSError, pickle.PicklingError) as e:
+            LOG.warning("Could not keep parsed template: %s", e)
+            return
+        with self._lock:
+            self.saved += 1
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Returns the template cache of this run
+
+    :returns: A :class:`TemplateCache`, or None if ``[syntribos]
+        template_cache`` isn't set
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    if not CONF.syntribos.template_cache:
+                        return None
+                    directory = CONF.syntribos.template_cache_dir
+                except (cfg.NoSuchOptError, cfg.NoSuchGroupError):
+                    return None
+                if not directory:
+                    from syntribos.utils import env as ENV
+                    directory = ENV.get_syntribos_path("cache", "templates")
+                _cache = TemplateCache(os.path.expanduser(directory))
+    return _cache
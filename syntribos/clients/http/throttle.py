@@ -0,0 +1,329 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Per-host concurrency and rate control for outgoing requests
+
+Every request syntribos sends, from either HTTP engine, first takes a slot
+from the :class:`HostLimiter` of its target host and gives it back with the
+request's latency once the response (or error) is in. A limiter caps how
+many requests are in flight to its host at once, and optionally how many
+are started per second (a token bucket).
+
+In "adaptive" mode, the concurrency of each host starts low and is raised
+while responses stay fast and error free, and lowered as soon as the host
+slows down, times out, or answers with 429 or 503, so that an overloaded
+target does not skew time-based checks.
+"""
+import logging
+import threading
+import time
+
+from oslo_config import cfg
+from six.moves.urllib.parse import urlsplit
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+# Responses telling the client to back off
+THROTTLE_STATUSES = (429, 503)
+
+
+class TokenBucket(object):
+    """Hands out `rate` tokens per second, up to `burst` at once
+
+    :param float rate: Tokens added per second
+    :param int burst: Maximum number of tokens stored up
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = max(1, burst or int(round(self.rate)))
+        self.tokens = float(self.burst)
+        self.last = time.time()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Takes a token, returns the seconds to wait before using it
+
+        Tokens may be reserved ahead of time, so concurrent callers are
+        spaced out instead of all waking up for the same token.
+        """
+        with self._lock:
+            now = time.time()
+            self.tokens = min(self.burst,
+                              self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+
+class HostLimiter(object):
+    """Limits the requests in flight to one host
+
+    :param str host: Host (and port) the limiter applies to
+    :param int max_concurrency: Most requests in flight at once
+    :param bool adaptive: Whether to adjust the concurrency to the host's
+        latency and error rate, starting from `min_concurrency`
+    :param int min_concurrency: Fewest requests in flight allowed at once
+        in adaptive mode
+    :param float rate: Most requests started per second; 0 for no limit
+    :param int burst: Requests which may be started at once, when the rate
+        is limited
+    """
+
+    window_min = 10
+    decrease_factor = 0.7
+    error_threshold = 0.1
+    # The median latency of a window is too high when it exceeds the lowest
+    # median seen by both this factor and this many seconds
+    latency_factor = 2.0
+    latency_slack = 0.05
+
+    def __init__(self, host, max_concurrency, adaptive=False,
+                 min_concurrency=1, rate=0, burst=None):
+        self.host = host
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency,
+                                          self.max_concurrency))
+        self.adaptive = adaptive
+        self.limit = (self.min_concurrency if adaptive
+                      else self.max_concurrency)
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.active = 0
+        self.slow_start = True
+        self.base_latency = None
+        self.samples = []
+        self.saturated = False
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._waiters = []
+        self.reset_counts()
+
+    def reset_counts(self):
+        """Resets the counts reported by :meth:`to_dict`."""
+        with self._lock:
+            self.peak = self.active
+            self.lowest = self.limit
+            self.throttled = 0
+            self.adjustments = 0
+
+    def acquire(self):
+        """Blocks until a request may be sent to the host."""
+        with self._lock:
+            if self.active >= self.limit:
+                self.throttled += 1
+                self.saturated = True
+            while self.active >= self.limit:
+                self._cond.wait()
+            self._enter()
+        self.wait_for_token()
+
+    def try_acquire(self, waiter):
+        """Takes a slot if one is free, without blocking
+
+        Otherwise, `waiter` is called (from the thread releasing a slot)
+        once a slot may have been freed, and this should be tried again.
+        Callers which got a slot must still wait :meth:`reserve` seconds.
+
+        :returns: True if a slot was taken
+        """
+        with self._lock:
+            if self.active < self.limit:
+                self._enter()
+                return True
+            self.throttled += 1
+            self.saturated = True
+            self._waiters.append(waiter)
+            return False
+
+    def reserve(self):
+        """Returns the seconds to wait for the host's rate limit."""
+        if self.bucket is None:
+            return 0
+        return self.bucket.reserve()
+
+    def wait_for_token(self):
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+    def release(self, latency, failed=False):
+        """Frees a slot, recording how the request went
+
+        :param float latency: Seconds the request took
+        :param bool failed: Whether the request timed out, failed to connect
+            or was answered with a status asking to back off
+        """
+        with self._lock:
+            self.active -= 1
+            if self.adaptive:
+                self.samples.append((latency, failed))
+                if len(self.samples) >= max(self.limit, self.window_min):
+                    self._adjust()
+            self._cond.notify(max(1, self.limit - self.active))
+            waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            waiter()
+
+    def _enter(self):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        if self.active >= self.limit:
+            self.saturated = True
+
+    def _adjust(self):
+        """Raises or lowers the limit after a window of responses."""
+        latencies = sorted(s[0] for s in self.samples)
+        median = latencies[len(latencies) // 2]
+        error_rate = sum(s[1] for s in self.samples) / float(len(self.samples))
+        if self.base_latency is None or median < self.base_latency:
+            self.base_latency = median
+        slow = (median > self.base_latency * self.latency_factor and
+                median - self.base_latency > self.latency_slack)
+
+        old_limit = self.limit
+        if error_rate > self.error_threshold or slow:
+            self.slow_start = False
+            self.limit = max(self.min_concurrency,
+                             int(self.limit * self.decrease_factor))
+        elif self.saturated:
+            if self.slow_start:
+                self.limit = min(self.max_concurrency, self.limit * 2)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1)
+        self.samples = []
+        self.saturated = False
+        if self.limit != old_limit:
+            self.adjustments += 1
+            self.lowest = min(self.lowest, self.limit)
+            LOG.info("Concurrency for %s: %d -> %d (median latency %.3fs, "
+                     "%d%% errors)", self.host, old_limit, self.limit,
+                     median, error_rate * 100)
+
+    def to_dict(self):
+        return {
+            "concurrency": self.limit,
+            "lowest": self.lowest,
+            "peak": self.peak,
+            "throttled": self.throttled,
+            "adjustments": self.adjustments
+        }
+
+
+class RateController(object):
+    """Keeps a :class:`HostLimiter` for each host requests are sent to
+
+    :param int max_concurrency: Most requests in flight to each host
+    :param str mode: "fixed" or "adaptive"
+    :param int min_concurrency: Fewest requests in flight to each host in
+        adaptive mode
+    :param float rate: Most requests started per second to each host; 0 for
+        no limit
+    :param int burst: Requests which may be started at once, when the rate
+        is limited
+    """
+
+    def __init__(self, max_concurrency, mode="fixed", min_concurrency=1,
+                 rate=0, burst=None):
+        self.max_concurrency = max_concurrency
+        self.mode = mode
+        self.min_concurrency = min_concurrency
+        self.rate = rate
+        self.burst = burst
+        self.limiters = {}
+        self.merged = {}
+        self._lock = threading.Lock()
+
+    def get_limiter(self, url):
+        """Returns the limiter for the host of `url`."""
+        host = urlsplit(url).netloc.rpartition("@")[2]
+        limiter = self.limiters.get(host)
+        if limiter is None:
+            with self._lock:
+                limiter = self.limiters.get(host)
+                if limiter is None:
+                    limiter = HostLimiter(
+                        host, self.max_concurrency,
+                        adaptive=self.mode == "adaptive",
+                        min_concurrency=self.min_concurrency,
+                        rate=self.rate, burst=self.burst)
+                    self.limiters[host] = limiter
+        return limiter
+
+    def reset_counts(self):
+        for limiter in list(self.limiters.values()):
+            limiter.reset_counts()
+
+    def merge(self, stats):
+        """Adds the host stats from a dict made by :meth:`to_dict`
+
+        Used for stats reported by other processes; the latest concurrency
+        of each host is kept, along with the lowest and peak seen.
+        """
+        with self._lock:
+            for host, host_stats in stats.items():
+                if host not in self.merged:
+                    self.merged[host] = dict(host_stats)
+                    continue
+                merged = self.merged[host]
+                merged["concurrency"] = host_stats["concurrency"]
+                merged["lowest"] = min(merged["lowest"],
+                                       host_stats["lowest"])
+                merged["peak"] = max(merged["peak"], host_stats["peak"])
+                for name in ("throttled", "adjustments"):
+                    merged[name] += host_stats[name]
+
+    def to_dict(self):
+        stats = dict(self.merged)
+        for host, limiter in list(self.limiters.items()):
+            stats[host] = limiter.to_dict()
+        return stats
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_controller():
+    """Returns the rate controller of this process
+
+    It is set up from the ``[syntribos]`` options: requests to each host are
+    capped at the number of threads (or ``async_concurrency`` with the
+    "asyncio" engine) in "fixed" mode, and kept between ``min_concurrency``
+    and that cap in "adaptive" mode. Worker processes (see
+    :mod:`syntribos.workers`) each have their own controller, so the limits
+    apply to each of them separately.
+    """
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                try:
+                    opts = CONF.syntribos
+                    max_concurrency = opts.threads
+                    if opts.http_engine == "asyncio":
+                        max_concurrency = max(max_concurrency,
+                                              opts.async_concurrency)
+                    _controller = RateController(
+                        max_concurrency, opts.concurrency,
+                        opts.min_concurrency, opts.rate_limit,
+                        opts.rate_burst)
+                except (cfg.NoSuchOptError, cfg.NoSuchGroupError):
+                    _controller = RateController(10)
+    return _controller
+
+
+def get_limiter(url):
+    """Returns the limiter for the host of `url`."""
+    return get_controller().get_limiter(url)
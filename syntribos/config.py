@@ -99,12 +99,33 @@ def sub_commands(sub_parser):
 
     sub_parser.add_parser("list_tests",
                           help=_("List all available tests"))
-    sub_parser.add_parser("run",
-                          help=_("Run syntribos with given config"
-                                 "options"))
+    run_parser = sub_parser.add_parser("run",
+                                       help=_("Run syntribos with given config"
+                                              "options"))
+    run_parser.add_argument(
+        "--resume", dest="resume", metavar="LOG_DIR",
+        help=_("Resume an interrupted run from the journal in its log "
+               "directory, running only the tests it had not completed"))
     sub_parser.add_parser("dry_run",
                           help=_("Dry run syntribos with given config"
                                  "options"))
+    coordinator_parser = sub_parser.add_parser(
+        "coordinator",
+        help=_("Run syntribos with given config options, handing out the "
+               "tests to workers started with the worker command"))
+    coordinator_parser.add_argument(
+        "--bind", dest="bind", default="127.0.0.1:7000",
+        help=_("HOST:PORT to listen for workers on"))
+    coordinator_parser.add_argument(
+        "--lease-timeout", dest="lease_timeout", type=float, default=60,
+        help=_("Seconds a worker may go without a heartbeat before its "
+               "tests are handed to another worker"))
+    worker_parser = sub_parser.add_parser(
+        "worker",
+        help=_("Run the tests handed out by a syntribos coordinator"))
+    worker_parser.add_argument(
+        "--coordinator", dest="coordinator", default="127.0.0.1:7000",
+        help=_("HOST:PORT of the coordinator"))
     sub_parser.add_parser("root",
                           help=_("Print syntribos root directory"))
 
@@ -181,6 +202,11 @@ def list_cli_opts():
                    default="LOW", choices=syntribos.RANKING,
                    help=_("Select a minimum confidence for reported "
                           "defects")),
+        cfg.IntOpt("workers", dest="workers", default=0, min=0,
+                   help=_("Number of worker processes to run templates in. "
+                          "Each process runs whole templates with its own "
+                          "HTTP client and threads; by default, everything "
+                          "runs in one process")),
         cfg.BoolOpt("stacktrace", dest="stacktrace", default=True,
                     help=_("Select if Syntribos outputs a stacktrace "
                            " if an exception is raised")),
@@ -216,16 +242,111 @@ def list_syntribos_opts():
                    sample_default="16",
                    help=_("Maximum number of threads syntribos spawns "
                           "(experimental)")),
+        cfg.IntOpt("max_in_flight", default=0,
+                   sample_default="32",
+                   help=_("Maximum number of generated test cases waiting "
+                          "to be run. Test cases are generated lazily, so "
+                          "this bounds the memory used by a run. Defaults to "
+                          "twice the number of threads")),
+        cfg.StrOpt("http_engine", default="requests",
+                   choices=["requests", "asyncio"],
+                   help=_("Engine used to send test requests. 'requests' "
+                          "sends each request from a worker thread; "
+                          "'asyncio' (Python 3 only) sends them from an "
+                          "event loop, allowing many more requests in flight "
+                          "than there are threads")),
+        cfg.IntOpt("async_concurrency", default=256,
+                   sample_default="256",
+                   help=_("Maximum number of requests in flight at once "
+                          "when using the 'asyncio' HTTP engine")),
+        cfg.IntOpt("pool_size", default=0,
+                   sample_default="16",
+                   help=_("Maximum number of keep-alive connections kept "
+                          "open to each host. Defaults to the number of "
+                          "threads")),
+        cfg.StrOpt("concurrency", default="fixed",
+                   choices=["fixed", "adaptive"],
+                   help=_("How many requests are sent to each host at once. "
+                          "'fixed' sends as many as there are threads (or "
+                          "async_concurrency with the 'asyncio' engine); "
+                          "'adaptive' starts at min_concurrency and raises "
+                          "it up to that limit while the host answers "
+                          "quickly, lowering it when the host slows down, "
+                          "times out or answers with 429 or 503. Limits "
+                          "apply to each process: with --workers, or "
+                          "several workers of a coordinator, each sends "
+                          "up to this many requests to a host")),
+        cfg.IntOpt("min_concurrency", default=1, min=1,
+                   help=_("Fewest requests sent to each host at once in "
+                          "'adaptive' concurrency mode")),
+        cfg.FloatOpt("rate_limit", default=0, min=0,
+                     help=_("Maximum number of requests started per second "
+                            "to each host by each process. 0 for no "
+                            "limit")),
+        cfg.IntOpt("rate_burst", default=0, min=0,
+                   help=_("Number of requests which may be started at once "
+                          "to a host when rate_limit is set. Defaults to "
+                          "one second's worth of requests")),
+        cfg.FloatOpt("baseline_refresh", default=0, min=0,
+                     help=_("Number of seconds the baseline response to a "
+                            "template is shared by its test types before "
+                            "being requested again. 0 shares it for the "
+                            "whole template")),
+        cfg.BoolOpt("share_payloads", default=True,
+                    help=_("Send a fuzzed request whose payload is found in "
+                           "the payload files of several of the selected "
+                           "test types once per template, and run the checks "
+                           "of every one of those test types on its "
+                           "response")),
+        cfg.BoolOpt("splice_body", default=True,
+                    help=_("Serialize a JSON or XML request body once, and "
+                           "make each fuzzed body by placing the encoded "
+                           "payload between the serialized parts around "
+                           "the fuzzed value")),
+        cfg.BoolOpt("response_cache", default=False,
+                    help=_("Share the response to a request with every "
+                           "identical request (same method, URL, headers and "
+                           "body) made during the run, instead of sending "
+                           "it again")),
+        cfg.IntOpt("response_cache_size", default=4096, min=0,
+                   help=_("Number of responses kept when response_cache is "
+                          "set, the least recently used being dropped "
+                          "first. 0 keeps every response")),
         cfg.Opt("templates", type=ContentType("r"),
                 default="",
                 sample_default="~/.syntribos/templates",
                 help=_("A directory of template files, or a single "
                        "template file, to test on the target API")),
+        cfg.BoolOpt("template_cache", default=False,
+                    help=_("Keep each parsed template on disk, keyed by a "
+                           "hash of the template and its meta variables, "
+                           "and load it from there in later runs instead of "
+                           "parsing it again. Templates whose parsing calls "
+                           "functions (CALL_EXTERNAL, or function, "
+                           "generator and config meta variables used as "
+                           "keys) are always parsed")),
+        cfg.StrOpt("template_cache_dir", default="",
+                   sample_default="~/.syntribos/cache/templates",
+                   help=_("Directory of the template cache, cache/templates "
+                          "under the syntribos root by default")),
+        cfg.IntOpt("compile_threads", default=4, min=0,
+                   sample_default="4",
+                   help=_("Number of threads parsing the templates before "
+                          "any of them is run. Parse errors of every "
+                          "template are reported together, and those "
+                          "templates skipped. Templates calling functions "
+                          "(e.g. to get a token) are only parsed when they "
+                          "are run. 0 parses each template as it is run")),
         cfg.StrOpt("payloads", default="",
                    sample_default="~/.syntribos/data",
                    help=_(
                        "The location where we can find syntribos'"
                        "payloads")),
+        cfg.IntOpt("payload_mmap_size", default=64, min=0,
+                   help=_("Payload files of at least this many MiB are "
+                          "memory-mapped and read line by line as the tests "
+                          "go, instead of being loaded into memory at once. "
+                          "0 to always load them at once")),
         cfg.MultiStrOpt("exclude_results",
                         default=[""],
                         sample_default=["500_errors", "length_diff"],
@@ -0,0 +1,252 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Splits a run between a coordinator and workers connected over sockets
+
+The coordinator (``syntribos coordinator``) hands out units of work, each
+one test type to run against one template, to any number of workers
+(``syntribos worker --coordinator HOST:PORT``), possibly on other machines.
+
+Messages are JSON objects, one per line. A worker asks for work with
+``{"type": "get"}`` and is answered with a ``unit``, ``wait`` or ``done``
+message. While it runs a unit, the worker sends ``heartbeat`` messages to
+renew its lease on the unit, and finally sends a ``result``. If a worker
+disconnects, or lets its lease expire, its units are handed out again.
+"""
+import collections
+import json
+import logging
+import socket
+import threading
+import time
+
+from six.moves import socketserver
+
+LOG = logging.getLogger(__name__)
+
+
+def parse_address(address):
+    """Splits a ``HOST:PORT`` string into a (host, port) tuple."""
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def send_message(wfile, message):
+    wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+    wfile.flush()
+
+
+def read_message(rfile):
+    """Reads a message, returns None once the connection is closed."""
+    line = rfile.readline()
+    if not line:
+        return None
+    return json.loads(line.decode("utf-8"))
+
+
+class Coordinator(object):
+    """Hands out units of work to workers and collects their results
+
+    :param list units: Units of work; JSON-serializable dicts
+    :param tuple address: (host, port) to listen on. Port 0 picks a free port
+    :param float lease_timeout: Seconds a worker may hold a unit without
+        sending a heartbeat, before the unit is handed out again
+    :param on_result: Called with each unit and its result, once per unit
+    """
+
+    def __init__(self, units, address=("127.0.0.1", 0), lease_timeout=60,
+                 on_result=None):
+        self.units = dict(enumerate(units))
+        self.pending = collections.deque(sorted(self.units))
+        self.leases = {}
+        self.completed = set()
+        self.lease_timeout = lease_timeout
+        self.on_result = on_result
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        if not self.units:
+            self.finished.set()
+
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                coordinator.handle(self.rfile, self.wfile,
+                                   "{0}:{1}".format(*self.client_address))
+
+        self.server = socketserver.ThreadingTCPServer(address, Handler)
+        self.server.daemon_threads = True
+        self.address = self.server.server_address
+
+    def start(self):
+        """Starts listening for workers in a background thread."""
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def wait(self, interval=1):
+        """Blocks until every unit has a result, re-issuing expired leases."""
+        while not self.finished.wait(interval):
+            self.expire_leases()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def handle(self, rfile, wfile, worker):
+        """Serves the messages of one connected worker."""
+        LOG.debug("Worker %s connected", worker)
+        try:
+            while True:
+                message = read_message(rfile)
+                if message is None:
+                    break
+                if message["type"] == "get":
+                    send_message(wfile, self.lease(worker))
+                elif message["type"] == "heartbeat":
+                    self.renew(worker)
+                elif message["type"] == "result":
+                    self.complete(message["id"], message["result"])
+        except (IOError, ValueError, KeyError) as exc:
+            LOG.warning("Lost worker %s: %s", worker, exc)
+        finally:
+            self.release(worker)
+            LOG.debug("Worker %s disconnected", worker)
+
+    def lease(self, worker):
+        """Returns the message answering a worker's request for work."""
+        with self.lock:
+            if self.finished.is_set():
+                return {"type": "done"}
+            if not self.pending:
+                return {"type": "wait", "delay": 1}
+            unit_id = self.pending.popleft()
+            self.leases[unit_id] = (worker, time.time() + self.lease_timeout)
+            return {"type": "unit", "id": unit_id,
+                    "unit": self.units[unit_id],
+                    "heartbeat": self.lease_timeout / 3.0}
+
+    def renew(self, worker):
+        with self.lock:
+            expiry = time.time() + self.lease_timeout
+            for unit_id, (owner, _) in list(self.leases.items()):
+                if owner == worker:
+                    self.leases[unit_id] = (owner, expiry)
+
+    def complete(self, unit_id, result):
+        """Records the result of a unit; later results for it are ignored."""
+        with self.lock:
+            if unit_id in self.completed:
+                return
+            self.completed.add(unit_id)
+            self.leases.pop(unit_id, None)
+            if unit_id in self.pending:
+                self.pending.remove(unit_id)
+            if self.on_result:
+                self.on_result(self.units[unit_id], result)
+            if len(self.completed) == len(self.units):
+                self.finished.set()
+
+    def release(self, worker):
+        """Hands out the units leased by `worker` again."""
+        with self.lock:
+            for unit_id, (owner, _) in list(self.leases.items()):
+                if owner == worker:
+                    del self.leases[unit_id]
+                    self.pending.appendleft(unit_id)
+
+    def expire_leases(self):
+        with self.lock:
+            now = time.time()
+            for unit_id, (owner, expiry) in list(self.leases.items()):
+                if expiry < now:
+                    LOG.warning("Lease of %s on unit %s expired", owner,
+                                unit_id)
+                    del self.leases[unit_id]
+                    self.pending.appendleft(unit_id)
+
+
+class Worker(object):
+    """Runs units of work handed out by a :class:`Coordinator`
+
+    :param tuple address: (host, port) of the coordinator
+    :param run_unit: Called with each unit; returns its JSON-serializable
+        result
+    :param int retries: Attempts made to connect to the coordinator
+    """
+
+    def __init__(self, address, run_unit, retries=10):
+        self.address = address
+        self.run_unit = run_unit
+        self.retries = retries
+        self.write_lock = threading.Lock()
+
+    def connect(self):
+        for attempt in range(self.retries):
+            try:
+                return socket.create_connection(self.address)
+            except socket.error:
+                if attempt == self.retries - 1:
+                    raise
+                time.sleep(1)
+
+    def send(self, wfile, message):
+        with self.write_lock:
+            send_message(wfile, message)
+
+    def run(self):
+        """Runs units until the coordinator is done or goes away
+
+        :returns: Number of units run
+        """
+        sock = self.connect()
+        rfile, wfile = sock.makefile("rb"), sock.makefile("wb")
+        num_units = 0
+        try:
+            while True:
+                self.send(wfile, {"type": "get"})
+                message = read_message(rfile)
+                if message is None or message["type"] == "done":
+                    break
+                elif message["type"] == "wait":
+                    time.sleep(message["delay"])
+                    continue
+                result = self.run_with_heartbeat(
+                    wfile, message["unit"], message["heartbeat"])
+                self.send(wfile, {"type": "result", "id": message["id"],
+                                  "result": result})
+                num_units += 1
+        except (IOError, socket.error) as exc:
+            LOG.warning("Lost coordinator: %s", exc)
+        finally:
+            sock.close()
+        return num_units
+
+    def run_with_heartbeat(self, wfile, unit, interval):
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(interval):
+                try:
+                    self.send(wfile, {"type": "heartbeat"})
+                except (IOError, socket.error):
+                    return
+
+        thread = threading.Thread(target=heartbeat)
+        thread.daemon = True
+        thread.start()
+        try:
+            return self.run_unit(unit)
+        finally:
+            stop.set()
+            thread.join()
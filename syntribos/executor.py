@@ -0,0 +1,105 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Runs test cases directly, without building a unittest suite for each
+
+A test case is an instance of a :class:`syntribos.tests.base.BaseTestCase`
+subclass, made by :meth:`~syntribos.tests.base.BaseTestCase.new_case`. Running
+it sends its request, runs its checks and reports the outcome to a
+:class:`unittest.TestResult`:
+
+- a failure, if the checks registered any issues
+- an error, if the checks raised, or the request ended with an exception
+- a success, otherwise
+
+Test classes which customize unittest's fixtures (``setUpClass``, ``setUp``,
+etc.) are still run through :mod:`unittest`, see :func:`run_with_unittest`.
+"""
+import sys
+import unittest
+
+from syntribos.tests import base
+
+UNITTEST_FIXTURES = ("setUpClass", "tearDownClass", "setUp", "tearDown",
+                     "run_test_case")
+
+_uses_unittest = {}
+
+
+def uses_unittest(test_class):
+    """Checks whether `test_class` has to be run through unittest
+
+    :param test_class: A subclass of :class:`syntribos.tests.base.BaseTestCase`
+    :returns: True if a class between `test_class` and
+        :class:`syntribos.tests.base.BaseTestCase` defines one of
+        `UNITTEST_FIXTURES`
+    """
+    try:
+        return _uses_unittest[test_class]
+    except KeyError:
+        pass
+    found = False
+    for klass in test_class.__mro__:
+        if klass is base.BaseTestCase:
+            break
+        if any(name in vars(klass) for name in UNITTEST_FIXTURES):
+            found = True
+            break
+    _uses_unittest[test_class] = found
+    return found
+
+
+def run_case(case, result):
+    """Runs a test case, and reports its outcome to `result`
+
+    :param case: The test case
+    :type case: :class:`syntribos.tests.base.BaseTestCase`
+    :param result: Result the outcome is reported to
+    :type result: :class:`unittest.TestResult`
+    """
+    if uses_unittest(type(case)):
+        run_with_unittest(case, result)
+        return
+    result.startTest(case)
+    try:
+        case.send_test_request()
+        if not case.dead:
+            case.test_case()
+            if case.failures:
+                result.addFailure(case, (AssertionError, AssertionError(),
+                                         None))
+                return
+        case.check_exceptions()
+        result.addSuccess(case)
+    except Exception:
+        result.addError(case, sys.exc_info())
+    finally:
+        case.log_signals()
+        result.stopTest(case)
+
+
+def run_with_unittest(case, result):
+    """Runs a test case in a unittest suite of its own
+
+    The attributes of `case` are set on a new subclass of its class, so that
+    its ``setUpClass`` and ``tearDownClass`` see them, as they did when every
+    case was a class of its own.
+    """
+    test_class = type(case)
+    name = base.replace_invalid_characters(
+        case.case_name or test_class.__name__)
+    case_class = type(name, (test_class, ), dict(vars(case)))
+    case_class.__module__ = test_class.__module__
+    suite = unittest.TestSuite()
+    suite.addTest(case_class("run_test_case"))
+    suite.run(result)
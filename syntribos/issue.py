@@ -11,6 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from syntribos.signal import SynSignal
 
 
 class Issue(object):
@@ -75,6 +76,66 @@ class Issue(object):
 
         return out
 
+    def to_record(self):
+        """Convert the issue to a picklable, JSON-serializable dict.
+
+        The record holds what :class:`syntribos.result.IssueTestResult` needs
+        to report the issue; see :meth:`from_record`.
+
+        :rtype: `dict`
+        :returns: dictionary of issue data
+        """
+        record = {
+            "defect_type": self.defect_type,
+            "severity": self.severity,
+            "description": self.description,
+            "confidence": self.confidence,
+            "target": getattr(self, "target", None),
+            "path": getattr(self, "path", None),
+            "test_type": getattr(self, "test_type", None),
+            "template_path": getattr(self, "template_path", None),
+            "content_type": getattr(self, "content_type", None),
+            "impacted_parameter": None
+        }
+        for sig_type in ("init_signals", "test_signals", "diff_signals"):
+            record[sig_type] = [s.slug for s in getattr(self, sig_type) or []]
+        param = self.impacted_parameter
+        if param:
+            record["impacted_parameter"] = {
+                "method": param.method,
+                "location": param.location,
+                "name": param.name,
+                "value": param.fuzz_string
+            }
+        return record
+
+    @classmethod
+    def from_record(cls, record):
+        """Rebuild an issue from a dict made by :meth:`to_record`.
+
+        Signals are rebuilt from their slugs only.
+
+        :param dict record: dictionary of issue data
+        :rtype: :class:`Issue`
+        """
+        from syntribos.tests.fuzz.base_fuzz import ImpactedParameter
+
+        signals = {}
+        for sig_type in ("init_signals", "test_signals", "diff_signals"):
+            signals[sig_type] = [SynSignal(slug=slug, strength=1.0)
+                                 for slug in record[sig_type]]
+        issue = cls(defect_type=record["defect_type"],
+                    severity=record["severity"],
+                    description=record["description"],
+                    confidence=record["confidence"], **signals)
+        for attr in ("target", "path", "test_type", "template_path",
+                     "content_type"):
+            setattr(issue, attr, record[attr])
+        param = record["impacted_parameter"]
+        if param:
+            issue.impacted_parameter = ImpactedParameter(**param)
+        return issue
+
     def get_details(self):
         """Returns the most relevant information needed for output.
 
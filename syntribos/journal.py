@@ -0,0 +1,145 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Journal of the work a run has completed, to resume it after a crash
+
+The journal is a file of JSON objects, one per line, kept in the run's log
+directory and appended to as the run goes:
+
+- ``{"run": {...}}`` describes the options the run was started with
+- ``{"case": [template, test type, index], "records": [...]}`` holds the
+  outcome of one test case, as records made by
+  :class:`syntribos.result.ResultRecorder`
+- ``{"test_type": [template, test type]}`` marks that every case of a test
+  type has been run against a template
+- ``{"template": template, "result": {...}}`` holds the outcome of a
+  template run by a worker process (see :mod:`syntribos.workers`)
+
+``syntribos run --resume LOG_DIR`` reads the journal back, adds the
+recorded outcomes to the result instead of running those cases again, and
+appends the outcomes of the remaining cases to the same journal.
+"""
+import json
+import logging
+import os
+import threading
+
+LOG = logging.getLogger(__name__)
+
+
+class Journal(object):
+    """Records completed test cases in a log directory
+
+    :param str log_path: Log directory of the run
+    """
+
+    file_name = "journal.jsonl"
+
+    def __init__(self, log_path):
+        self.path = os.path.join(log_path, self.file_name)
+        self.run_info = None
+        self.cases = {}
+        self.test_types = set()
+        self.templates = {}
+        self._lock = threading.Lock()
+        self.load()
+        self.file = open(self.path, "a")
+
+    def load(self):
+        """Reads the entries of an existing journal
+
+        A line cut short by a crash is dropped, so that new entries start on
+        a line of their own.
+        """
+        if not os.path.exists(self.path):
+            return
+        good_size = 0
+        with open(self.path, "rb") as journal_file:
+            for line in journal_file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    self._load_entry(json.loads(line.decode("utf-8")))
+                except (ValueError, KeyError, TypeError):
+                    break
+                good_size += len(line)
+        if good_size < os.path.getsize(self.path):
+            LOG.warning("Dropping incomplete entries at the end of %s",
+                        self.path)
+            with open(self.path, "r+b") as journal_file:
+                journal_file.truncate(good_size)
+
+    def _load_entry(self, entry):
+        if "case" in entry:
+            template, test_type, index = entry["case"]
+            self.cases.setdefault((template, test_type), {})[index] = (
+                entry["records"])
+        elif "test_type" in entry:
+            self.test_types.add(tuple(entry["test_type"]))
+        elif "template" in entry:
+            self.templates[entry["template"]] = entry["result"]
+        elif "run" in entry:
+            self.run_info = entry["run"]
+
+    def write(self, entry):
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            self.file.write(line)
+            self.file.flush()
+
+    def start_run(self, run_info):
+        """Records the options of the run, or checks them when resuming
+
+        :param dict run_info: Options which must not change between the run
+            and its resumption
+        :returns: True if the journal was started with different options
+        """
+        if self.run_info is None:
+            self.run_info = run_info
+            self.write({"run": run_info})
+            return False
+        return self.run_info != run_info
+
+    def get_case(self, template, test_type, index):
+        """Returns the records of a completed case, or None"""
+        return self.cases.get((template, test_type), {}).get(index)
+
+    def add_case(self, template, test_type, index, records):
+        self.write({"case": [template, test_type, index],
+                    "records": records})
+
+    def is_test_type_done(self, template, test_type):
+        return (template, test_type) in self.test_types
+
+    def get_test_type_records(self, template, test_type):
+        """Returns the records of each case of a completed test type"""
+        cases = self.cases.get((template, test_type), {})
+        return [cases[index] for index in sorted(cases)]
+
+    def add_test_type(self, template, test_type):
+        with self._lock:
+            if (template, test_type) in self.test_types:
+                return
+            self.test_types.add((template, test_type))
+        self.write({"test_type": [template, test_type]})
+
+    def get_template(self, template):
+        """Returns the result of a template run by a worker, or None"""
+        return self.templates.get(template)
+
+    def add_template(self, template, result):
+        self.write({"template": template, "result": result})
+
+    def close(self):
+        with self._lock:
+            self.file.close()
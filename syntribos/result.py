@@ -20,6 +20,8 @@ from oslo_config import cfg
 
 import syntribos
 from syntribos._i18n import _
+from syntribos.clients.http import pool
+from syntribos.clients.http import throttle
 from syntribos.formatters.json_formatter import JSONFormatter
 import syntribos.utils.remotes
 
@@ -86,9 +88,24 @@ class IssueTestResult(unittest.TextTestResult):
         :param test: The test that has failed
         :type test: :class:`syntribos.tests.base.BaseTestCase`
         :param tuple err: Tuple of format ``(type, value, traceback)``
+        :returns: Number of unique failures added by this test
+        :rtype: int
         """
-        lock.acquire()
-        for issue in test.failures:
+        return self.add_issues(test.failures)
+
+    def add_issues(self, issues):
+        """Adds each :class:`syntribos.issue.Issue` to the failures
+
+        :param list issues: The issues found by a test
+        :returns: Number of unique failures added
+        :rtype: int
+        """
+        with lock:
+            return self._add_issues(issues)
+
+    def _add_issues(self, issues):
+        new_failures = 0
+        for issue in issues:
             self.raw_issues.append(issue)
             defect_type = issue.defect_type
             if any([
@@ -181,6 +198,7 @@ class IssueTestResult(unittest.TextTestResult):
                     failure_obj["instances"].append(instance_obj)
                     self.stats["unique_failures"] += 1
                     self.output["stats"]["severity"][sev_rating] += 1
+                    new_failures += 1
             else:
                 instance_obj = None
                 for i in failure_obj["instances"]:
@@ -203,7 +221,8 @@ class IssueTestResult(unittest.TextTestResult):
                     failure_obj["instances"].append(instance_obj)
                     self.stats["unique_failures"] += 1
                     self.output["stats"]["severity"][sev_rating] += 1
-        lock.release()
+                    new_failures += 1
+        return new_failures
 
     def addError(self, test, err):
         """Duplicates parent class addError functionality.
@@ -212,25 +231,59 @@ class IssueTestResult(unittest.TextTestResult):
         :type test: :class:`syntribos.tests.base.BaseTestCase`
         :param err:
         :type tuple: Tuple of format ``(type, value, traceback)``
+        :returns: Number of errors added to the stats (0 or 1)
+        :rtype: int
+        """
+        err_str = "{}: {}".format(err[0].__name__, str(err[1]))
+        stacktrace = traceback.format_exception(*err, limit=0)
+        return self.add_error(self.getDescription(test), err_str,
+                              [x.strip() for x in stacktrace])
+
+    def add_error(self, description, err_str, stacktrace=None):
+        """Adds an error raised by a test to the errors
+
+        :param str description: Description of the test
+        :param str err_str: Name and message of the exception
+        :param list stacktrace: Lines of the exception's stacktrace
+        :returns: Number of errors added to the stats (0 or 1)
+        :rtype: int
         """
         with lock:
-            err_str = "{}: {}".format(err[0].__name__, str(err[1]))
             for e in self.errors:
                 if e['error'] == err_str:
-                    if self.getDescription(test) in e['test']:
-                        return
-                    e['test'].append(self.getDescription(test))
+                    if description in e['test']:
+                        return 0
+                    e['test'].append(description)
                     self.stats["errors"] += 1
-                    return
-            stacktrace = traceback.format_exception(*err, limit=0)
+                    return 1
             _e = {
-                "test": [self.getDescription(test)],
+                "test": [description],
                 "error": err_str
             }
-            if CONF.stacktrace:
-                _e["stacktrace"] = [x.strip() for x in stacktrace]
+            if CONF.stacktrace and stacktrace:
+                _e["stacktrace"] = stacktrace
             self.errors.append(_e)
             self.stats["errors"] += 1
+            return 1
+
+    def add_record(self, record):
+        """Adds the outcome of a test run by another process
+
+        :param dict record: A record made by :class:`ResultRecorder`
+        :returns: tuple of (unique failures, errors) added
+        """
+        if record.get("ran", True):
+            with lock:
+                self.testsRun += 1
+        if record["outcome"] == "failure":
+            issues = [syntribos.Issue.from_record(r)
+                      for r in record["issues"]]
+            return self.add_issues(issues), 0
+        elif record["outcome"] == "error":
+            return 0, self.add_error(record["test"], record["error"],
+                                     record.get("stacktrace"))
+        self.addSuccess(None)
+        return 0, 0
 
     def addSuccess(self, test):
         """Duplicates parent class addSuccess functionality.
@@ -252,10 +305,13 @@ class IssueTestResult(unittest.TextTestResult):
         formatter = formatter_types[output_format.lower()]
         formatter.report(self.output)
 
-    def print_result(self, start_time):
+    def print_result(self, start_time, log_path=None):
         """Prints test summary/stats (e.g. # failures) to stdout."""
+        self.output["stats"]["connections"] = pool.stats.to_dict()
+        self.output["stats"]["concurrency"] = (
+            throttle.get_controller().to_dict())
         self.printErrors(CONF.output_format)
-        self.print_log_path_and_stats(start_time)
+        self.print_log_path_and_stats(start_time, log_path)
 
     def print_log_path_and_stats(self, start_time, log_path):
         """Print the path to the log folder for this run."""
@@ -273,7 +329,127 @@ class IssueTestResult(unittest.TextTestResult):
                   e=num_err,
                   fsuff="s" * bool(num_fail - 1),
                   esuff="s" * bool(num_err - 1)))
+        conn_stats = self.output["stats"].get("connections")
+        if conn_stats and conn_stats["requests"]:
+            print("Total: {r} request{rsuff} over {c} connection{csuff} "
+                  "({u} reused, {t} TLS session{tsuff} resumed)".format(
+                      r=conn_stats["requests"],
+                      c=conn_stats["connections_opened"],
+                      u=conn_stats["connections_reused"],
+                      t=conn_stats["tls_sessions_resumed"],
+                      rsuff="s" * bool(conn_stats["requests"] - 1),
+                      csuff="s" * bool(conn_stats["connections_opened"] - 1),
+                      tsuff="s" * bool(
+                          conn_stats["tls_sessions_resumed"] - 1)))
+        if conn_stats and conn_stats.get("requests_avoided"):
+            print("Total: {a} request{asuff} avoided by sharing the response "
+                  "to an identical request".format(
+                      a=conn_stats["requests_avoided"],
+                      asuff="s" * bool(conn_stats["requests_avoided"] - 1)))
+        concurrency = self.output["stats"].get("concurrency") or {}
+        for host in sorted(concurrency):
+            host_stats = concurrency[host]
+            print("Total: {h} concurrency {c} (lowest {l}, peak {p}), "
+                  "{t} request{tsuff} throttled".format(
+                      h=host, c=host_stats["concurrency"],
+                      l=host_stats["lowest"], p=host_stats["peak"],
+                      t=host_stats["throttled"],
+                      tsuff="s" * bool(host_stats["throttled"] - 1)))
         if log_path:
             print(syntribos.SEP)
             print(_("LOG PATH...: %s") % log_path)
             print(syntribos.SEP)
+
+
+class JobResult(object):
+    """Per-work-item view of a shared :class:`IssueTestResult`
+
+    The scheduler runs work items from many templates and test types at once,
+    so the global stats can no longer be diffed to find out what a single test
+    type found. A `JobResult` is handed to each test suite instead: it
+    forwards everything to the shared result, while counting the unique
+    failures and errors caused by this item alone.
+
+    It also keeps unittest's per-run bookkeeping (e.g. the previous test
+    class) local, so concurrent suites don't see each other's state. If a
+    `recorder` is given, every outcome is also passed on to it, so that it
+    can be written to the run's journal.
+    """
+
+    def __init__(self, result, recorder=None):
+        self._result = result
+        self.recorder = recorder
+        self.failures = 0
+        self.errors = 0
+        self.shouldStop = False
+        self._previousTestClass = None
+        self._testRunEntered = False
+        self._moduleSetUpFailed = False
+
+    def __getattr__(self, name):
+        return getattr(self._result, name)
+
+    def addFailure(self, test, err):
+        self.failures += self._result.addFailure(test, err) or 0
+        if self.recorder is not None:
+            self.recorder.addFailure(test, err)
+
+    def addError(self, test, err):
+        self.errors += self._result.addError(test, err) or 0
+        if self.recorder is not None:
+            self.recorder.addError(test, err)
+
+    def addSuccess(self, test):
+        self._result.addSuccess(test)
+        if self.recorder is not None:
+            self.recorder.addSuccess(test)
+
+
+class ResultRecorder(unittest.TestResult):
+    """Records the outcome of each test, to be added to a result elsewhere
+
+    Worker processes run tests against a `ResultRecorder` instead of an
+    :class:`IssueTestResult`. Each outcome is kept as a plain, picklable
+    record, which the parent process passes to
+    :meth:`IssueTestResult.add_record`, so that unique failures and errors
+    are counted across all workers.
+    """
+
+    def __init__(self):
+        super(ResultRecorder, self).__init__()
+        self.records = []
+        self._lock = threading.Lock()
+
+    def getDescription(self, test):
+        doc_first_line = test.shortDescription()
+        if doc_first_line:
+            return "\n".join((str(test), doc_first_line))
+        return str(test)
+
+    def _record(self, test, outcome, **kwargs):
+        record = {
+            "test": self.getDescription(test),
+            "test_type": getattr(test, "test_name", None),
+            "outcome": outcome,
+            # Errors raised while setting up a test class are reported
+            # without the test being run
+            "ran": isinstance(test, unittest.TestCase)
+        }
+        record.update(kwargs)
+        with self._lock:
+            self.records.append(record)
+
+    def addFailure(self, test, err):
+        self._record(test, "failure",
+                     issues=[i.to_record() for i in test.failures])
+        return 1
+
+    def addError(self, test, err):
+        stacktrace = traceback.format_exception(*err, limit=0)
+        self._record(test, "error",
+                     error="{}: {}".format(err[0].__name__, str(err[1])),
+                     stacktrace=[x.strip() for x in stacktrace])
+        return 1
+
+    def addSuccess(self, test):
+        self._record(test, "success")
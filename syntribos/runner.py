@@ -20,17 +20,25 @@ import threading
 import time
 import traceback
 import unittest
-from multiprocessing.dummy import Pool as ThreadPool
 
 from oslo_config import cfg
 from six.moves import input
 
 import syntribos.config
+import syntribos.executor
+from syntribos.journal import Journal
 import syntribos.result
+from syntribos.scheduler import Job
+from syntribos.scheduler import Scheduler
 import syntribos.tests as tests
 import syntribos.tests.base
 from syntribos._i18n import _
+from syntribos.clients.http import baseline
+from syntribos.clients.http import parser
+from syntribos.clients.http import pool
+from syntribos.clients.http import throttle
 from syntribos.formatters.json_formatter import JSONFormatter
+from syntribos.tests.fuzz import fanout
 from syntribos.utils import cleanup
 from syntribos.utils import cli as cli
 from syntribos.utils import env as ENV
@@ -42,6 +50,63 @@ user_base_dir = None
 CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 lock = threading.Lock()
+try:
+    import contextvars
+except ImportError:
+    contextvars = None
+# Attributes describing the baseline request of a test class, which must be
+# pinned on each generated test case, as the test class moves on to the next
+# template while its cases are still queued
+BASELINE_ATTRS = ("init_req", "init_resp", "init_signals",
+                  "prepared_init_req", "template_path", "dead")
+
+
+class TemplateLogHandler(logging.Handler):
+    """Routes log records to the log file of the template being worked on
+
+    Cases from several templates run at the same time, so instead of swapping
+    the root logger's handler for every template, each thread (or asyncio
+    task, where context variables are available) records which template it
+    is working on and its records are written to that template's log file.
+    """
+
+    def __init__(self):
+        super(TemplateLogHandler, self).__init__()
+        self.handlers = {}
+        self.local = threading.local()
+        self.current = None
+        if contextvars is not None:
+            self.current = contextvars.ContextVar("template", default=None)
+        self.default = None
+
+    def add_template(self, template_name, handler):
+        self.handlers[template_name] = handler
+        self.default = template_name
+        self.set_template(template_name)
+
+    def remove_template(self, template_name):
+        handler = self.handlers.pop(template_name, None)
+        if handler:
+            handler.close()
+
+    def set_template(self, template_name):
+        if self.current is not None:
+            self.current.set(template_name)
+        else:
+            self.local.template = template_name
+
+    def get_template(self):
+        if self.current is not None:
+            return self.current.get() or self.default
+        return getattr(self.local, "template", self.default)
+
+    def emit(self, record):
+        template_name = self.get_template()
+        handler = self.handlers.get(template_name)
+        if handler is None:
+            handler = self.handlers.get(self.default)
+        if handler is not None:
+            handler.handle(record)
 
 
 class Runner(object):
@@ -53,7 +118,11 @@ class Runner(object):
     """
 
     log_path = ""
+    log_mode = "w"
     current_test_id = 1000
+    scheduler = None
+    journal = None
+    log_handler = TemplateLogHandler()
 
     @classmethod
     def list_tests(cls):
@@ -116,17 +185,25 @@ class Runner(object):
         return (i for i in included)
 
     @classmethod
-    def get_logger(cls, template_name):
-        """Updates the logger handler for LOG."""
-        template_name = template_name.replace(os.path.sep, "::")
-        template_name = template_name.replace(".", "_")
-        log_file = "{0}.log".format(template_name)
+    def get_logger(cls, template_name, mode=None):
+        """Updates the logger handler for LOG.
+
+        :param str template_name: Template whose log file records are
+            written to
+        :param str mode: Mode to open the log file with; log files are
+            appended to when resuming a run
+        """
+        mode = mode or cls.log_mode
+        file_name = template_name.replace(os.path.sep, "::")
+        file_name = file_name.replace(".", "_")
+        log_file = "{0}.log".format(file_name)
         if not cls.log_path:
             cls.log_path = ENV.get_log_dir_name()
         log_file = os.path.join(cls.log_path, log_file)
-        log_handle = logging.FileHandler(log_file, 'w')
+        log_handle = logging.FileHandler(log_file, mode)
+        cls.log_handler.add_template(template_name, log_handle)
         LOG = logging.getLogger()
-        LOG.handlers = [log_handle]
+        LOG.handlers = [cls.log_handler]
         LOG.setLevel(logging.DEBUG)
         logging.getLogger("urllib3").setLevel(logging.WARNING)
         return LOG
@@ -160,7 +237,16 @@ class Runner(object):
         timestamped log directory and the results log file, if specified
         """
         # Setup logging
-        cls.log_path = ENV.get_log_dir_name()
+        resume = getattr(CONF.sub_command, "resume", None)
+        if resume:
+            if not os.path.isfile(os.path.join(resume, Journal.file_name)):
+                print(_("No journal found in `%s`; please verify path, "
+                        "exiting...") % resume)
+                exit(1)
+            cls.log_path = resume
+            cls.log_mode = "a"
+        else:
+            cls.log_path = ENV.get_log_dir_name()
         if not os.path.isdir(cls.log_path):
             os.makedirs(cls.log_path)
 
@@ -207,6 +293,7 @@ class Runner(object):
         """
         global result
         cls.worker = worker
+        cls.argv = argv
         # If we are initializing, don't look for a default config file
         if "init" in sys.argv:
             cls.setup_config()
@@ -247,13 +334,19 @@ class Runner(object):
 
         cls.setup_runtime_env()
 
+        if CONF.sub_command.name == "worker":
+            cls.run_worker()
+            exit(0)
+
         decorator = unittest.runner._WritelnDecorator(cls.output)
         result = syntribos.result.IssueTestResult(decorator, True, verbosity=1)
 
         cls.start_time = time.time()
-        if CONF.sub_command.name == "run":
+        if CONF.sub_command.name in ("run", "coordinator"):
             list_of_tests = list(
                 cls.get_tests(CONF.test_types, CONF.excluded_types))
+        if CONF.sub_command.name == "run":
+            cls.start_journal()
         elif CONF.sub_command.name == "dry_run":
             dry_run_output = {"failures": [], "successes": []}
             list_of_tests = list(cls.get_tests(dry_run=True))
@@ -275,6 +368,9 @@ class Runner(object):
                             "exiting...") % templates_path)
                     exit(1)
 
+        if CONF.sub_command.name == "run" and CONF.workers <= 1:
+            cls.scheduler = cls.get_scheduler()
+
         print(_("\nPress Ctrl-C to pause or exit...\n"))
         meta_vars = None
         templates_dir = list(templates_dir)
@@ -294,6 +390,17 @@ class Runner(object):
                         "correctly formatted JSON data. ***\n".format(
                             _full_path)
                     )
+        if CONF.sub_command.name == "run" and CONF.workers > 1:
+            cls.run_workers(templates_dir, CONF.workers)
+            # Every template has been run by the workers
+            templates_dir = []
+        elif CONF.sub_command.name == "coordinator":
+            cls.run_coordinator(list_of_tests, templates_dir)
+            templates_dir = []
+        compiled, parse_errors = {}, {}
+        if (CONF.sub_command.name == "run" and
+                CONF.syntribos.compile_threads > 0):
+            compiled, parse_errors = cls.compile_templates(templates_dir)
         for file_path, req_str in templates_dir:
             if "meta.json" in file_path:
                 continue
@@ -303,6 +410,17 @@ class Runner(object):
             if not file_path.endswith(".template"):
                 LOG.warning('file.....:%s (SKIPPED - not a .template file)',
                             file_path)
+                cls.log_handler.remove_template(file_path)
+                continue
+            if (CONF.sub_command.name == "run" and
+                    cls.replay_template(file_path)):
+                cls.log_handler.remove_template(file_path)
+                continue
+            if file_path in parse_errors:
+                # Already reported, see compile_templates
+                LOG.error("Error in parsing template:\n%s",
+                          parse_errors[file_path])
+                cls.log_handler.remove_template(file_path)
                 continue
 
             test_names = [t for (t, i) in list_of_tests]  # noqa
@@ -318,18 +436,234 @@ class Runner(object):
 
             if CONF.sub_command.name == "run":
                 cls.run_given_tests(list_of_tests, file_path,
-                                    req_str, meta_vars)
+                                    req_str, meta_vars,
+                                    compiled.get(file_path))
             elif CONF.sub_command.name == "dry_run":
                 cls.dry_run(list_of_tests, file_path,
                             req_str, dry_run_output, meta_vars)
 
-        if CONF.sub_command.name == "run":
+        if CONF.sub_command.name in ("run", "coordinator"):
+            cls.wait_for_scheduler()
             result.print_result(cls.start_time, cls.log_path)
             cls.result = result
+            if cls.journal is not None:
+                cls.journal.close()
             cleanup.delete_temps()
         elif CONF.sub_command.name == "dry_run":
             cls.dry_run_report(dry_run_output)
 
+    @classmethod
+    def run_workers(cls, templates, num_workers):
+        """Runs each template in a pool of worker processes
+
+        Every worker process runs whole templates, with its own scheduler
+        and HTTP client (see :mod:`syntribos.workers`). The outcome of each
+        test comes back as a record, and is added to the run's result as
+        each template finishes, so that unique failures are counted across
+        all workers.
+
+        :param list templates: List of (path, content) tuples of templates
+        :param int num_workers: Number of worker processes
+        """
+        import multiprocessing
+
+        from syntribos import workers
+
+        units = []
+        for file_path, req_str in cls.get_template_files(templates):
+            if cls.replay_template(file_path):
+                continue
+            meta_vars = cls.get_meta_vars(file_path)
+            if parser.may_be_volatile(req_str, meta_vars):
+                continue
+            units.append((file_path, req_str, meta_vars))
+
+        worker_pool = multiprocessing.Pool(
+            num_workers, workers.init_worker, (cls.argv, cls.log_path))
+        try:
+            for unit_result in worker_pool.imap_unordered(
+                    workers.run_template, units):
+                cls.add_template_result(unit_result)
+                if cls.journal is not None:
+                    cls.journal.add_template(unit_result["file"], unit_result)
+            worker_pool.close()
+        except KeyboardInterrupt:
+            worker_pool.terminate()
+            cls.exit_run()
+        finally:
+            worker_pool.join()
+
+    @classmethod
+    def run_coordinator(cls, list_of_tests, templates):
+        """Hands out each test type of each template to remote workers
+
+        Workers are started with ``syntribos worker --coordinator HOST:PORT``
+        and keep asking for work until every test type has been run against
+        every template (see :mod:`syntribos.distributed`). Tests leased by a
+        worker that disconnects, or stops sending heartbeats, are handed out
+        again. The records of each unit are added to the run's result as
+        they come back.
+
+        :param list list_of_tests: A list of all the loaded tests
+        :param list templates: List of (path, content) tuples of templates
+        """
+        from syntribos import distributed
+
+        units = []
+        for file_path, req_str in cls.get_template_files(templates):
+            meta_vars = cls.get_meta_vars(file_path)
+            for test_name, test_class in list_of_tests:
+                units.append({"file": file_path, "content": req_str,
+                              "meta_vars": meta_vars,
+                              "test_name": test_name})
+
+        coordinator = distributed.Coordinator(
+            units, distributed.parse_address(CONF.sub_command.bind),
+            CONF.sub_command.lease_timeout,
+            on_result=lambda unit, res: cls.add_template_result(res))
+        print(_("Waiting for workers on %(host)s:%(port)s to run %(num)s "
+                "test type(s)...\n") % {
+                    "host": coordinator.address[0],
+                    "port": coordinator.address[1], "num": len(units)})
+        coordinator.start()
+        try:
+            coordinator.wait()
+        except KeyboardInterrupt:
+            cls.exit_run()
+        finally:
+            coordinator.stop()
+
+    @classmethod
+    def run_worker(cls):
+        """Runs the tests handed out by a coordinator until it is done."""
+        from syntribos import distributed
+        from syntribos import workers
+
+        address = distributed.parse_address(CONF.sub_command.coordinator)
+        print(_("Running tests for the coordinator at %(host)s:%(port)s") %
+              {"host": address[0], "port": address[1]})
+        num_units = distributed.Worker(address, workers.run_unit).run()
+        print(_("\nRan %(num)s test type(s), LOG PATH...: %(path)s") %
+              {"num": num_units, "path": cls.log_path})
+
+    @classmethod
+    def get_template_files(cls, templates):
+        """Yields the templates to run, logging any other file skipped
+
+        :param list templates: List of (path, content) tuples of templates
+        """
+        for file_path, req_str in templates:
+            if "meta.json" in file_path:
+                continue
+            if not file_path.endswith(".template"):
+                LOG = cls.get_logger(file_path)
+                LOG.warning('file.....:%s (SKIPPED - not a .template file)',
+                            file_path)
+                cls.log_handler.remove_template(file_path)
+                continue
+            yield file_path, req_str
+
+    @classmethod
+    def start_journal(cls):
+        """Opens the journal of the run, replaying it when resuming
+
+        Every completed test case is recorded in the journal, in the run's
+        log directory; cases found there are not run again.
+        """
+        cls.journal = Journal(cls.log_path)
+        changed = cls.journal.start_run({
+            "test_types": CONF.test_types,
+            "excluded_types": CONF.excluded_types
+        })
+        if changed:
+            print(_("WARNING: the run being resumed was started with "
+                    "different test types"))
+        if CONF.sub_command.resume:
+            print(_("Resuming the run in %(path)s, %(num)s test case(s) "
+                    "and %(templates)s template(s) were completed") % {
+                        "path": cls.log_path,
+                        "num": sum(len(c) for c in
+                                   cls.journal.cases.values()),
+                        "templates": len(cls.journal.templates)})
+
+    @classmethod
+    def add_records(cls, records):
+        """Adds records made by a :class:`syntribos.result.ResultRecorder`
+
+        :returns: tuple of (unique failures, errors) added
+        """
+        failures, errors = 0, 0
+        for record in records:
+            new_failures, new_errors = result.add_record(record)
+            failures += new_failures
+            errors += new_errors
+        return failures, errors
+
+    @classmethod
+    def replay_template(cls, file_path):
+        """Adds the journaled outcome of a template run by a worker
+
+        :returns: True if the template was found in the journal
+        """
+        journaled = cls.journal and cls.journal.get_template(file_path)
+        if not journaled:
+            return False
+        # Requests sent before the run was resumed aren't counted again
+        cls.add_template_result(
+            dict(journaled, connections={}, concurrency={}))
+        return True
+
+    @classmethod
+    def replay_test_type(cls, test_name, file_path, result_string,
+                         template_job):
+        """Adds the journaled outcome of a completed test type"""
+        cases = cls.journal.get_test_type_records(file_path, test_name)
+        job = Job(test_name, len(cases), parent=template_job,
+                  on_progress=cls._test_type_progress,
+                  on_done=cls._test_type_done)
+        job.p_bar = cli.ProgressBar(
+            message=result_string, total_len=max(1, len(cases)))
+        for records in cases:
+            job.add()
+            job.finish(*cls.add_records(records))
+        job.close()
+
+    @classmethod
+    def add_template_result(cls, unit_result):
+        """Adds the records of a template run elsewhere to the result
+
+        Prints a summary of each test type run against the template, like
+        the one printed when running in-process.
+
+        :param dict unit_result: As returned by
+            :func:`syntribos.workers.run_template`
+        """
+        test_types = {}
+        for record in unit_result["records"]:
+            failures, errors = result.add_record(record)
+            counts = test_types.setdefault(record["test_type"], [0, 0, 0])
+            counts[0] += int(record.get("ran", True))
+            counts[1] += failures
+            counts[2] += errors
+        pool.stats.merge(unit_result["connections"])
+        throttle.get_controller().merge(unit_result.get("concurrency", {}))
+
+        print(syntribos.SEP)
+        print("Template File...: {}".format(unit_result["file"]))
+        print(syntribos.SEP)
+        for test_name in sorted(test_types, key=str):
+            tests, failures, errors = test_types[test_name]
+            failures_str = cli.colorize_by_percent(failures, tests)
+            errors_str = cli.colorize(errors, "red") if errors else 0
+            print(_(
+                "  %(name)s  :  %(num)s test(s), %(fail)s Failure(s), "
+                "%(err)s Error(s)") % {
+                    "name": str(test_name).replace("_", " ").capitalize(),
+                    "num": tests, "fail": failures_str, "err": errors_str})
+        print(_("\nRan %(num)s test(s) in %(time).3f s for %(file)s\n") %
+              {"num": sum(c[0] for c in test_types.values()),
+               "time": unit_result["run_time"], "file": unit_result["file"]})
+
     @classmethod
     def dry_run(cls, list_of_tests, file_path, req_str, output,
                 meta_vars=None):
@@ -363,13 +697,10 @@ class Runner(object):
                 print(_("\nRequest sucessfully generated!\n"))
                 output["successes"].append(file_path)
 
-            test_cases = list(
-                test_class.get_test_cases(file_path, req_str, meta_vars)
-            )
-            if len(test_cases) > 0:
-                for test in test_cases:
-                    if test:
-                        cls.run_test(test)
+            for test in test_class.get_test_cases(
+                    file_path, req_str, meta_vars):
+                if test:
+                    cls.run_test(cls.make_case(test, test_class))
 
     @classmethod
     def dry_run_report(cls, output):
@@ -385,25 +716,110 @@ class Runner(object):
         print(_("LOG PATH...: {path}").format(path=test_log))
         print(syntribos.SEP)
 
+    @classmethod
+    def compile_templates(cls, templates):
+        """Parses the templates to run, before any of them is run
+
+        Templates are parsed by ``[syntribos] compile_threads`` threads. Each
+        template parsed is held (see
+        :meth:`syntribos.clients.http.parser.RequestCreator.hold_template`)
+        until it has been run. Templates which may call functions as they
+        are parsed (see
+        :meth:`syntribos.clients.http.parser.RequestCreator.may_be_volatile`)
+        are left to be parsed as they are run: the values returned (e.g.
+        tokens) may have expired by then, and the functions would be called
+        again. The parse errors of every other template are printed
+        together, before any template is run.
+
+        :param list templates: List of (path, content) tuples of templates
+        :returns: tuple of (`dict` of the held
+            :class:`syntribos.clients.http.parser.CompiledTemplate` of each
+            template parsed, `dict` of the traceback of each template which
+            could not be parsed), by template path
+        """
+        from multiprocessing.pool import ThreadPool
+
+        units = []
+        for file_path, req_str in templates:
+            if ("meta.json" in file_path or
+                    not file_path.endswith(".template")):
+                continue
+            if cls.journal is not None and cls.journal.get_template(
+                    file_path):
+                continue
+            meta_vars = cls.get_meta_vars(file_path)
+            if parser.may_be_volatile(req_str, meta_vars):
+                continue
+            units.append((file_path, req_str, meta_vars))
+        compiled, errors = {}, {}
+        if not units:
+            return compiled, errors
+
+        def compile_unit(unit):
+            file_path, req_str, meta_vars = unit
+            try:
+                template = parser.hold_template(
+                    req_str, CONF.syntribos.endpoint, meta_vars)
+            except Exception:
+                return file_path, None, traceback.format_exc()
+            return file_path, template, None
+
+        thread_pool = ThreadPool(
+            min(CONF.syntribos.compile_threads, len(units)))
+        try:
+            for file_path, template, error in thread_pool.imap_unordered(
+                    compile_unit, units):
+                if error is not None:
+                    errors[file_path] = error
+                else:
+                    compiled[file_path] = template
+            thread_pool.close()
+        except KeyboardInterrupt:
+            thread_pool.terminate()
+            cls.exit_run()
+        finally:
+            thread_pool.join()
+        LOG.debug("Parsed %s template(s), %s with errors", len(units),
+                  len(errors))
+        if errors:
+            print(syntribos.SEP)
+            print(_("Error in parsing %s template(s), skipping them:") %
+                  len(errors))
+            for file_path in sorted(errors):
+                print("\n{0}\n{1}".format(file_path, errors[file_path]))
+        return compiled, errors
+
     @classmethod
     def run_given_tests(cls, list_of_tests, file_path, req_str,
-                        meta_vars=None):
+                        meta_vars=None, template=None):
         """Loads all the templates and runs all the given tests
 
-        This method calls run_test method to run each of the tests one
-        by one.
+        The test cases of every test type are submitted to the run-wide
+        :class:`syntribos.scheduler.Scheduler`, which runs them alongside the
+        cases of every other template. This method returns once the last case
+        has been queued; the summary of each test type, and of the template,
+        is printed as its last case finishes. If no scheduler was set up for
+        this run, one is created and drained before returning.
 
         :param list list_of_tests: A list of all the loaded tests
         :param str file_path: Path of the template file
         :param str req_str: Request string of each template
+        :param template: The parsed template, held by the caller (see
+            :meth:`compile_templates`); the hold is released once the
+            template has been run
 
         :return: None
         """
-        pool = ThreadPool(CONF.syntribos.threads)
+        scheduler = cls.scheduler
+        if scheduler is None:
+            scheduler = cls.get_scheduler()
+        # Baseline responses are only shared by the test types of a template
+        baseline.get_cache().clear()
+        payload_plan = fanout.get_plan(list_of_tests)
+        template_job = Job(file_path, on_done=cls._template_done)
+        # Held while its cases run, see parser.hold_template
+        template_job.template = template
         try:
-            template_start_time = time.time()
-            failures = 0
-            errors = 0
             print("\n  ID \t\tTest Name      \t\t\t\t\t\t    Progress")
             for test_name, test_class in list_of_tests:
                 test_class.test_id = cls.current_test_id
@@ -417,7 +833,15 @@ class Runner(object):
                     result_string = result_string.ljust(55)
                 else:
                     result_string = result_string.ljust(60)
+                if cls.journal is not None and (
+                        cls.journal.is_test_type_done(file_path, test_name)):
+                    cls.replay_test_type(test_name, file_path, result_string,
+                                         template_job)
+                    continue
                 try:
+                    if template_job.template is None:
+                        template_job.template = parser.hold_template(
+                            req_str, CONF.syntribos.endpoint, meta_vars)
                     test_class.create_init_request(file_path, req_str,
                                                    meta_vars)
                 except Exception:
@@ -426,81 +850,204 @@ class Runner(object):
                     ) % traceback.format_exc())
                     LOG.error("Error in parsing template:")
                     break
-                test_cases = list(
-                    test_class.get_test_cases(file_path, req_str, meta_vars))
-                total_tests = len(test_cases)
+                total_tests = test_class.count_test_cases(
+                    file_path, req_str, meta_vars)
                 if total_tests > 0:
                     log_string = "[{test_id}]  :  {name}".format(
                         test_id=test_class.test_id, name=test_name)
                     LOG.debug(log_string)
-                    last_failures = result.stats['unique_failures']
-                    last_errors = result.stats['errors']
-                    p_bar = cli.ProgressBar(
+                    job = Job(test_name, total_tests, parent=template_job,
+                              on_progress=cls._test_type_progress,
+                              on_done=cls._test_type_done)
+                    job.p_bar = cli.ProgressBar(
                         message=result_string, total_len=total_tests)
                     test_class.send_init_request(file_path, req_str, meta_vars)
 
-                    # This line runs the tests
-                    pool.map(lambda t: cls.run_test(t, p_bar), test_cases)
-
-                    failures = result.stats['unique_failures'] - last_failures
-                    errors = result.stats['errors'] - last_errors
-                    failures_str = cli.colorize_by_percent(
-                        failures, total_tests)
-
-                    if errors:
-                        errors_str = cli.colorize(errors, "red")
-                        print(_(
-                            "  :  %(fail)s Failure(s), %(err)s Error(s)\r") % {
-                                "fail": failures_str, "err": errors_str})
-                    else:
-                        print(_(
-                            "  : %s Failure(s), 0 Error(s)\r") % failures_str)
-
-            run_time = time.time() - template_start_time
-            LOG.info(_("Run time: %s sec."), run_time)
-            if hasattr(result, "testsRun"):
-                num_tests = result.testsRun - result.testsRunSinceLastPrint
-                print(_("\nRan %(num)s test(s) in %(time).3f s\n") %
-                      {"num": num_tests, "time": run_time})
-                result.testsRunSinceLastPrint = result.testsRun
+                    # Cases are generated lazily; submit() blocks while the
+                    # scheduler's queue is full, so only a bounded number of
+                    # generated cases are held in memory at any time
+                    try:
+                        for index, test in enumerate(
+                                test_class.get_test_cases(
+                                    file_path, req_str, meta_vars)):
+                            records = None
+                            if cls.journal is not None:
+                                records = cls.journal.get_case(
+                                    file_path, test_name, index)
+                            if records is not None:
+                                job.add()
+                                job.finish(*cls.add_records(records))
+                                continue
+                            test = cls.make_case(test, test_class)
+                            if payload_plan is not None:
+                                payload_plan.assign(test_class, test)
+                            scheduler.submit(job, cls.run_test, test,
+                                             file_path, (test_name, index))
+                    finally:
+                        job.close()
 
         except KeyboardInterrupt:
-            print(_(
-                '\n\nPausing...Hit ENTER to continue, type quit to exit.'))
+            cls.handle_interrupt()
+        finally:
+            template_job.close()
+            if scheduler is not cls.scheduler:
+                scheduler.join()
+                scheduler.shutdown()
+
+    @classmethod
+    def get_scheduler(cls):
+        """Creates the scheduler for the configured HTTP engine
+
+        With the "asyncio" engine, the requests of the test cases are sent
+        from an event loop, and only their checks are run in worker threads.
+        """
+        if CONF.syntribos.http_engine == "asyncio":
+            from syntribos.async_scheduler import AsyncScheduler
+            return AsyncScheduler(CONF.syntribos.async_concurrency,
+                                  CONF.syntribos.max_in_flight,
+                                  num_threads=CONF.syntribos.threads,
+                                  prefetch=cls.get_async_request,
+                                  on_response=cls.set_async_response)
+        return Scheduler(CONF.syntribos.threads, CONF.syntribos.max_in_flight)
+
+    @classmethod
+    def get_async_request(cls, test, template_name=None, case_key=None):
+        """Returns the request the asyncio engine should send for `test`
+
+        Called in a thread of the engine's own, as making the request (e.g.
+        a fuzzed one, see :attr:`syntribos.tests.fuzz.base_fuzz.
+        BaseFuzzTestCase.request`) would hold up its event loop.
+        """
+        if not test:
+            return None
+        if template_name:
+            cls.log_handler.set_template(template_name)
+        return test.get_async_request()
+
+    @staticmethod
+    def set_async_response(response, signals, test, template_name=None,
+                           case_key=None):
+        test.set_async_response(response, signals)
+
+    @staticmethod
+    def make_case(test, test_class):
+        """Returns a test case for `test`, with the baseline of `test_class`
+
+        :param test: A test case, or a test class, as yielded by
+            `test_class.get_test_cases`
+        :param test_class: The test class, holding the baseline request state
+            of the template, which changes when the next template is loaded
+        :returns: A test case (see
+            :meth:`syntribos.tests.base.BaseTestCase.new_case`), or None
+        """
+        if not test:
+            return None
+        if isinstance(test, type):
+            test = test.new_case()
+        for attr in BASELINE_ATTRS:
+            if hasattr(test_class, attr):
+                setattr(test, attr, getattr(test_class, attr))
+        return test
+
+    @classmethod
+    def _test_type_progress(cls, job):
+        with lock:
+            job.p_bar.increment(1)
+            job.p_bar.print_bar()
+
+    @classmethod
+    def _test_type_done(cls, job):
+        failures_str = cli.colorize_by_percent(job.failures, job.completed)
+        with lock:
+            job.p_bar.present_level = job.p_bar.total_len
+            job.p_bar.print_bar()
+            if job.errors:
+                errors_str = cli.colorize(job.errors, "red")
+                print(_(
+                    "  :  %(fail)s Failure(s), %(err)s Error(s)\r") % {
+                        "fail": failures_str, "err": errors_str})
+            else:
+                print(_(
+                    "  : %s Failure(s), 0 Error(s)\r") % failures_str)
+        if cls.journal is not None and job.parent is not None:
+            cls.journal.add_test_type(job.parent.name, job.name)
+
+    @classmethod
+    def _template_done(cls, job):
+        LOG.info(_("Run time: %s sec."), job.run_time)
+        with lock:
+            print(_("\nRan %(num)s test(s) in %(time).3f s for %(file)s\n") %
+                  {"num": job.tests, "time": job.run_time, "file": job.name})
+        cls.log_handler.remove_template(job.name)
+        fanout.get_fanout().discard(job.name)
+        if getattr(job, "template", None) is not None:
+            job.template.release()
+
+    @classmethod
+    def wait_for_scheduler(cls):
+        """Blocks until every queued test case has been run."""
+        if cls.scheduler is None:
+            return
+        while True:
             try:
-                response = input()
-                if response.lower() == "quit":
-                    result.print_result(cls.start_time)
-                    cleanup.delete_temps()
-                    print(_("Exiting..."))
-                    pool.close()
-                    pool.join()
-                    exit(0)
-                print(_('Resuming...'))
+                cls.scheduler.join()
+                break
             except KeyboardInterrupt:
-                result.print_result(cls.start_time)
-                cleanup.delete_temps()
-                print(_("Exiting..."))
-                pool.close()
-                pool.join()
-                exit(0)
+                cls.handle_interrupt()
+        cls.scheduler.shutdown()
+        cls.scheduler = None
+
+    @classmethod
+    def handle_interrupt(cls):
+        """Pauses the run until the user either resumes or quits."""
+        if cls.scheduler is not None:
+            cls.scheduler.pause()
+        print(_(
+            '\n\nPausing...Hit ENTER to continue, type quit to exit.'))
+        try:
+            response = input()
+            if response.lower() == "quit":
+                cls.exit_run()
+            print(_('Resuming...'))
+        except KeyboardInterrupt:
+            cls.exit_run()
+        if cls.scheduler is not None:
+            cls.scheduler.resume()
+
+    @classmethod
+    def exit_run(cls):
+        result.print_result(cls.start_time, cls.log_path)
+        cleanup.delete_temps()
+        if cls.journal is not None:
+            print(_("Resume this run with: syntribos run --resume %s") %
+                  cls.log_path)
+        print(_("Exiting..."))
+        exit(0)
 
     @classmethod
-    def run_test(cls, test, p_bar=None):
-        """Create a new test suite, add a test, and run it
+    def run_test(cls, test, template_name=None, case_key=None):
+        """Runs a test case, see :func:`syntribos.executor.run_case`
 
-        :param test: The test to add to the suite
-        :param result: The result object to append to
-        :type result: :class:`syntribos.result.IssueTestResult`
+        :param test: The test case to run
+        :param str template_name: Template the test belongs to, used to route
+            log records to the right log file
+        :param tuple case_key: (test name, index) of the test among the cases
+            of its test type, used to record it in the run's journal
+        :returns: tuple of (unique failures, errors) caused by the test
         """
-        if test:
-            suite = unittest.TestSuite()
-            suite.addTest(test("run_test_case"))
-            suite.run(result)
-            if p_bar:
-                with lock:
-                    p_bar.increment(1)
-                    p_bar.print_bar()
+        if not test:
+            return 0, 0
+        if template_name:
+            cls.log_handler.set_template(template_name)
+        recorder = None
+        if cls.journal is not None and case_key is not None:
+            recorder = syntribos.result.ResultRecorder()
+        job_result = syntribos.result.JobResult(result, recorder)
+        syntribos.executor.run_case(test, job_result)
+        if recorder is not None:
+            cls.journal.add_case(template_name, case_key[0], case_key[1],
+                                 recorder.records)
+        return job_result.failures, job_result.errors
 
 
 def entry_point():
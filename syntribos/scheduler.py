@@ -0,0 +1,184 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import logging
+import threading
+import time
+
+from six.moves import queue
+
+LOG = logging.getLogger(__name__)
+
+
+class Job(object):
+    """A group of work items that share progress and result accounting
+
+    The runner creates one job per template, and one child job per test type
+    run against that template. Work items are submitted to the
+    :class:`Scheduler` under a job; the job counts them as they finish and
+    fires its callbacks, so that per-template and per-test-type summaries can
+    still be reported while items from many jobs are in flight at once.
+
+    :ivar str name: Name of the job (e.g. template path or test name)
+    :ivar int total: Expected number of items, used for progress reporting
+    :ivar int submitted: Number of items submitted under this job
+    :ivar int completed: Number of items that have finished
+    :ivar int tests: Number of tests run under this job and its children
+    :ivar int failures: Number of unique failures found by this job
+    :ivar int errors: Number of errors raised by this job
+    """
+
+    def __init__(self, name, total=0, parent=None, on_progress=None,
+                 on_done=None):
+        self.name = name
+        self.total = total
+        self.parent = parent
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.submitted = 0
+        self.completed = 0
+        self.tests = 0
+        self.failures = 0
+        self.errors = 0
+        self.closed = False
+        self.done = False
+        self.start_time = time.time()
+        self.end_time = None
+        self._lock = threading.Lock()
+        if parent is not None:
+            parent.add()
+
+    def add(self, num=1):
+        """Record that `num` more items were submitted under this job."""
+        with self._lock:
+            self.submitted += num
+
+    def finish(self, failures=0, errors=0, tests=1):
+        """Record that one item of this job finished
+
+        :param int failures: Unique failures found by the item
+        :param int errors: Errors raised by the item
+        :param int tests: Number of tests the item ran
+        """
+        with self._lock:
+            self.completed += 1
+            self.failures += failures
+            self.errors += errors
+            self.tests += tests
+        if self.on_progress:
+            self.on_progress(self)
+        self._check_done()
+
+    def close(self):
+        """Mark the job as complete; no more items will be submitted.
+
+        `total` may only have been an estimate, so it is set to the number of
+        items that were actually submitted.
+        """
+        with self._lock:
+            self.closed = True
+            self.total = self.submitted
+        self._check_done()
+
+    def _check_done(self):
+        with self._lock:
+            if self.done or not self.closed:
+                return
+            if self.completed < self.submitted:
+                return
+            self.done = True
+            self.end_time = time.time()
+        if self.on_done:
+            self.on_done(self)
+        if self.parent is not None:
+            self.parent.finish(self.failures, self.errors, self.tests)
+
+    @property
+    def run_time(self):
+        return (self.end_time or time.time()) - self.start_time
+
+
+class Scheduler(object):
+    """Runs work items from every job on one shared pool of worker threads
+
+    Items are fed into a single bounded queue, so producers block (instead of
+    materializing everything up front) once `queue_size` items are waiting.
+    Because the queue is shared by all templates and test types, workers
+    never idle at a test type or template boundary.
+
+    :param int num_workers: Number of worker threads
+    :param int queue_size: Maximum number of items waiting to be run
+    """
+
+    def __init__(self, num_workers, queue_size=None):
+        self.num_workers = max(1, num_workers)
+        self.queue = queue.Queue(maxsize=queue_size or self.num_workers * 2)
+        self._running = threading.Event()
+        self._running.set()
+        self.workers = []
+        for _ in range(self.num_workers):
+            worker = threading.Thread(target=self._work)
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+
+    def submit(self, job, func, *args):
+        """Queue `func(*args)` to be run as part of `job`
+
+        `func` may return a tuple of ``(failures, errors)`` which is added
+        to the job's counters. This call blocks while the queue is full.
+        """
+        # Counted first, so that the job can't be done before it is
+        job.add()
+        try:
+            self.queue.put((job, func, args))
+        except BaseException:
+            job.add(-1)
+            raise
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            self._running.wait()
+            job, func, args = item
+            failures, errors = 0, 0
+            try:
+                failures, errors = func(*args) or (0, 0)
+            except Exception:
+                LOG.exception("Unhandled exception in scheduled work item")
+                errors = 1
+            finally:
+                job.finish(failures, errors)
+                self.queue.task_done()
+
+    def pause(self):
+        """Stop workers from starting new items."""
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def join(self):
+        """Block until every submitted item has been run."""
+        self.queue.join()
+
+    def shutdown(self):
+        """Stop all worker threads once the queue has drained."""
+        self.resume()
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join()
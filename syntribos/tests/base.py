@@ -20,6 +20,7 @@ import six
 from six.moves.urllib.parse import urlparse
 
 import syntribos
+from syntribos.clients.http import baseline
 from syntribos.clients.http import client
 from syntribos.clients.http import parser
 from syntribos.signal import SignalHolder
@@ -95,6 +96,12 @@ class BaseTestCase(unittest.TestCase):
     :attribute test_signals: Holder for signals on `test_req`
     :attribute diff_signals: Holder for signals between `init_req` and
         `test_req`
+    :attribute str case_name: Name of a case made by :meth:`new_case`
+
+    The request template's baseline (`init_req`, `init_resp`, etc.) is set on
+    the class. Everything about a single test (`failures`, `test_resp`,
+    `test_signals`, `diff_signals`, etc.) is set on the case, so that cases
+    run in different threads don't share any of it.
     """
 
     test_name = None
@@ -112,6 +119,8 @@ class BaseTestCase(unittest.TestCase):
     test_signals = SignalHolder()
     diff_signals = SignalHolder()
 
+    case_name = None
+
     @classmethod
     def register_opts(cls):
         pass
@@ -121,6 +130,15 @@ class BaseTestCase(unittest.TestCase):
         """Returns tests for given TestCase class (overwritten by children)."""
         yield cls
 
+    @classmethod
+    def count_test_cases(cls, filename, file_content, meta_vars):
+        """Returns the number of tests `get_test_cases` is expected to yield
+
+        This is used for progress reporting, and must be cheap: it should not
+        build the test cases or send any requests. An upper bound is fine.
+        """
+        return 1
+
     @classmethod
     def create_init_request(cls, filename, file_content, meta_vars):
         """Parses template and creates init request object
@@ -137,6 +155,7 @@ class BaseTestCase(unittest.TestCase):
         cls.init_resp = None
         cls.init_signals = None
         cls.template_path = filename
+        cls.dead = False
 
     @classmethod
     def send_init_request(cls, filename, file_content, meta_vars):
@@ -144,7 +163,9 @@ class BaseTestCase(unittest.TestCase):
 
         This method sends the initial request, which is the request created
         after parsing the template file. This request will not be modified
-        any further by the test cases themselves.
+        any further by the test cases themselves. Test types sending the same
+        request share its response, see
+        :mod:`syntribos.clients.http.baseline`.
 
         :param str filename: name of template file
         :param str file_content: content of template file as string
@@ -154,8 +175,8 @@ class BaseTestCase(unittest.TestCase):
                 file_content, CONF.syntribos.endpoint, meta_vars)
         prepared_copy = cls.init_req.get_prepared_copy()
         cls.prepared_init_req = prepared_copy
-        cls.init_resp, cls.init_signals = cls.client.send_request(
-            prepared_copy)
+        cls.init_resp, cls.init_signals = baseline.send_baseline(
+            cls.client, prepared_copy)
         if cls.init_resp is not None:
             # Get the computed body and add it to our RequestObject
             # TODO(cneill): Figure out a better way to handle this discrepancy
@@ -163,6 +184,47 @@ class BaseTestCase(unittest.TestCase):
         else:
             cls.dead = True
 
+    def get_async_request(self):
+        """Returns the request to be sent for this test by the asyncio engine
+
+        Tests which send their request from :meth:`send_test_request` may
+        return it here instead, so that the "asyncio" HTTP engine can send it
+        and hand the response back through :meth:`set_async_response`. By
+        default, tests send their own requests.
+        """
+        return None
+
+    def set_async_response(self, response, signals):
+        """Receives the response to the request from `get_async_request`."""
+        pass
+
+    @classmethod
+    def new_case(cls, case_name=None, attrs=None):
+        """Creates a test case of this class
+
+        The case is a plain instance, with `attrs` (e.g. the fuzzed request)
+        set as its own attributes. Unlike :meth:`extend_class`, no class is
+        created, and :meth:`unittest.TestCase.__init__` is skipped; cases are
+        run by :func:`syntribos.executor.run_case`.
+
+        Each case gets its own `failures`, `errors`, `test_signals` and
+        `diff_signals`, unless they are given in `attrs`.
+
+        :param str case_name: Name of the case, used to describe it in the
+            results
+        :param dict attrs: Attributes of the case
+        :returns: An instance of the class
+        """
+        case = cls.__new__(cls)
+        case.failures = []
+        case.errors = []
+        case.test_signals = SignalHolder()
+        case.diff_signals = SignalHolder()
+        if attrs:
+            case.__dict__.update(attrs)
+        case.case_name = case_name
+        return case
+
     @classmethod
     def extend_class(cls, new_name, kwargs):
         """Creates an extension for the class
@@ -183,12 +245,24 @@ class BaseTestCase(unittest.TestCase):
         new_cls.__module__ = cls.__module__
         return new_cls
 
-    @classmethod
-    def tearDownClass(cls):
-        super(BaseTestCase, cls).tearDownClass()
-        if not cls.failures:
-            if "EXCEPTION_RAISED" in cls.test_signals:
-                sig = cls.test_signals.find(
+    def send_test_request(self):
+        """Sends the request of this test, if it has one of its own
+
+        This is called before :meth:`test_case`, and should set `test_req`,
+        `test_resp` and `test_signals` on the test.
+        """
+        pass
+
+    def check_exceptions(self):
+        """Raises the exception the test request ended with, if any
+
+        Nothing is raised if the test registered failures.
+
+        :raises: :exc:`FatalHTTPError` if the connection was closed
+        """
+        if not self.failures:
+            if "EXCEPTION_RAISED" in self.test_signals:
+                sig = self.test_signals.find(
                     tags="EXCEPTION_RAISED")[0]
                 exc_name = type(sig.data["exception"]).__name__
                 if ("CONNECTION_FAIL" in sig.tags):
@@ -201,31 +275,49 @@ class BaseTestCase(unittest.TestCase):
                 else:
                     raise sig.data["exception"]
 
-    @classmethod
-    def tearDown(cls):
-        get_slugs = [sig.slug for sig in cls.test_signals]
-        get_checks = [sig.check_name for sig in cls.test_signals]
+    def log_signals(self):
+        get_slugs = [sig.slug for sig in self.test_signals]
+        get_checks = [sig.check_name for sig in self.test_signals]
         test_signals_used = "Signals: " + str(get_slugs)
         LOG.debug(test_signals_used)
         test_checks_used = "Checks used: " + str(get_checks)
         LOG.debug(test_checks_used)
 
+    def tearDown(self):
+        self.log_signals()
+
     def run_test_case(self):
         """This kicks off the test(s) for a given TestCase class
 
+        This is the test method run when the test goes through
+        :mod:`unittest` (see :func:`syntribos.executor.run_with_unittest`).
         After running the tests, an `AssertionError` is raised if any tests
         were added to self.failures.
 
         :raises: :exc:`AssertionError`
         """
+        self.send_test_request()
         if not self.dead:
             try:
                 self.test_case()
             except Exception as e:
-                self.errors += e
+                self.errors.append(e)
                 raise
             if self.failures:
                 raise AssertionError
+        self.check_exceptions()
+
+    # Cases made by `new_case` skip unittest.TestCase.__init__, which sets
+    # these; they are needed to describe a case in the results
+    _testMethodName = "run_test_case"
+    _testMethodDoc = run_test_case.__doc__
+
+    def __str__(self):
+        name = type(self).__name__
+        if self.case_name:
+            name = replace_invalid_characters(self.case_name)
+        return "{0} ({1}.{2})".format(
+            self._testMethodName, type(self).__module__, name)
 
     def test_case(self):
         """This method is overwritten by individual TestCase classes
@@ -13,7 +13,6 @@
 # limitations under the License.
 # pylint: skip-file
 import logging
-import os
 
 from oslo_config import cfg
 from six.moves.urllib.parse import urlparse
@@ -22,8 +21,8 @@ import syntribos
 from syntribos.checks import length_diff as length_diff
 from syntribos.tests import base
 import syntribos.tests.fuzz.datagen
-from syntribos.utils.file_utils import ContentType
-from syntribos.utils import remotes
+from syntribos.tests.fuzz import fanout
+from syntribos.utils import payloads
 
 LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
@@ -32,52 +31,112 @@ CONF = cfg.CONF
 class BaseFuzzTestCase(base.BaseTestCase):
     failure_keys = None
     success_keys = None
+    sent = False
+    # Whether the payloads of the test type may be sent once for every test
+    # type fuzzing them, see syntribos.tests.fuzz.fanout
+    share_payloads = True
+    shared_by = 1
+    shared = None
+    fuzz_patch = None
+    _request = None
+
+    @property
+    def request(self):
+        """The fuzzed request, made from `fuzz_patch` when first asked for
+
+        :rtype: :class:`syntribos.clients.http.parser.RequestObject`
+        """
+        if self._request is None and self.fuzz_patch is not None:
+            self._request = self.fuzz_patch.materialize()
+        return self._request
+
+    @request.setter
+    def request(self, request):
+        self._request = request
 
     @classmethod
     def _get_strings(cls, file_name=None):
-        payloads = CONF.syntribos.payloads
-        if not payloads:
-            payloads = remotes.get(CONF.remote.payloads_uri)
-        content = ContentType('r')(payloads)
-        for file_path, _ in content:
-            if file_path.endswith(".txt"):
-                file_dir = os.path.split(file_path)[0]
-                payloads = os.path.join(payloads, file_dir)
-                break
+        """Returns the payloads of the test type
+
+        :param str file_name: Payload file to read instead of `data_key`
+        :rtype: tuple
+        """
         try:
-            if os.path.isfile(cls.data_key):
-                path = cls.data_key
-            else:
-                path = os.path.join(payloads, file_name or cls.data_key)
-            with open(path, "r") as fp:
-                return fp.read().splitlines()
-        except (IOError, AttributeError, TypeError) as e:
+            return payloads.get_strings(file_name or cls.data_key)
+        except (IOError, OSError, AttributeError, TypeError) as e:
             LOG.error("Exception raised: {}".format(e))
             print("\nPayload file for test '{}' not readable, "
                   "exiting...".format(cls.test_name))
             exit(1)
 
-    @classmethod
-    def setUpClass(cls):
-        """being used as a setup test not."""
-        super(BaseFuzzTestCase, cls).setUpClass()
-        cls.test_resp, cls.test_signals = cls.client.request(
-            method=cls.request.method,
-            url=cls.request.url,
-            headers=cls.request.headers,
-            params=cls.request.params,
-            data=cls.request.data)
-
-        if not hasattr(cls.request, 'body'):
-            cls.request.body = cls.request.data
-        cls.test_req = cls.request
-
-        if cls.test_resp is None or "EXCEPTION_RAISED" in cls.test_signals:
-            cls.dead = True
+    def send_test_request(self):
+        """Sends the fuzzed request, unless it was sent by the asyncio
+        engine
 
-    @classmethod
-    def tearDownClass(cls):
-        super(BaseFuzzTestCase, cls).tearDownClass()
+        A request also sent by other test types (see `shared_by`) is only
+        sent by the first of their test cases, the others using its response.
+        """
+        if not self.sent:
+            if self.shared is None:
+                self.shared = self.claim_shared()
+            if self.shared is None:
+                self.test_resp, self.test_signals = self._send()
+            elif self.shared[1]:
+                result = None
+                try:
+                    result = self._send()
+                finally:
+                    self.shared[0].publish(result)
+                self.test_resp, self.test_signals = result
+            else:
+                self.test_resp, self.test_signals = (
+                    self.shared[0].wait() or self._send())
+
+        self.request.body = self.request.data
+        self.test_req = self.request
+
+        if self.test_resp is None or "EXCEPTION_RAISED" in self.test_signals:
+            self.dead = True
+
+    def _send(self):
+        return self.client.request(
+            method=self.request.method,
+            url=self.request.url,
+            headers=self.request.headers,
+            params=self.request.params,
+            data=self.request.data)
+
+    def claim_shared(self):
+        """Claims the request of the case, if other test types send it
+
+        :returns: tuple of (:class:`fanout.SharedRequest`, True if this case
+            is to send it), or None if the request is not shared
+        """
+        if self.shared_by < 2:
+            return None
+        return fanout.get_fanout().claim(
+            self.template_path, self.request, self.shared_by)
+
+    def get_async_request(self):
+        """Makes the request the asyncio engine is to send for the case
+
+        Called outside of the event loop, see
+        :class:`syntribos.async_scheduler.AsyncScheduler`.
+
+        :returns: The fuzzed request, or None if it is sent by the case of
+            another test type
+        """
+        self.shared = self.claim_shared()
+        if self.shared is not None and not self.shared[1]:
+            # Waits for the case sending the request, in a worker thread
+            return None
+        return self.request
+
+    def set_async_response(self, response, signals):
+        self.test_resp, self.test_signals = response, signals
+        self.sent = True
+        if self.shared is not None:
+            self.shared[0].publish((response, signals))
 
     def run_default_checks(self):
         """Tests for some default issues
@@ -123,16 +182,29 @@ class BaseFuzzTestCase(base.BaseTestCase):
         """
         self.run_default_checks()
 
+    @classmethod
+    def get_shared_payloads(cls):
+        """Returns the payloads the test type inserts with `datagen`
+
+        Used to find the payloads shared with other test types, see
+        :class:`fanout.PayloadPlan`.
+        """
+        return cls._get_strings()
+
+    @classmethod
+    def count_test_cases(cls, filename, file_content, meta_vars):
+        """Counts the fuzz tests without generating them"""
+        return syntribos.tests.fuzz.datagen.count_fuzz_cases(
+            cls.init_req, cls._get_strings(), cls.parameter_location)
+
     @classmethod
     def get_test_cases(cls, filename, file_content, meta_vars):
         """Generates new TestCases for each fuzz string
 
-        For each string returned by cls._get_strings(), yield a TestCase class
-        for the string as an extension to the current TestCase class. Every
-        string used as a fuzz test payload entails the generation of a new
-        subclass for each parameter fuzzed. See :func:`base.extend_class`.
+        For each string returned by cls._get_strings(), yield a test case of
+        the current TestCase class for each parameter fuzzed with the string.
+        See :meth:`new_fuzz_case`.
         """
-        cls.failures = []
         if hasattr(cls, 'data_key'):
             prefix_name = "{filename}_{test_name}_{fuzz_file}_".format(
                 filename=filename,
@@ -142,12 +214,32 @@ class BaseFuzzTestCase(base.BaseTestCase):
             prefix_name = "{filename}_{test_name}_".format(
                 filename=filename, test_name=cls.test_name)
 
-        fr = syntribos.tests.fuzz.datagen.fuzz_request(
+        fr = syntribos.tests.fuzz.datagen.fuzz_patches(
             cls.init_req, cls._get_strings(), cls.parameter_location,
             prefix_name)
-        for fuzz_name, request, fuzz_string, param_path in fr:
-            yield cls.extend_class(fuzz_name, fuzz_string, param_path,
-                                   {"request": request})
+        for fuzz_name, patch, fuzz_string, param_path in fr:
+            yield cls.new_fuzz_case(fuzz_name, patch, fuzz_string,
+                                    param_path)
+
+    @classmethod
+    def new_fuzz_case(cls, case_name, request, fuzz_string, param_path):
+        """Creates a test case sending a fuzzed request
+
+        :param str case_name: Name of the test case
+        :param request: The fuzzed request, or the patch it is made from when
+            the case is run
+        :type request: :class:`syntribos.clients.http.parser.RequestObject`
+            or :class:`syntribos.tests.fuzz.datagen.FuzzPatch`
+        :param str fuzz_string: Fuzz string inserted in the request
+        :param str param_path: String tracing location of the ImpactedParameter
+        :returns: An instance of the class, see :meth:`base.new_case`
+        """
+        attrs = {"fuzz_string": fuzz_string, "param_path": param_path}
+        if isinstance(request, syntribos.tests.fuzz.datagen.FuzzPatch):
+            attrs["fuzz_patch"] = request
+        else:
+            attrs["_request"] = request
+        return cls.new_case(case_name, attrs)
 
     @classmethod
     def extend_class(cls, new_name, fuzz_string, param_path, kwargs):
@@ -11,22 +11,336 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from array import array
 import copy
+import json
+import logging
 import re
+import threading
+import uuid
 from xml.etree import ElementTree
 
+from oslo_config import cfg
 import six
 
+from syntribos.clients.http.parser import _fuzz_indexes
 from syntribos.clients.http.parser import _string_var_objs
+from syntribos.clients.http.parser import find_placeholders
 from syntribos.clients.http.parser import RequestCreator
+from syntribos.clients.http.parser import RequestHelperMixin
 from syntribos.clients.http import VariableObject
+from syntribos.utils.payloads import MappedPayloads
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+
+
+class FuzzBase(object):
+    """The request a test type fuzzes one part (`fuzz_type`) of
+
+    Fuzzed requests are kept as a :class:`FuzzPatch` of this request, and
+    only made when they are sent. Unless the request has meta variables
+    changing with each request (generators), its other parts, and the
+    fuzzed part itself, are prepared once here; making a fuzzed request
+    then only copies the containers along the fuzzed position. A JSON or
+    XML body is also serialized once (see :class:`BodySplice`).
+
+    :param req: The RequestObject to be fuzzed, which must not be changed
+        while its fuzzed requests are made
+    :type req: :class:`syntribos.clients.http.parser.RequestObject`
+    :param str fuzz_type: What attribute of the RequestObject to fuzz
+    :param index: The fuzzable positions of the fuzzed part
+    :type index: :class:`FuzzIndex`
+    """
+
+    def __init__(self, req, fuzz_type, index=None):
+        self.req = req
+        self.fuzz_type = fuzz_type
+        self.index = index
+        self.static = None
+        self.prepared = None
+        self.value = None
+        self.splice = None
+        self._lock = threading.Lock()
+
+    def _prepare(self):
+        """Prepares the request once, when the first fuzzed one is made"""
+        with self._lock:
+            if self.static is None:
+                if _is_static(self.req):
+                    self._prepare_static()
+                self.static = self.prepared is not None
+
+    def _prepare_static(self):
+        prepared = self.req.get_copy()
+        for name in ("data", "headers", "params", "url"):
+            value = getattr(prepared, name)
+            if name == self.fuzz_type:
+                if not isinstance(value, six.string_types):
+                    self.value = prepared._run_iters(
+                        value, prepared.action_field)
+                continue
+            value = prepared._run_iters(value, prepared.action_field)
+            setattr(prepared, name, _finish_value(prepared, name, value))
+        self.prepared = prepared
+        if (self.fuzz_type == "data" and self.value is not None and
+                self.index and _splice_enabled()):
+            try:
+                self.splice = BodySplice(
+                    prepared.data_type, self.value,
+                    [path for path, _, _ in self.index.positions], self._key)
+            except Exception as e:
+                LOG.debug("Serializing each fuzzed body: %s", e)
+
+    def _key(self, key):
+        """Returns the name a dict key of the request is sent with"""
+        if not isinstance(key, six.string_types):
+            return key
+        return self.req._replace_iter(key).replace(self.req.action_field, "")
+
+    def _leaf(self, step, payload):
+        """Returns `payload` as prepared at a position of kind `step`"""
+        payload = self.req._replace_iter(payload)
+        if step in ("item", "text"):
+            payload = payload.replace(self.req.action_field, "")
+        return payload
+
+    def materialize(self, path, payload):
+        """Makes the request with `payload` placed at `path`
+
+        :param tuple path: Position, as found by :func:`_fuzz_positions`
+        :param str payload: String placed at the position
+        :returns: A prepared copy of the request
+        :rtype: :class:`syntribos.clients.http.parser.RequestObject`
+        """
+        if self.static is None:
+            self._prepare()
+        if not self.static:
+            # The generators of the request can't be run by two threads
+            with self._lock:
+                request = self.req.get_copy()
+                setattr(request, self.fuzz_type, _set_path(
+                    getattr(request, self.fuzz_type), path, payload))
+                request.prepare_request()
+            return request
+        request = copy.copy(self.prepared)
+        for name in ("headers", "params"):
+            value = getattr(request, name)
+            if isinstance(value, dict) and name != self.fuzz_type:
+                setattr(request, name, dict(value))
+        if self.value is None:
+            value = _set_path(getattr(self.req, self.fuzz_type), path, payload)
+            value = request._run_iters(value, request.action_field)
+        elif self.splice is not None:
+            request.data = self.splice.make(
+                path, self._leaf(path[-1][0], payload))
+            return request
+        else:
+            value = _set_path(self.value, path,
+                              self._leaf(path[-1][0], payload), self._key)
+        setattr(request, self.fuzz_type,
+                _finish_value(request, self.fuzz_type, value))
+        return request
+
+
+class BodySplice(object):
+    """A serialized request body, split at its fuzzable positions
+
+    The body is serialized once, with a marker at each position; a fuzzed
+    body is then made by joining the serialized parts around its position
+    with the payload, encoded as :meth:`RequestHelperMixin._string_data
+    <syntribos.clients.http.parser.RequestHelperMixin._string_data>` would
+    encode it in the body.
+
+    :param str data_type: "json" or "xml"
+    :param value: The body, with its meta variables replaced
+    :param list paths: Fuzzable positions of the body
+    :param key_func: Maps the dict keys of the paths to the keys of `value`
+    :raises ValueError: If the body can't be spliced
+    """
+
+    def __init__(self, data_type, value, paths, key_func=None):
+        if data_type not in ("json", "xml"):
+            raise ValueError("Can't splice a {0} body".format(data_type))
+        self.data_type = data_type
+        token = "syntribos{0}".format(uuid.uuid4().hex)
+        marked = value
+        markers = []
+        for num, path in enumerate(paths):
+            marker = "{0}x{1}x".format(token, num)
+            marked = _set_path(marked, path, marker, key_func)
+            markers.append(self.encode(path, marker))
+        serialized = RequestHelperMixin._string_data(marked, data_type)
+        holes = []
+        for num, marker in enumerate(markers):
+            start = serialized.find(marker)
+            if start < 0 or serialized.find(marker, start + 1) >= 0:
+                raise ValueError("Position {0} not found".format(paths[num]))
+            holes.append((start, start + len(marker), paths[num]))
+        self.parts = []
+        self.slots = {}
+        last = 0
+        for start, stop, path in sorted(holes):
+            self.parts.append(serialized[last:start])
+            self.slots[path] = len(self.parts)
+            self.parts.append(
+                self.encode(path, _get_path(value, path, key_func)))
+            last = stop
+        self.parts.append(serialized[last:])
+        if "".join(self.parts) != RequestHelperMixin._string_data(
+                value, data_type):
+            raise ValueError("The body isn't serialized the same way")
+
+    def encode(self, path, value):
+        """Returns `value` as serialized at `path` in the body"""
+        if self.data_type == "json":
+            return json.dumps(value)
+        if path[-1][0] == "attrib":
+            ele = ElementTree.Element("a", {"b": value})
+            head, tail = '<a b="', '" />'
+        else:
+            ele = ElementTree.Element("a")
+            ele.text = value
+            head, tail = "<a>", "</a>"
+        serialized = RequestHelperMixin._string_data(ele, "xml")
+        if not (serialized.startswith(head) and serialized.endswith(tail)):
+            raise ValueError("Unexpected XML {0}".format(serialized))
+        return serialized[len(head):-len(tail)]
+
+    def make(self, path, payload):
+        """Returns the serialized body, with `payload` placed at `path`"""
+        slot = self.slots[path]
+        return "{0}{1}{2}".format("".join(self.parts[:slot]),
+                                  self.encode(path, payload),
+                                  "".join(self.parts[slot + 1:]))
+
+
+class FuzzPatch(object):
+    """A fuzzed request, kept as the request it is made from and the change
+
+    :ivar base: The request being fuzzed
+    :vartype base: :class:`FuzzBase`
+    :ivar tuple path: Position of the fuzz string in the fuzzed part
+    :ivar str payload: The fuzz string
+    """
+
+    __slots__ = ("base", "path", "payload")
+
+    def __init__(self, base, path, payload):
+        self.base = base
+        self.path = path
+        self.payload = payload
+
+    def materialize(self):
+        """Makes the fuzzed request, see :meth:`FuzzBase.materialize`"""
+        return self.base.materialize(self.path, self.payload)
+
+
+class FuzzIndex(object):
+    """The fuzzable positions of one part of a request
+
+    The part is walked once, skipping its ACTION_FIELDs; fuzzing it is then
+    a loop over positions and strings. Which strings fit the limits of the
+    positions' meta variables is found once for each list of strings (see
+    :class:`PayloadTraits`).
+
+    :param data: Can be a dict, XML Element, or string
+    :param str skip_var: String representing ACTION_FIELDs
+    :ivar tuple positions: (path, ImpactedParameter name, VariableObject or
+        `None`) of each position, see :func:`_fuzz_positions`
+    :ivar int num_free: Number of positions without a meta variable
+    :ivar tuple var_objs: Meta variables limiting the other positions
+    """
+
+    def __init__(self, data, skip_var):
+        self.positions = tuple(_fuzz_positions(data, skip_var))
+        self.var_objs = tuple(var_obj for _, _, var_obj in self.positions
+                              if var_obj is not None)
+        self.num_free = len(self.positions) - len(self.var_objs)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def rows(self, strings):
+        """Returns, for each position, the flags of the `strings` it takes,
+        or None if it takes all of them
+        """
+        if not self.var_objs:
+            return [None] * len(self.positions)
+        traits = get_traits(strings)
+        return [None if var_obj is None else traits.eligible(var_obj)
+                for _, _, var_obj in self.positions]
+
+    def cases(self, strings):
+        """Places each of `strings` in each position taking it
+
+        :returns: Generator of tuples: (string number, string, model number,
+            path, ImpactedParameter name), numbered from 1
+        """
+        rows = self.rows(strings)
+        for num, stri in enumerate(strings):
+            model_num = 0
+            for (path, param_path, _), row in zip(self.positions, rows):
+                if row is None or row[num]:
+                    model_num += 1
+                    yield num + 1, stri, model_num, path, param_path
+
+    def count(self, strings):
+        """Counts the positions each of `strings` is placed in"""
+        if not self.positions:
+            return 0
+        elif not self.var_objs:
+            return self.num_free * len(strings)
+        traits = get_traits(strings)
+        return self.num_free * len(traits) + sum(
+            traits.eligible(var_obj).count(1) for var_obj in self.var_objs)
+
+
+def get_index(req, fuzz_type):
+    """Returns the :class:`FuzzIndex` of the `fuzz_type` part of `req`
+
+    The index of a request handed out by
+    :class:`syntribos.clients.http.parser.CompiledTemplate` is made once for
+    the template, and used by every test type fuzzing the same part.
+    """
+    indexes = _fuzz_indexes.get(req)
+    if indexes is None:
+        return FuzzIndex(getattr(req, fuzz_type), req.action_field)
+    index = indexes.get(fuzz_type)
+    if index is None:
+        index = indexes.setdefault(
+            fuzz_type, FuzzIndex(getattr(req, fuzz_type), req.action_field))
+    return index
+
+
+def fuzz_patches(req, strings, fuzz_type, name_prefix):
+    """Places each string in each fuzzable position of the request
+
+    The positions are found once (see :func:`get_index`); no request is made
+    (see :meth:`FuzzPatch.materialize`).
+
+    :param req: The RequestObject to be fuzzed
+    :type req: :class:`syntribos.clients.http.parser.RequestObject`
+    :param list strings: List of strings to fuzz with
+    :param str fuzz_type: What attribute of the RequestObject to fuzz
+    :param name_prefix: (Used for ImpactedParameter)
+    :returns: Generator of tuples:
+        (name, :class:`FuzzPatch`, fuzzstring, ImpactedParameter name)
+    :rtype: `tuple`
+    """
+    index = get_index(req, fuzz_type)
+    if not index:
+        return
+    base = FuzzBase(req, fuzz_type, index)
+    for str_num, stri, model_num, path, param_path in index.cases(strings):
+        name = "{0}str{1}_model{2}".format(name_prefix, str_num, model_num)
+        yield name, FuzzPatch(base, path, stri), stri, param_path
 
 
 def fuzz_request(req, strings, fuzz_type, name_prefix):
     """Creates the fuzzed RequestObject
 
-    Gets the name and the fuzzed request model from _fuzz_data, and
-    creates a RequestObject from the parameters of the model.
+    Makes the request of each :class:`FuzzPatch` from `fuzz_patches`.
 
     :param req: The RequestObject to be fuzzed
     :type req: :class:`syntribos.clients.http.parser.RequestObject`
@@ -37,224 +351,346 @@ def fuzz_request(req, strings, fuzz_type, name_prefix):
         (name, request, fuzzstring, ImpactedParameter name)
     :rtype: `tuple`
     """
-    for name, data, stri, param_path in _fuzz_data(
-            strings, getattr(req, fuzz_type), req.action_field, name_prefix):
-        request_copy = req.get_copy()
-        setattr(request_copy, fuzz_type, data)
-        request_copy.prepare_request()
-        yield name, request_copy, stri, param_path
+    for name, patch, stri, param_path in fuzz_patches(
+            req, strings, fuzz_type, name_prefix):
+        yield name, patch.materialize(), stri, param_path
 
 
-def _fuzz_data(strings, data, skip_var, name_prefix):
-    """Iterates through model fields and places fuzz string in each field
+def count_fuzz_cases(req, strings, fuzz_type):
+    """Counts the fuzzed requests `fuzz_request` would generate
 
-    For each attribute in the model object, call the _build_X_combinations
-    method corresponding to the type of the data parameter, which replaces
-    the value with the fuzz string.
+    The fuzzable positions of the request are found once (see
+    :func:`get_index`), and each string is checked against the limits of the
+    position's meta variable (if any), so no requests are copied or built.
 
+    :param req: The RequestObject to be fuzzed
+    :type req: :class:`syntribos.clients.http.parser.RequestObject`
     :param list strings: List of strings to fuzz with
-    :param data: Can be a dict, XML Element, or string
-    :param str skip_var: String representing ACTION_FIELDs
-    :param str name_prefix: (Used for ImpactedParameter)
-    :returns: Generator of tuples:
-        (name, model, string, ImpactedParameter name)
+    :param str fuzz_type: What attribute of the RequestObject to fuzz
+    :returns: Number of fuzzed requests
+    :rtype: int
     """
-    param_path = ""
-    for str_num, stri in enumerate(strings, 1):
-        if isinstance(data, dict):
-            model_iter = _build_dict_combinations(stri, data, skip_var)
-        elif isinstance(data, ElementTree.Element):
-            model_iter = _build_xml_combinations(stri, data, skip_var)
-        elif isinstance(data, six.string_types):
-            model_iter = _build_str_combinations(stri, data)
-        else:
-            raise TypeError("Format not recognized!")
-        for model_num, (model, param_path) in enumerate(model_iter, 1):
-            name = "{0}str{1}_model{2}".format(name_prefix, str_num, model_num)
-            yield (name, model, stri, param_path)
+    return get_index(req, fuzz_type).count(strings)
 
 
-def _build_str_combinations(fuzz_string, data):
-    """Places `fuzz_string` in fuzz location for string data.
+def _is_static(req):
+    """Checks that preparing `req` always gives the same request
 
-    :param str fuzz_string: Value to place in fuzz location
-    :param str data: Lines from the request template
+    That is, that it has no meta variable of type generator, directly or
+    through a ``CALL_EXTERNAL`` generator.
     """
-    # Match either "{identifier:value}" or "{value}"
-    var_regex = r"{([\w]*):?([^}]*)}"
-    for match in re.finditer(var_regex, data):
-        start, stop = match.span()
-        model = "{0}{1}{2}".format(data[:start], fuzz_string, data[stop:])
-
-        if match.group(1):
-            # The string is of the format "{identifier:value}", so we just
-            # want the identifier as the param_path
-            param = match.group(1)
-        else:
-            param = match.group(0)
+    def is_static(obj):
+        if isinstance(obj, VariableObject):
+            return obj.var_type != "generator"
+        elif isinstance(obj, six.string_types):
+            for _, key in find_placeholders(obj):
+                var_obj = _string_var_objs.get(key)
+                if var_obj is None or var_obj.var_type == "generator":
+                    return False
+            return True
+        elif isinstance(obj, dict):
+            return all(is_static(k) and is_static(v) for k, v in obj.items())
+        elif isinstance(obj, list):
+            return all(is_static(v) for v in obj)
+        elif isinstance(obj, ElementTree.Element):
+            return (is_static(obj.text) and is_static(obj.attrib) and
+                    all(is_static(child) for child in obj))
+        return True
+
+    return all(is_static(getattr(req, name))
+               for name in ("data", "headers", "params", "url"))
+
+
+def _finish_value(req, name, value):
+    """Does what `prepare_request` does to `name` after running iterators"""
+    if name == "data":
+        return req._string_data(value, req.data_type)
+    elif name == "url":
+        return req._remove_braces(req._remove_attr_names(value))
+    return value
+
+
+def _splice_enabled():
+    try:
+        return CONF.syntribos.splice_body
+    except (cfg.NoSuchOptError, cfg.NoSuchGroupError):
+        return True
+
+
+def _fuzz_positions(data, skip_var):
+    """Finds every position in `data` that a fuzz string could be placed in
 
-        if param in _string_var_objs:
-            var_obj = _string_var_objs[param]
-            if not _check_var_obj_limits(var_obj, fuzz_string):
-                continue
-            param = RequestCreator.replace_one_variable(var_obj)
-        yield model, param
+    :param data: Can be a dict, XML Element, or string
+    :param str skip_var: String representing ACTION_FIELDs
+    :returns: list of tuples (path, ImpactedParameter name, VariableObject
+        limiting the position or `None`). A path is a tuple of (kind, key)
+        steps, see :func:`_set_path`
+    """
+    if isinstance(data, dict):
+        return list(_dict_positions(data, skip_var))
+    elif isinstance(data, ElementTree.Element):
+        return list(_xml_positions(data, skip_var))
+    elif isinstance(data, six.string_types):
+        return list(_str_positions(data))
+    else:
+        raise TypeError("Format not recognized!")
 
 
-def _build_dict_combinations(fuzz_string, dic, skip_var):
-    """Places fuzz string in fuzz location for object data.
+def _str_positions(data):
+    # Match either "{identifier:value}" or "{value}"
+    for match in re.finditer(r"{([\w]*):?([^}]*)}", data):
+        # With "{identifier:value}", the identifier is the param_path
+        param = match.group(1) or match.group(0)
+        var_obj = _string_var_objs.get(param)
+        if var_obj is not None:
+            param = RequestCreator.replace_one_variable(var_obj)
+        yield (("span", match.span()),), param, var_obj
 
-    :param str fuzz_string: Value to place in fuzz location
-    :param dic: A dictionary to fuzz
-    :param skip_var: ACTION_FIELD UUID value to skip
-    """
+
+def _dict_positions(dic, skip_var, kind="key"):
     for key, val in dic.items():
         if skip_var in key:
             continue
         elif isinstance(val, VariableObject):
-            if not _check_var_obj_limits(val, fuzz_string):
-                continue
-            else:
-                yield _merge_dictionaries(dic, {key: fuzz_string}), key
+            yield ((kind, key),), key, val
         elif isinstance(val, dict):
-            for ret, param_path in _build_dict_combinations(fuzz_string, val,
-                                                            skip_var):
-                yield (_merge_dictionaries(dic, {
-                    key: ret
-                }), "{0}/{1}".format(key, param_path))
+            for path, param_path, var_obj in _dict_positions(val, skip_var):
+                yield (((kind, key),) + path,
+                       "{0}/{1}".format(key, param_path), var_obj)
         elif isinstance(val, list):
             for i, v in enumerate(val):
-                list_ = [_ for _ in val]
                 if isinstance(v, dict):
-                    for ret, param_path in _build_dict_combinations(
-                            fuzz_string, v, skip_var):
-                        list_[i] = copy.copy(ret)
-                        yield (_merge_dictionaries(dic, {
-                            key: ret
-                        }), "{0}[{1}]/{2}".format(key, i, param_path))
-                elif isinstance(v, VariableObject):
-                    if not _check_var_obj_limits(v, fuzz_string):
-                        continue
-                else:
-                    list_[i] = fuzz_string
-                    yield (_merge_dictionaries(dic, {
-                        key: list_
-                    }), "{0}[{1}]".format(key, i))
+                    for path, param_path, var_obj in _dict_positions(
+                            v, skip_var):
+                        yield (((kind, key), ("item", i)) + path,
+                               "{0}[{1}]/{2}".format(key, i, param_path),
+                               var_obj)
+                elif not isinstance(v, VariableObject):
+                    yield (((kind, key), ("item", i)),
+                           "{0}[{1}]".format(key, i), None)
         else:
-            yield _merge_dictionaries(dic, {key: fuzz_string}), key
+            yield ((kind, key),), key, None
+
+
+def _xml_positions(ele, skip_var):
+    if skip_var in ele.tag:
+        return
+    if ele.text and skip_var not in ele.text:
+        yield (("text", None),), ele.tag, None
+    for path, param_path, var_obj in _dict_positions(ele.attrib, skip_var,
+                                                     kind="attrib"):
+        yield path, "{0}/{1}".format(ele.tag, param_path), var_obj
+    for i, element in enumerate(list(ele)):
+        for path, param_path, var_obj in _xml_positions(element, skip_var):
+            yield ((("child", i),) + path,
+                   "{0}/{1}".format(ele.tag, param_path), var_obj)
+
+
+def _set_path(data, path, value, key_func=None):
+    """Returns a copy of `data`, with `value` placed at `path`
+
+    Only the containers along the path are copied, the rest is shared with
+    `data`, which is left unchanged.
+
+    :param data: Can be a dict, list, XML Element, or string
+    :param tuple path: (kind, key) steps to the position: "key" of a dict,
+        "item" of a list, "attrib" and "child" of an XML element, its "text",
+        or the "span" (start, stop) of a string
+    :param value: Value to place at the position
+    :param key_func: Maps the dict keys of the path to the keys of `data`
+    """
+    kind, key = path[0]
+    rest = path[1:]
+    if kind == "span":
+        start, stop = key
+        return "{0}{1}{2}".format(data[:start], value, data[stop:])
+    elif kind == "text":
+        ret = copy.copy(data)
+        ret.text = value
+        return ret
+    elif kind == "child":
+        ret = copy.copy(data)
+        ret[key] = _set_path(data[key], rest, value, key_func)
+        return ret
+    elif kind == "attrib":
+        ret = copy.copy(data)
+        ret.attrib = _set_path(data.attrib, (("key", key),) + rest, value,
+                               key_func)
+        return ret
+    elif kind == "item":
+        ret = list(data)
+    else:
+        ret = data.copy()
+        if key_func is not None:
+            key = key_func(key)
+    ret[key] = _set_path(ret[key], rest, value, key_func) if rest else value
+    return ret
 
 
-def _merge_dictionaries(x, y):
-    """Merge `dicts` together
+def _get_path(data, path, key_func=None):
+    """Returns the value at `path` in `data`, see :func:`_set_path`"""
+    for kind, key in path:
+        if kind == "text":
+            return data.text
+        elif kind == "attrib":
+            data = data.attrib
+            kind = "key"
+        if kind == "key" and key_func is not None:
+            key = key_func(key)
+        data = data[key]
+    return data
 
-    Create a copy of `x`, and update that with elements of `y`, to prevent
-    squashing of passed in dicts.
 
-    :param dict x: Dictionary 1
-    :param dict y: Dictionary 2
-    :returns: Merged dictionary
-    :rtype: `dict`
-    """
+def _fuzz_data(strings, data, skip_var, name_prefix):
+    """Iterates through model fields and places fuzz string in each field
 
-    z = x.copy()
-    z.update(y)
-    return z
-
-
-def _build_xml_combinations(stri, ele, skip_var):
-    """Places fuzz string in fuzz location for XML data."""
-    if skip_var not in ele.tag:
-        if ele.text and skip_var not in ele.text:
-            yield _update_xml_ele_text(ele, stri), ele.tag
-        for attr, param_path in _build_dict_combinations(stri, ele.attrib,
-                                                         skip_var):
-            yield (_update_xml_ele_attribs(ele, attr),
-                   "{0}/{1}".format(ele.tag, param_path))
-        for i, element in enumerate(list(ele)):
-            for ret, param_path in _build_xml_combinations(stri, element,
-                                                           skip_var):
-                list_ = list(ele)
-                list_[i] = copy.copy(ret)
-                yield (_update_inner_xml_ele(ele, list_),
-                       "{0}/{1}".format(ele.tag, param_path))
-
-
-def _update_xml_ele_text(ele, text):
-    """Copies an XML element, updates its text attribute with `text`
-
-    :param ele: XML element to be copied, modified
-    :type ele: :class:`xml.ElementTree.Element`
-    :param str text: Text to populate `ele`'s text attribute with
-    :returns: XML element with "text" attribute set to `text`
-    :rtype: :class:`xml.ElementTree.Element`
+    :param list strings: List of strings to fuzz with
+    :param data: Can be a dict, XML Element, or string
+    :param str skip_var: String representing ACTION_FIELDs
+    :param str name_prefix: (Used for ImpactedParameter)
+    :returns: Generator of tuples:
+        (name, model, string, ImpactedParameter name)
     """
-    ret = copy.copy(ele)
-    ret.text = text
-    return ret
+    index = FuzzIndex(data, skip_var)
+    for str_num, stri, model_num, path, param_path in index.cases(strings):
+        name = "{0}str{1}_model{2}".format(name_prefix, str_num, model_num)
+        yield (name, _set_path(data, path, stri), stri, param_path)
 
 
-def _update_xml_ele_attribs(ele, attribs):
-    """Copies an XML element, populates attributes from `attribs`
+def _build_str_combinations(fuzz_string, data):
+    """Places `fuzz_string` in fuzz location for string data.
 
-    :param ele: XML element to be copied, modified
-    :type ele: :class:`xml.ElementTree.Element`
-    :param dict attribs: Source of new attribute values for `ele`
-    :returns: XML element with all attributes overwritten by `attribs`
-    :rtype: :class:`xml.ElementTree.Element`
+    :param str fuzz_string: Value to place in fuzz location
+    :param str data: Lines from the request template
     """
-    ret = copy.copy(ele)
-    ret.attrib = attribs
-    return ret
+    for path, param, var_obj in _str_positions(data):
+        if var_obj is not None and not _check_var_obj_limits(var_obj,
+                                                             fuzz_string):
+            continue
+        yield _set_path(data, path, fuzz_string), param
+
 
+class PayloadTraits(object):
+    """The kind (see :func:`_payload_kind`) and length of each string of a
+    list of payloads
 
-def _update_inner_xml_ele(ele, list_):
-    """Copies an XML element, populates sub-elements from `list_`
+    Which of the strings fit the limits of a meta variable is found once
+    for each set of limits, as a row of flags (1 if the string at that
+    index fits).
 
-    Returns a copy of the element with the subelements given via list_
-    :param ele: XML element to be copied, modified
-    :type ele: :class:`xml.ElementTree.Element`
-    :param list list_: List of subelements to append to `ele`
-    :returns: XML element with new subelements from `list_`
-    :rtype: :class:`xml.ElementTree.Element`
+    :param strings: The payloads
     """
-    ret = copy.copy(ele)
-    for i, v in enumerate(list_):
-        ret[i] = v
-    return ret
 
+    def __init__(self, strings):
+        self.kinds = bytearray()
+        self.lengths = array("L")
+        for stri in strings:
+            self.kinds.append(_payload_kind(stri))
+            self.lengths.append(len(stri))
+        self._rows = {}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def eligible(self, var_obj):
+        """Returns the flags of the strings fitting the limits of `var_obj`
+
+        :rtype: bytearray
+        """
+        limits = _var_obj_limits(var_obj)
+        row = self._rows.get(limits)
+        if row is None:
+            row = self._rows.setdefault(limits, self._row(limits))
+        return row
+
+    def _row(self, limits):
+        if limits is None:
+            return bytearray(len(self.kinds))
+        mask, min_length, max_length = limits
+        if mask is None:
+            row = bytearray(b"\x01") * len(self.kinds)
+        else:
+            table = bytearray(1 if kind & mask else 0 for kind in range(256))
+            row = self.kinds.translate(table)
+        if self.lengths and (min(self.lengths) < min_length or
+                             max(self.lengths) > max_length):
+            for num, length in enumerate(self.lengths):
+                if length < min_length or length > max_length:
+                    row[num] = 0
+        return row
 
-def _check_var_obj_limits(var_obj, fuzz_string):
+
+_traits = {}
+_traits_lock = threading.Lock()
+
+
+def get_traits(strings):
+    """Returns the :class:`PayloadTraits` of `strings`
+
+    Those of a payload file's strings (a tuple, or
+    :class:`syntribos.utils.payloads.MappedPayloads`) are found once per run.
+    """
+    if not isinstance(strings, (tuple, MappedPayloads)):
+        return PayloadTraits(strings)
+    cached = _traits.get(id(strings))
+    if cached is None or cached[0] is not strings:
+        with _traits_lock:
+            cached = _traits.get(id(strings))
+            if cached is None or cached[0] is not strings:
+                # The strings are kept so that their id isn't reused
+                cached = _traits[id(strings)] = (strings,
+                                                 PayloadTraits(strings))
+    return cached[1]
+
+
+_INT, _ASCII, _URL, _STR = 1, 2, 4, 8
+_FUZZ_TYPES = {"int": _INT, "ascii": _ASCII, "url": _URL, "str": _STR}
+_URL_RE = re.compile(r"^[A-Za-z0-9\-\._~:\/\?#[\]@!\$&'()*\+,;=%]+$")
+
+
+def _payload_kind(fuzz_string):
+    """Returns the flags of the fuzz types `fuzz_string` is of"""
+    kind = 0
+    try:
+        int(fuzz_string)
+        kind |= _INT
+    except ValueError:
+        pass
+    try:
+        fuzz_string.encode('ascii')
+        kind |= _ASCII
+    except UnicodeEncodeError:
+        pass
+    if _URL_RE.match(fuzz_string):
+        kind |= _URL
+    try:
+        str(fuzz_string)
+        kind |= _STR
+    except ValueError:
+        pass
+    return kind
+
+
+def _var_obj_limits(var_obj):
+    """Returns the limits of `var_obj` as a (fuzz types flags, min length,
+    max length) tuple, the flags being None if any type fits, or None if
+    the variable isn't fuzzed
+    """
     if not var_obj.fuzz:
-        return False
+        return None
+    mask = None
     if var_obj.fuzz_types:
-        ret = False
-        if "int" in var_obj.fuzz_types:
-            try:
-                int(fuzz_string)
-                ret = True
-            except ValueError:
-                pass
-        if "ascii" in var_obj.fuzz_types:
-            try:
-                fuzz_string.encode('ascii')
-                ret = True
-            except UnicodeEncodeError:
-                pass
-        if "url" in var_obj.fuzz_types:
-            url_re = r"^[A-Za-z0-9\-\._~:\/\?#[\]@!\$&'()*\+,;=%]+$"
-            if re.match(url_re, fuzz_string):
-                ret = True
-        if "str" in var_obj.fuzz_types:
-            try:
-                str(fuzz_string)
-                ret = True
-            except ValueError:
-                pass
-        if not ret:
-            return ret
-
-    if len(fuzz_string) > var_obj.max_length:
+        mask = 0
+        for fuzz_type in var_obj.fuzz_types:
+            mask |= _FUZZ_TYPES.get(fuzz_type, 0)
+    return mask, var_obj.min_length, var_obj.max_length
+
+
+def _check_var_obj_limits(var_obj, fuzz_string):
+    limits = _var_obj_limits(var_obj)
+    if limits is None:
         return False
-    if len(fuzz_string) < var_obj.min_length:
+    mask, min_length, max_length = limits
+    if mask is not None and not _payload_kind(fuzz_string) & mask:
         return False
-    return True
+    return min_length <= len(fuzz_string) <= max_length
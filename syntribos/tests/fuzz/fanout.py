@@ -0,0 +1,189 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Payloads shared by several test types
+
+Many payload files hold the same strings (e.g. common injection primitives
+are found in ``sql-injection.txt``, ``string_validation.txt`` and
+``command_injection.txt``), so test types fuzzing the same part of a request
+(its body, params, headers or URL) send identical requests.
+
+Before a run, a :class:`PayloadPlan` finds the payloads fuzzed by more than
+one of the selected test types. For each template, a fuzzed request carrying
+such a payload is sent once, by whichever test case gets to it first; the
+response is handed to the cases of the other test types as they ask for it,
+each of them running its own checks on it.
+"""
+import collections
+import logging
+import threading
+
+from oslo_config import cfg
+
+from syntribos.clients.http import pool
+from syntribos.clients.http.response_cache import request_key
+from syntribos.clients.http.response_cache import ResponseCache
+from syntribos.utils.payloads import MappedPayloads
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+
+
+class PayloadPlan(object):
+    """Counts the selected test types fuzzing each payload
+
+    Test types are grouped by where they insert their payloads (see
+    :meth:`group`); only types in the same group send identical requests.
+    Memory-mapped payload files (see
+    :class:`syntribos.utils.payloads.MappedPayloads`) are left out.
+
+    :param list test_classes: The test classes selected for the run
+    """
+
+    def __init__(self, test_classes):
+        self.counts = collections.Counter()
+        for test_class in test_classes:
+            if not getattr(test_class, "share_payloads", False):
+                continue
+            strings = test_class.get_shared_payloads()
+            if isinstance(strings, MappedPayloads):
+                continue
+            group = self.group(test_class)
+            self.counts.update((group, s) for s in set(strings))
+        self.counts = collections.Counter(
+            {key: count for key, count in self.counts.items() if count > 1})
+        LOG.debug("%s payloads are shared by several test types",
+                  len(self.counts))
+
+    @staticmethod
+    def group(test_class):
+        return (test_class.parameter_location,
+                getattr(test_class, "url_var", None))
+
+    def consumers(self, test_class, payload):
+        """Returns the number of test types sending `payload` like
+        `test_class` does, 1 if it is not shared
+        """
+        return self.counts.get((self.group(test_class), payload), 1)
+
+    def assign(self, test_class, case):
+        """Sets the number of test types sending the request of `case`"""
+        if case is not None and getattr(test_class, "share_payloads", False):
+            case.shared_by = self.consumers(
+                test_class, getattr(case, "fuzz_string", None))
+
+
+class SharedRequest(object):
+    """A request sent once, whose result is waited for by other test cases
+
+    :ivar int remaining: Number of test cases yet to ask for the request
+    """
+
+    def __init__(self, consumers):
+        self.remaining = consumers
+        self.result = None
+        self._event = threading.Event()
+
+    def publish(self, result):
+        """Hands the (response, signals) of the request to the waiting cases,
+        None if it could not be sent
+        """
+        self.result = result
+        self._event.set()
+
+    def wait(self):
+        """Returns a (response, signals) tuple of the shared request, with
+        signals of its own, or None if it could not be sent
+        """
+        self._event.wait()
+        if self.result is None:
+            return None
+        pool.stats.increment("requests_avoided")
+        return ResponseCache.share(self.result)
+
+
+class FanOut(object):
+    """Keeps the shared requests of the templates being run"""
+
+    def __init__(self):
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    def claim(self, template, request, consumers):
+        """Asks for the shared request `request` of `template`
+
+        The first caller is to send the request, and :meth:`publish
+        <SharedRequest.publish>` its result; the other `consumers` - 1
+        callers :meth:`wait <SharedRequest.wait>` for it.
+
+        :param str template: Path of the template
+        :param request: The fuzzed request
+        :type request: :class:`syntribos.clients.http.parser.RequestObject`
+        :param int consumers: Number of test cases sending `request`
+        :returns: tuple of (:class:`SharedRequest`, True if the caller is to
+            send the request)
+        """
+        key = (template, request_key(request.method, request.url,
+                                     request.headers, request.params,
+                                     request.data))
+        with self._lock:
+            shared = self.entries.get(key)
+            sender = shared is None
+            if sender:
+                shared = self.entries[key] = SharedRequest(consumers)
+            shared.remaining -= 1
+            if shared.remaining <= 0:
+                del self.entries[key]
+        return shared, sender
+
+    def discard(self, template):
+        """Drops the requests of `template` not asked for by every case
+
+        A test type may not send all the requests it was expected to (e.g.
+        when its template has meta variables changing with each request).
+        """
+        with self._lock:
+            for key in [k for k in self.entries if k[0] == template]:
+                del self.entries[key]
+
+
+_fanout = FanOut()
+_plans = {}
+_plans_lock = threading.Lock()
+
+
+def get_fanout():
+    return _fanout
+
+
+def get_plan(list_of_tests):
+    """Returns the payload plan of the selected tests, made once per run
+
+    :param list list_of_tests: (test name, test class) tuples
+    :returns: A :class:`PayloadPlan`, or None if ``[syntribos]
+        share_payloads`` isn't set
+    """
+    try:
+        if not CONF.syntribos.share_payloads:
+            return None
+    except (cfg.NoSuchOptError, cfg.NoSuchGroupError):
+        return None
+    key = tuple(name for name, _ in list_of_tests)
+    plan = _plans.get(key)
+    if plan is None:
+        with _plans_lock:
+            plan = _plans.get(key)
+            if plan is None:
+                plan = _plans[key] = PayloadPlan(
+                    [test_class for _, test_class in list_of_tests])
+    return plan
@@ -73,23 +73,37 @@ class UserDefinedVulnBody(base_fuzz.BaseFuzzTestCase):
                                "to time-based injection attacks using the user"
                                " provided strings.")))
 
+    @classmethod
+    def get_shared_payloads(cls):
+        conf_var = CONF.user_defined.payload
+        if conf_var is None or not os.path.isfile(conf_var):
+            return ()
+        return super(UserDefinedVulnBody, cls).get_shared_payloads()
+
+    @classmethod
+    def count_test_cases(cls, filename, file_content, meta_vars):
+        conf_var = CONF.user_defined.payload
+        if conf_var is None or not os.path.isfile(conf_var):
+            return 0
+        return super(UserDefinedVulnBody, cls).count_test_cases(
+            filename, file_content, meta_vars)
+
     @classmethod
     def get_test_cases(cls, filename, file_content, meta_vars):
         """Generates test cases if a payload file is provided."""
         conf_var = CONF.user_defined.payload
         if conf_var is None or not os.path.isfile(conf_var):
             return
-        cls.failures = []
         prefix_name = "{filename}_{test_name}_{fuzz_file}_".format(
             filename=filename,
             test_name=cls.test_name,
             fuzz_file=cls.data_key)
-        fr = syntribos.tests.fuzz.datagen.fuzz_request(
+        fr = syntribos.tests.fuzz.datagen.fuzz_patches(
             cls.init_req, cls._get_strings(), cls.parameter_location,
             prefix_name)
-        for fuzz_name, request, fuzz_string, param_path in fr:
-            yield cls.extend_class(fuzz_name, fuzz_string, param_path,
-                                   {"request": request})
+        for fuzz_name, patch, fuzz_string, param_path in fr:
+            yield cls.new_fuzz_case(fuzz_name, patch, fuzz_string,
+                                    param_path)
 
 
 class UserDefinedVulnParams(UserDefinedVulnBody):
@@ -16,6 +16,7 @@ from oslo_config import cfg
 import syntribos
 from syntribos.checks import has_string as has_string
 from syntribos.checks import time_diff as time_diff
+from syntribos.clients.http import baseline
 from syntribos.clients.http import parser
 from syntribos.tests.fuzz import base_fuzz
 import syntribos.tests.fuzz.datagen
@@ -29,6 +30,7 @@ class XMLExternalEntityBody(base_fuzz.BaseFuzzTestCase):
     test_name = "XML_EXTERNAL_ENTITY_BODY"
     parameter_location = "data"
     dtds_data_key = "xml-external.txt"
+    share_payloads = False
     failure_keys = [
         'root:',
         'root@',
@@ -40,6 +42,17 @@ class XMLExternalEntityBody(base_fuzz.BaseFuzzTestCase):
         'disk(0)',
         'partition']
 
+    @classmethod
+    def count_test_cases(cls, filename, file_content, meta_vars):
+        """Counts the tests generated if the API call supports XML
+
+        Whether XML is supported can only be found out by sending requests,
+        so this is an upper bound.
+        """
+        num_dtds = len(cls._get_strings(cls.dtds_data_key))
+        return num_dtds * syntribos.tests.fuzz.datagen.count_fuzz_cases(
+            cls.init_req, ["&xxe;"], cls.parameter_location)
+
     @classmethod
     def get_test_cases(cls, filename, file_content, meta_vars):
         """Makes sure API call supports XML
@@ -56,12 +69,8 @@ class XMLExternalEntityBody(base_fuzz.BaseFuzzTestCase):
         prepared_copy_xml = prepared_copy.get_prepared_copy()
         prepared_copy_xml.headers['content-type'] = "application/xml"
 
-        init_response, init_signals = cls.client.send_request(prepared_copy)
-        _, xml_signals = cls.client.send_request(
-            prepared_copy_xml)
-
-        cls.init_resp = init_response
-        cls.init_signals = init_signals
+        _, init_signals = baseline.send_baseline(cls.client, prepared_copy)
+        _, xml_signals = baseline.send_baseline(cls.client, prepared_copy_xml)
 
         if ("HTTP_CONTENT_TYPE_XML" not in init_signals and
                 "HTTP_CONTENT_TYPE_XML" not in xml_signals):
@@ -78,8 +87,8 @@ class XMLExternalEntityBody(base_fuzz.BaseFuzzTestCase):
                 request_obj, ["&xxe;"], cls.parameter_location, prefix_name)
             for fuzz_name, request, fuzz_string, param_path in fr:
                 request.data = "{0}\n{1}".format(dtd, request.data)
-                yield cls.extend_class(fuzz_name, fuzz_string, param_path,
-                                       {"request": request})
+                yield cls.new_fuzz_case(fuzz_name, request, fuzz_string,
+                                        param_path)
 
     def test_case(self):
         self.run_default_checks()
@@ -17,6 +17,7 @@ from oslo_config import cfg
 import syntribos
 from syntribos._i18n import _
 from syntribos.checks.header import cors
+from syntribos.clients.http import baseline
 from syntribos.clients.http import client
 from syntribos.clients.http import parser
 from syntribos.tests import base
@@ -39,10 +40,11 @@ class CorsHeader(base.BaseTestCase):
             file_content, CONF.syntribos.endpoint, meta_vars
         )
         prepared_copy = request_obj.get_prepared_copy()
-        cls.test_resp, cls.test_signals = cls.client.send_request(
-            prepared_copy)
-        cls.test_req = request_obj.get_prepared_copy()
-        yield cls
+        test_resp, test_signals = baseline.send_baseline(
+            cls.client, prepared_copy)
+        yield cls.new_case(attrs={
+            "test_resp": test_resp, "test_signals": test_signals,
+            "test_req": request_obj.get_prepared_copy()})
 
     def test_case(self):
         self.test_signals.register(cors(self))
@@ -52,9 +52,9 @@ class XstHeader(base.BaseTestCase):
         prepared_copy = request_obj.get_prepared_copy()
         prepared_copy.method = "TRACE"
         prepared_copy.headers.update(xst_header)
-        cls.test_resp, cls.test_signals = cls.client.send_request(
-            prepared_copy)
-        yield cls
+        test_resp, test_signals = cls.client.send_request(prepared_copy)
+        yield cls.new_case(attrs={"test_resp": test_resp,
+                                  "test_signals": test_signals})
 
     def test_case(self):
         self.test_signals.register(xst(self))
@@ -13,11 +13,16 @@
 # limitations under the License.
 # pylint: skip-file
 from syntribos.utils.file_utils import delete_dir
+import syntribos.utils.payloads
 import syntribos.utils.remotes
 
 
 def delete_temps():
-    """Deletes all temporary dirs used for saving cached files."""
+    """Deletes all temporary dirs used for saving cached files.
+
+    Payload files are closed first, as they may be in a temporary dir.
+    """
+    syntribos.utils.payloads.clear_indexes()
     remote_dirs = set(syntribos.utils.remotes.remote_dirs)
     temp_dirs = set(syntribos.utils.remotes.temp_dirs)
     [delete_dir(temp_dir) for temp_dir in temp_dirs]    # noqa
@@ -0,0 +1,252 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Index of the payload files used by the fuzz tests
+
+The payload directory is looked up once per run, and each payload file is
+read once, into a tuple shared by every test type and template using it. A
+file is read again if it changes (its modification time or size differ).
+
+Very large payload files (e.g. user defined wordlists with millions of
+lines) are memory-mapped instead, see :class:`MappedPayloads`.
+"""
+from array import array
+import mmap
+import os
+import threading
+
+from oslo_config import cfg
+import six
+
+from syntribos.utils import remotes
+
+CONF = cfg.CONF
+
+
+class MappedPayloads(object):
+    """The lines of a memory-mapped payload file
+
+    Lines are read from the file as they are asked for, so only the pages
+    of the file being gone through are held in memory, rather than every
+    line. The offset of every `stride`-th line is kept, so that any line
+    can be reached (e.g. to shard a wordlist, or resume part way through
+    it) by reading at most `stride` lines.
+
+    Lines end with "\\n" (or "\\r\\n"). The file must not be truncated
+    while it is mapped.
+
+    :param str path: Path of the payload file
+    :param int stride: Number of lines between two kept offsets
+    """
+
+    def __init__(self, path, stride=1024):
+        self.path = path
+        self.stride = stride
+        self._map = b""
+        with open(path, "rb") as fp:
+            # Empty files can't be mapped
+            if os.fstat(fp.fileno()).st_size:
+                self._map = mmap.mmap(fp.fileno(), 0,
+                                      access=mmap.ACCESS_READ)
+        self._size = len(self._map)
+        self._offsets = array("L")
+        self._length = 0
+        for offset in self._line_offsets(0):
+            if self._length % stride == 0:
+                self._offsets.append(offset)
+            self._length += 1
+
+    def _line_offsets(self, offset):
+        find = self._map.find
+        while offset < self._size:
+            yield offset
+            end = find(b"\n", offset)
+            if end == -1:
+                return
+            offset = end + 1
+
+    def _read_line(self, offset):
+        end = self._map.find(b"\n", offset)
+        if end == -1:
+            end = self._size
+        next_offset = end + 1
+        if end > offset and self._map[end - 1:end] == b"\r":
+            end -= 1
+        line = self._map[offset:end]
+        if six.PY3:
+            line = line.decode("utf-8", "replace")
+        return line, next_offset
+
+    def iter_range(self, start=0, stop=None):
+        """Yields the lines from index `start` up to, not including, `stop`"""
+        start = max(start, 0)
+        stop = self._length if stop is None else min(stop, self._length)
+        if start >= stop:
+            return
+        offset = self._offsets[start // self.stride]
+        for _ in range(start % self.stride):
+            offset = self._read_line(offset)[1]
+        for _ in range(start, stop):
+            line, offset = self._read_line(offset)
+            yield line
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        return self.iter_range()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            lines = list(self.iter_range(start, stop))
+            return lines[::step] if step != 1 else lines
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("payload index out of range")
+        return next(self.iter_range(index, index + 1))
+
+    def close(self):
+        if self._size:
+            self._map.close()
+
+
+class PayloadIndex(object):
+    """Finds and loads the payload files under a directory
+
+    :param str root: Payload directory given by the user (or downloaded)
+    :param int mmap_size: Files of at least this many bytes are
+        memory-mapped (see :class:`MappedPayloads`), instead of read into a
+        tuple. 0 to read every file into a tuple
+    """
+
+    def __init__(self, root, mmap_size=0):
+        self.root = root
+        self.mmap_size = mmap_size
+        self._directory = None
+        self._files = {}
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        """Directory holding the payload files, see :meth:`find_directory`"""
+        if self._directory is None:
+            self._directory = self.find_directory(self.root)
+        return self._directory
+
+    @staticmethod
+    def find_directory(root):
+        """Returns the first directory under `root` with a ``.txt`` file
+
+        Payloads downloaded from a remote are unpacked into a subdirectory
+        of the payload directory; the files are only listed, not read.
+        """
+        if os.path.isfile(root):
+            return os.path.dirname(root)
+        for path, _, files in os.walk(root):
+            if any(file_name.endswith(".txt") for file_name in files):
+                return path
+        return root
+
+    def get_path(self, file_name):
+        """Returns the path of a payload file
+
+        :param str file_name: Name of a file in the payload directory, or the
+            path of any file
+        """
+        if os.path.isfile(file_name):
+            return file_name
+        return os.path.join(self.directory, file_name)
+
+    def get_strings(self, file_name):
+        """Returns the lines of a payload file
+
+        :param str file_name: Name of a file in the payload directory, or the
+            path of any file
+        :returns: The lines of the file, as a tuple or
+            :class:`MappedPayloads`. The same object is returned until the
+            file changes
+        :raises: :exc:`IOError` or :exc:`OSError` if the file can't be read
+        """
+        path = self.get_path(file_name)
+        stat = os.stat(path)
+        version = (stat.st_mtime, stat.st_size)
+        entry = self._files.get(path)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        with self._lock:
+            entry = self._files.get(path)
+            if entry is None or entry[0] != version:
+                if self.mmap_size and stat.st_size >= self.mmap_size:
+                    strings = MappedPayloads(path)
+                else:
+                    with open(path, "r") as fp:
+                        strings = tuple(fp.read().splitlines())
+                old_entry = self._files.get(path)
+                entry = (version, strings)
+                self._files[path] = entry
+                if old_entry is not None:
+                    self._close(old_entry[1])
+        return entry[1]
+
+    @staticmethod
+    def _close(strings):
+        if isinstance(strings, MappedPayloads):
+            strings.close()
+
+    def clear(self):
+        """Forgets the payload files read, closing those memory-mapped"""
+        with self._lock:
+            entries, self._files = self._files, {}
+        for _, strings in entries.values():
+            self._close(strings)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index():
+    """Returns the payload index for the ``[syntribos] payloads`` option
+
+    If no payload directory is given, the payloads are downloaded from
+    ``[remote] payloads_uri``, once per run. Files of at least
+    ``[syntribos] payload_mmap_size`` MiB are memory-mapped.
+    """
+    payloads = CONF.syntribos.payloads
+    index = _indexes.get(payloads)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(payloads)
+            if index is None:
+                root = payloads or remotes.get(CONF.remote.payloads_uri)
+                index = _indexes[payloads] = PayloadIndex(
+                    root, CONF.syntribos.payload_mmap_size * 1024 * 1024)
+    return index
+
+
+def clear_indexes():
+    """Clears every payload index, see :meth:`PayloadIndex.clear`"""
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+        _indexes.clear()
+    for index in indexes:
+        index.clear()
+
+
+def get_strings(file_name):
+    """Returns the lines of a payload file, see
+    :meth:`PayloadIndex.get_strings`
+    """
+    return get_index().get_strings(file_name)
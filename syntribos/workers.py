@@ -0,0 +1,117 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Runs tests in worker processes
+
+Used by ``syntribos --workers N run``, which runs whole templates in a pool
+of processes, and by ``syntribos worker``, which runs the test types handed
+out by a coordinator (see :mod:`syntribos.distributed`).
+"""
+import logging
+import os
+import signal
+import sys
+import time
+
+from oslo_config import cfg
+
+from syntribos.clients.http import pool
+from syntribos.clients.http import throttle
+import syntribos.result
+import syntribos.runner
+from syntribos.runner import Runner
+import syntribos.tests as tests
+import syntribos.tests.base
+
+CONF = cfg.CONF
+
+
+def init_worker(argv, log_path):
+    """Sets up a worker process
+
+    Processes that were not forked from the runner have to parse the config
+    again. Interrupts are left to the parent process, and the progress
+    output of the worker is discarded, as the parent reports each template
+    as its results come back.
+
+    :param list argv: Command line arguments syntribos was run with
+    :param str log_path: Log directory of the run
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    Runner.worker = True
+    # Outcomes are journaled by the parent process
+    Runner.journal = None
+    try:
+        CONF.sub_command
+    except cfg.Error:
+        Runner.setup_config(use_file=True, argv=argv)
+    Runner.log_path = log_path
+    sys.stdout = open(os.devnull, "w")
+
+
+def run_template(unit):
+    """Runs every selected test type against one template
+
+    :param tuple unit: Tuple of (template path, template content, meta vars)
+    :returns: `dict`, see :func:`run_tests`
+    """
+    file_path, req_str, meta_vars = unit
+    list_of_tests = list(Runner.get_tests(CONF.test_types,
+                                          CONF.excluded_types))
+    return run_tests(list_of_tests, file_path, req_str, meta_vars)
+
+
+def run_unit(unit):
+    """Runs one test type against one template, for a coordinator
+
+    :param dict unit: Unit of work with the template path (``file``),
+        content (``content``), meta variables (``meta_vars``) and the name
+        of the test type to run (``test_name``)
+    :returns: `dict`, see :func:`run_tests`
+    """
+    Runner.load_modules(tests)
+    test_name = unit["test_name"]
+    test_class = syntribos.tests.base.test_table[test_name]
+    # Other test types of the template may have been run here already
+    return run_tests([(test_name, test_class)], unit["file"],
+                     unit["content"], unit["meta_vars"], log_mode="a")
+
+
+def run_tests(list_of_tests, file_path, req_str, meta_vars, log_mode="w"):
+    """Runs the given test types against a template, recording the results
+
+    :param list list_of_tests: List of (test name, test class) tuples
+    :param str file_path: Path of the template file
+    :param str req_str: Content of the template file
+    :param dict meta_vars: Meta variables of the template
+    :param str log_mode: Mode to open the template's log file with
+    :returns: `dict` with the template path, its run time, the records made
+        by a :class:`syntribos.result.ResultRecorder` for each test, and the
+        connection and concurrency stats of the template's requests
+    """
+    start = time.time()
+    recorder = syntribos.result.ResultRecorder()
+    syntribos.runner.result = recorder
+    pool.stats.reset()
+    throttle.get_controller().reset_counts()
+
+    log = Runner.get_logger(file_path, log_mode)
+    CONF.log_opt_values(log, logging.DEBUG)
+    Runner.run_given_tests(list_of_tests, file_path, req_str, meta_vars)
+    return {
+        "file": file_path,
+        "run_time": time.time() - start,
+        "records": recorder.records,
+        "connections": pool.stats.to_dict(),
+        "concurrency": throttle.get_controller().to_dict()
+    }
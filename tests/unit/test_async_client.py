@@ -0,0 +1,160 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import gzip
+import threading
+
+import six
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+import testtools
+
+import syntribos.config
+from syntribos.scheduler import Job
+
+syntribos.config.register_opts()
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/gzip":
+            body = gzip.compress(b"compressed")
+            headers = [("Content-Encoding", "gzip")]
+        elif self.path == "/chunked":
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            self.wfile.write(b"5\r\nhello\r\n6\r\n world\r\n0\r\n\r\n")
+            return
+        else:
+            body = self.path.encode("utf-8")
+            headers = []
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(500)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+@testtools.skipIf(six.PY2, "The asyncio HTTP engine requires Python 3")
+class AsyncClientUnittest(testtools.TestCase):
+
+    def setUp(self):
+        super(AsyncClientUnittest, self).setUp()
+        from syntribos.async_scheduler import AsyncScheduler
+        from syntribos.clients.http.async_client import AsyncSynHTTPClient
+
+        self.server = _Server(("127.0.0.1", 0), _Handler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = "http://127.0.0.1:{0}".format(self.server.server_port)
+        self.client = AsyncSynHTTPClient()
+        self.scheduler = AsyncScheduler(4, client=self.client)
+        self.addCleanup(self.scheduler.shutdown)
+
+    def _request(self, method, path, **kwargs):
+        return self.scheduler._call(self.client.request_async(
+            method, self.url + path, **kwargs))
+
+    def test_get(self):
+        """Response body, status and signals match the requests engine."""
+        resp, signals = self._request("GET", "/path", params={"a": "b"})
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual("/path?a=b", resp.text)
+        self.assertIn("HTTP_STATUS_CODE_2XX_200", signals)
+        self.assertIn("HTTP_CONTENT_TYPE_PLAIN", signals)
+
+    def test_post_body_and_status(self):
+        resp, signals = self._request("POST", "/", data='{"a": 1}')
+        self.assertEqual(500, resp.status_code)
+        self.assertEqual({"a": 1}, resp.json())
+        self.assertIn("HTTP_STATUS_CODE_5XX_500", signals)
+
+    def test_gzip_and_chunked(self):
+        resp, _ = self._request("GET", "/gzip")
+        self.assertEqual(b"compressed", resp.content)
+        resp, _ = self._request("GET", "/chunked")
+        self.assertEqual(b"hello world", resp.content)
+
+    def test_connections_are_reused(self):
+        self._request("GET", "/")
+        self._request("GET", "/")
+        self.assertEqual(1, len(self.client.transport.idle[
+            ("http", "127.0.0.1", self.server.server_port)]))
+
+    def test_connection_failure_signal(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.client.transport.close()
+        resp, signals = self._request("GET", "/")
+        self.assertIsNone(resp)
+        self.assertIn("HTTP_FAIL_CONNECTION_ERROR", signals)
+
+    def test_scheduler_sends_prefetched_requests(self):
+        """Requests returned by prefetch are sent before running the item."""
+        import contextvars
+
+        from syntribos.async_scheduler import AsyncScheduler
+        from syntribos.clients.http.parser import RequestObject
+
+        responses = {}
+        threads = set()
+        current = contextvars.ContextVar("current")
+
+        def prefetch(num):
+            threads.add(threading.current_thread())
+            current.set(num)
+            return RequestObject(method="GET",
+                                 url="{0}/{1}".format(self.url, num))
+
+        def on_response(resp, signals, num):
+            responses[num] = resp.text if current.get() == num else None
+
+        def work(num):
+            return (1, 0) if responses[num] == "/{0}".format(num) else (0, 1)
+
+        scheduler = AsyncScheduler(4, num_threads=2, prefetch=prefetch,
+                                   on_response=on_response)
+        job = Job("job")
+        for num in range(10):
+            scheduler.submit(job, work, num)
+        job.close()
+        scheduler.join()
+        scheduler.shutdown()
+        self.assertTrue(job.done)
+        self.assertEqual(10, job.failures)
+        self.assertEqual(0, job.errors)
+        # Requests are made outside of the event loop
+        self.assertNotIn(scheduler.thread, threads)
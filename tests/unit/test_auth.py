@@ -0,0 +1,55 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import testtools
+
+import syntribos.config
+import syntribos.extensions.identity.client
+from syntribos.clients.http.parser import RequestObject
+from syntribos.signal import SignalHolder
+from syntribos.tests.auth import auth
+
+syntribos.config.register_opts()
+
+
+class FakeClient(object):
+
+    def __init__(self):
+        self.sent = []
+
+    def request(self, **kwargs):
+        self.sent.append(kwargs)
+        return None, SignalHolder()
+
+
+class AuthUnittest(testtools.TestCase):
+
+    def test_prepared_body_sent_as_is(self):
+        """Tests the body of the prepared request isn't encoded again."""
+        self.patch(syntribos.extensions.identity.client, "get_token_v2",
+                   lambda user: "alt-token")
+        request = RequestObject("POST", "http://localhost/v1",
+                                headers={"Content-Type": "application/json"},
+                                data={"a": "b"}, data_type="json",
+                                action_field="")
+        prepared = request.get_prepared_copy()
+        client = FakeClient()
+        case = auth.AuthTestCase.new_case(
+            attrs={"request": prepared, "client": client})
+        case.send_test_request()
+        self.assertEqual(1, len(client.sent))
+        self.assertEqual('{"a": "b"}', client.sent[0]["data"])
+        self.assertEqual("alt-token",
+                         client.sent[0]["headers"]["x-auth-token"])
+        # The request shared by the cases is left alone
+        self.assertNotIn("x-auth-token", prepared.headers)
@@ -0,0 +1,72 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import time
+
+import testtools
+
+from syntribos.clients.http.baseline import BaselineCache
+from syntribos.clients.http.parser import RequestObject
+import syntribos.signal
+
+
+class FakeClient(object):
+
+    def __init__(self, response="response"):
+        self.response = response
+        self.requests = []
+
+    def send_request(self, request):
+        self.requests.append(request)
+        signals = syntribos.signal.SignalHolder(
+            syntribos.signal.SynSignal(slug="SENT", strength=1))
+        return self.response, signals
+
+
+def make_request(**headers):
+    return RequestObject("GET", "http://localhost/v1", headers=headers,
+                         params={"a": "1"})
+
+
+class BaselineCacheTestCase(testtools.TestCase):
+
+    def test_same_request_sent_once(self):
+        cache = BaselineCache()
+        client = FakeClient()
+        first, first_signals = cache.send(client, make_request(x="1"))
+        second, second_signals = cache.send(client, make_request(x="1"))
+        cache.send(client, make_request(x="2"))
+        self.assertEqual(2, len(client.requests))
+        self.assertEqual(first, second)
+        self.assertEqual((2, 1), (cache.sent, cache.reused))
+        # Signals added by one test type are not seen by the others
+        first_signals.register(syntribos.signal.SynSignal(
+            slug="ADDED", strength=1))
+        self.assertNotIn("ADDED", second_signals)
+        self.assertNotIn("ADDED", cache.send(client, make_request(x="1"))[1])
+
+    def test_refresh_interval(self):
+        cache = BaselineCache(refresh_interval=0.05)
+        client = FakeClient()
+        cache.send(client, make_request())
+        cache.send(client, make_request())
+        time.sleep(0.1)
+        cache.send(client, make_request())
+        self.assertEqual(2, len(client.requests))
+
+    def test_failed_request_not_kept(self):
+        cache = BaselineCache()
+        client = FakeClient(response=None)
+        cache.send(client, make_request())
+        cache.send(client, make_request())
+        self.assertEqual(2, len(client.requests))
@@ -17,6 +17,7 @@ from xml.etree import ElementTree
 import six
 import testtools
 
+from syntribos.clients.http.parser import CompiledTemplate
 from syntribos.clients.http.parser import RequestObject
 from syntribos.clients.http import VariableObject
 import syntribos.tests.fuzz.datagen as fuzz_datagen
@@ -318,3 +319,110 @@ class FuzzDatagenUnittest(testtools.TestCase):
         string = "abcde"
         self.assertEqual(
             fuzz_datagen._check_var_obj_limits(var_obj, string), False)
+
+    def test_count_fuzz_cases_dict(self):
+        """Test count_fuzz_cases matches the number of fuzzed requests."""
+        data = {"a": ["val", {"b": "c"}], "d": {"e": "f"}, "g": "h"}
+        request = post_req("/test", data=data)
+        strings = ["test", "test2"]
+        num_requests = len(list(fuzz_datagen.fuzz_request(
+            request, strings, "data", "unittest")))
+        self.assertEqual(
+            num_requests,
+            fuzz_datagen.count_fuzz_cases(request, strings, "data"))
+
+    def test_count_fuzz_cases_var_obj_limits(self):
+        """Test count_fuzz_cases applies VariableObject limits."""
+        var_obj = VariableObject(name="int_var", val="1", fuzz_types=["int"])
+        request = post_req("/test", data={"a": var_obj, "b": "c"})
+        strings = ["1", "test"]
+        self.assertEqual(
+            3, fuzz_datagen.count_fuzz_cases(request, strings, "data"))
+
+    def test_count_fuzz_cases_url(self):
+        """Test count_fuzz_cases with fuzz locations in a URL."""
+        request = get_req("/test/{id:1}/{user}")
+        self.assertEqual(
+            4, fuzz_datagen.count_fuzz_cases(request, ["a", "b"], "url"))
+
+    def test_fuzz_patches_leave_request_unchanged(self):
+        """Test fuzz_patches makes requests without changing the original."""
+        data = {"a": [{"b": "c"}, "d"], "e": {"f": "g"}}
+        request = post_req("/test", data=data, params={"p": "q"})
+        request.data_type = "json"
+        patches = list(fuzz_datagen.fuzz_patches(
+            request, ["test"], "data", "unittest"))
+        self.assertEqual(["a[0]/b", "a[1]", "e/f"],
+                         [p[3] for p in patches])
+        bodies = [json.loads(p[1].materialize().data) for p in patches]
+        self.assertEqual(
+            [{"a": [{"b": "test"}, "d"], "e": {"f": "g"}},
+             {"a": [{"b": "c"}, "test"], "e": {"f": "g"}},
+             {"a": [{"b": "c"}, "d"], "e": {"f": "test"}}], bodies)
+        self.assertEqual({"a": [{"b": "c"}, "d"], "e": {"f": "g"}},
+                         request.data)
+        first = patches[0][1].materialize()
+        self.assertEqual({"p": "q"}, first.params)
+        self.assertIsNot(first.params, patches[1][1].materialize().params)
+
+    def test_fuzz_patches_var_obj(self):
+        """Test fuzz_patches replaces the VariableObjects not fuzzed."""
+        var_obj = VariableObject(name="v", val="1", prefix="<", suffix=">")
+        request = post_req("/test", data={"a": var_obj, "b": "c"})
+        request.data_type = "json"
+        patches = list(fuzz_datagen.fuzz_patches(
+            request, ["2"], "data", "unittest"))
+        self.assertEqual(
+            [{"a": "2", "b": "c"}, {"a": "<1>", "b": "2"}],
+            [json.loads(p[1].materialize().data) for p in patches])
+
+    def test_fuzz_index_shared_by_copies(self):
+        """Test copies of a compiled template share their fuzz indexes."""
+        compiled = CompiledTemplate(post_req("/test/{id}",
+                                             data={"a": "b", "c": "d"}))
+        first = compiled.get_request()
+        second = compiled.get_request()
+        index = fuzz_datagen.get_index(first, "data")
+        self.assertEqual(2, len(index))
+        self.assertIs(index, fuzz_datagen.get_index(second, "data"))
+        self.assertIsNot(index, fuzz_datagen.get_index(first, "url"))
+        # Copies of the handed out requests may be changed, and don't
+        self.assertIsNot(index,
+                         fuzz_datagen.get_index(first.get_copy(), "data"))
+        self.assertEqual(
+            4, fuzz_datagen.count_fuzz_cases(second, ["x", "y"], "data"))
+
+    def test_fuzz_patches_splice_body(self):
+        """Test bodies made by splicing are serialized like the others."""
+        data = {"a": [{"b": 1}, None, [2, 3]], "c": "d",
+                "e": {"f": "g\"h"}}
+        request = post_req("/test", data=data)
+        request.data_type = "json"
+        strings = ["x", u"é\"\\", "ACTION_FIELD:y"]
+        patches = list(fuzz_datagen.fuzz_patches(
+            request, strings, "data", "unittest"))
+        base = patches[0][1].base
+        spliced = [p[1].materialize().data for p in patches]
+        self.assertIsNotNone(base.splice)
+        base.splice = None
+        self.assertEqual([p[1].materialize().data for p in patches], spliced)
+
+    def test_payload_traits(self):
+        """Test the flags of PayloadTraits agree with the limits checks."""
+        strings = ("1", "12345", "abc", u"é", "a b", "http://x/?y=1", "",
+                   " 7 ")
+        var_objs = [
+            VariableObject(name="a"),
+            VariableObject(name="b", fuzz=False),
+            VariableObject(name="c", fuzz_types=["int"], max_length=3),
+            VariableObject(name="d", fuzz_types=["ascii", "url"],
+                           min_length=2),
+            VariableObject(name="e", fuzz_types=["url"]),
+            VariableObject(name="f", fuzz_types=["unknown"])]
+        traits = fuzz_datagen.get_traits(strings)
+        self.assertIs(traits, fuzz_datagen.get_traits(strings))
+        for var_obj in var_objs:
+            self.assertEqual(
+                [int(fuzz_datagen._check_var_obj_limits(var_obj, s))
+                 for s in strings],
+                list(traits.eligible(var_obj)))
@@ -0,0 +1,95 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import socket
+import threading
+
+import testtools
+
+from syntribos import distributed
+
+
+class CoordinatorTestCase(testtools.TestCase):
+    """Tests the coordinator against workers on the loopback interface."""
+
+    def setUp(self):
+        super(CoordinatorTestCase, self).setUp()
+        self.results = {}
+        units = [{"n": n} for n in range(6)]
+        self.coordinator = distributed.Coordinator(
+            units, lease_timeout=2, on_result=self.on_result)
+        self.coordinator.start()
+        self.addCleanup(self.coordinator.stop)
+
+    def on_result(self, unit, result):
+        self.assertNotIn(unit["n"], self.results)
+        self.results[unit["n"]] = result
+
+    def run_workers(self, num_workers):
+        counts = []
+
+        def run():
+            worker = distributed.Worker(self.coordinator.address,
+                                        lambda unit: unit["n"] * 2)
+            counts.append(worker.run())
+
+        threads = [threading.Thread(target=run) for _ in range(num_workers)]
+        for thread in threads:
+            thread.start()
+        self.coordinator.wait(interval=0.1)
+        for thread in threads:
+            thread.join(5)
+        return counts
+
+    def lease_and_die(self):
+        """Leases a unit over a raw connection, then drops it."""
+        sock = socket.create_connection(self.coordinator.address)
+        rfile, wfile = sock.makefile("rb"), sock.makefile("wb")
+        distributed.send_message(wfile, {"type": "get"})
+        message = distributed.read_message(rfile)
+        self.assertEqual("unit", message["type"])
+        return sock, message["id"]
+
+    def test_results_merged(self):
+        counts = self.run_workers(3)
+        self.assertEqual({n: n * 2 for n in range(6)}, self.results)
+        self.assertEqual(6, sum(counts))
+
+    def test_dead_worker_unit_reissued(self):
+        sock, unit_id = self.lease_and_die()
+        sock.close()
+        self.run_workers(1)
+        self.assertEqual(unit_id * 2, self.results[unit_id])
+        self.assertEqual(6, len(self.results))
+
+    def test_expired_lease_reissued(self):
+        """A worker which hangs without sending heartbeats loses its lease."""
+        sock, unit_id = self.lease_and_die()
+        self.addCleanup(sock.close)
+        self.run_workers(1)
+        self.assertEqual(6, len(self.results))
+
+    def test_late_result_ignored(self):
+        sock, unit_id = self.lease_and_die()
+        self.addCleanup(sock.close)
+        self.run_workers(1)
+        wfile = sock.makefile("wb")
+        distributed.send_message(wfile, {"type": "result", "id": unit_id,
+                                         "result": "late"})
+        self.assertEqual(unit_id * 2, self.results[unit_id])
+
+    def test_parse_address(self):
+        self.assertEqual(("10.0.0.1", 7000),
+                         distributed.parse_address("10.0.0.1:7000"))
+        self.assertEqual(("127.0.0.1", 7001),
+                         distributed.parse_address(":7001"))
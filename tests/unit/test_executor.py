@@ -0,0 +1,95 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import unittest
+
+import testtools
+
+from syntribos import executor
+from syntribos.signal import SignalHolder
+from syntribos.tests import base
+
+
+def make_test_classes():
+    """Test classes are made here, so that they are not loaded as tests"""
+
+    class FakeTest(base.BaseTestCase):
+        sent = []
+
+        def send_test_request(self):
+            self.test_signals = SignalHolder()
+            self.sent.append(self.payload)
+
+        def test_case(self):
+            if self.payload == "fail":
+                self.failures = ["issue"]
+            elif self.payload == "raise":
+                raise ValueError(self.payload)
+
+    class FakeUnittestTest(FakeTest):
+        set_up = []
+
+        @classmethod
+        def setUpClass(cls):
+            cls.set_up.append(cls.payload)
+
+    return FakeTest, FakeUnittestTest
+
+
+class ExecutorTestCase(testtools.TestCase):
+
+    def setUp(self):
+        super(ExecutorTestCase, self).setUp()
+        self.test_class, self.unittest_class = make_test_classes()
+
+    def run_case(self, test_class, payload):
+        result = unittest.TestResult()
+        case = test_class.new_case("case:" + payload, {"payload": payload})
+        executor.run_case(case, result)
+        self.assertEqual(1, result.testsRun)
+        return result
+
+    def test_outcomes(self):
+        test_class = self.test_class
+        self.assertTrue(self.run_case(test_class, "pass").wasSuccessful())
+        self.assertEqual(1, len(self.run_case(test_class, "fail").failures))
+        errors = self.run_case(test_class, "raise").errors
+        self.assertEqual(1, len(errors))
+        self.assertIn("ValueError", errors[0][1])
+        self.assertEqual(["pass", "fail", "raise"], test_class.sent)
+
+    def test_case_is_not_a_class(self):
+        case = self.test_class.new_case("a/b", {"payload": "pass"})
+        self.assertIsInstance(case, self.test_class)
+        self.assertEqual("pass", case.payload)
+        self.assertFalse(hasattr(self.test_class, "payload"))
+        self.assertEqual(
+            "run_test_case ({0}.a_b)".format(__name__), str(case))
+
+    def test_unittest_fixtures(self):
+        self.assertFalse(executor.uses_unittest(self.test_class))
+        self.assertTrue(executor.uses_unittest(self.unittest_class))
+        self.assertEqual(1, len(
+            self.run_case(self.unittest_class, "fail").failures))
+        self.assertEqual(["fail"], self.unittest_class.set_up)
+
+    def test_state_per_case(self):
+        first = self.test_class.new_case("first", {"payload": "fail"})
+        second = self.test_class.new_case("second", {"payload": "pass"})
+        for name in ("failures", "errors", "test_signals", "diff_signals"):
+            self.assertIsNot(getattr(first, name), getattr(second, name))
+        executor.run_case(first, unittest.TestResult())
+        result = unittest.TestResult()
+        executor.run_case(second, result)
+        self.assertEqual([], second.failures)
+        self.assertTrue(result.wasSuccessful())
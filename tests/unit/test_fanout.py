@@ -0,0 +1,177 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+
+from oslo_config import cfg
+import requests
+import testtools
+
+from syntribos.clients.http import pool
+from syntribos.clients.http.parser import RequestCreator
+from syntribos.clients.http.parser import RequestObject
+from syntribos.runner import Runner
+import syntribos.signal
+import syntribos.tests
+from syntribos.tests import base
+from syntribos.tests.fuzz import base_fuzz
+import syntribos.tests.fuzz.datagen as fuzz_datagen
+from syntribos.tests.fuzz.fanout import FanOut
+from syntribos.tests.fuzz.fanout import PayloadPlan
+
+CONF = cfg.CONF
+PAYLOADS = ("' OR 1=1", u"\u00e9\"\\", "<a>&amp;</a>", "ACTION_FIELD:x")
+TEMPLATES = (
+    "POST /v1/{id:1}/items?q=FUZZ&limit=10 HTTP/1.1\n"
+    "Content-Type: application/json\n"
+    "X-Trace: abc\n\n"
+    '{"name": "a", "tags": ["b", 2], "meta": {"c": null, "d": "e"}, '
+    '"f": 3.5}',
+    "PUT /v1/items/{id:2}?force=1 HTTP/1.1\n"
+    "Content-Type: application/yaml\n\n"
+    "name: a\ntags: [b, 2]\nmeta:\n  c: d\n",
+)
+
+
+def make_test_class(location, strings, share=True):
+    return type("FakeFuzz", (object,), {
+        "parameter_location": location,
+        "share_payloads": share,
+        "get_shared_payloads": classmethod(lambda cls: strings)})
+
+
+def make_request(data="' OR 1=1"):
+    return RequestObject("POST", "http://localhost/v1", data=data)
+
+
+class PayloadPlanTestCase(testtools.TestCase):
+
+    def test_shared_payloads_counted(self):
+        sql = make_test_class("data", ("' OR 1=1", "--", "--"))
+        string = make_test_class("data", ("' OR 1=1", "%s"))
+        params = make_test_class("params", ("' OR 1=1",))
+        unshared = make_test_class("data", ("' OR 1=1",), share=False)
+        plan = PayloadPlan([sql, string, params, unshared])
+        self.assertEqual(2, plan.consumers(sql, "' OR 1=1"))
+        self.assertEqual(1, plan.consumers(sql, "--"))
+        self.assertEqual(1, plan.consumers(params, "' OR 1=1"))
+
+
+class FanOutTestCase(testtools.TestCase):
+
+    def setUp(self):
+        super(FanOutTestCase, self).setUp()
+        pool.stats.reset()
+        self.addCleanup(pool.stats.reset)
+
+    def test_request_sent_once(self):
+        fanout = FanOut()
+        shared, sender = fanout.claim("t", make_request(), 3)
+        self.assertTrue(sender)
+        results = []
+
+        def wait():
+            other, other_sender = fanout.claim("t", make_request(), 3)
+            self.assertFalse(other_sender)
+            results.append(other.wait())
+
+        threads = [threading.Thread(target=wait) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        response = requests.Response()
+        response.status_code = 500
+        shared.publish((response, syntribos.signal.SignalHolder()))
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(2, len(results))
+        for result, signals in results:
+            self.assertIs(response, result)
+            self.assertIn("HTTP_STATUS_CODE_5XX", signals)
+        self.assertEqual(2, pool.stats.requests_avoided)
+        # Every case asked for it, so the request is no longer kept
+        self.assertEqual({}, fanout.entries)
+
+    def test_different_requests_not_shared(self):
+        fanout = FanOut()
+        self.assertTrue(fanout.claim("t", make_request("a"), 2)[1])
+        self.assertTrue(fanout.claim("t", make_request("b"), 2)[1])
+        self.assertTrue(fanout.claim("u", make_request("a"), 2)[1])
+
+    def test_failed_request_not_shared(self):
+        fanout = FanOut()
+        shared = fanout.claim("t", make_request(), 2)[0]
+        shared.publish(None)
+        self.assertIsNone(fanout.claim("t", make_request(), 2)[0].wait())
+
+    def test_discard(self):
+        fanout = FanOut()
+        fanout.claim("t", make_request(), 2)
+        fanout.claim("u", make_request(), 2)
+        fanout.discard("t")
+        self.assertEqual(["u"], [key[0] for key in fanout.entries])
+
+
+class SharedTestTypesTestCase(testtools.TestCase):
+    """Test the test types sharing payloads send the same shared requests"""
+
+    def setUp(self):
+        super(SharedTestTypesTestCase, self).setUp()
+        Runner.load_modules(syntribos.tests)
+        self.test_classes = [
+            test_class for _, test_class in sorted(base.test_table.items())
+            if issubclass(test_class, base_fuzz.BaseFuzzTestCase) and
+            test_class.share_payloads]
+        for test_class in self.test_classes:
+            self.patch(test_class, "_get_strings",
+                       classmethod(lambda cls, file_name=None: PAYLOADS))
+        CONF.set_override("payload", __file__, group="user_defined")
+        self.addCleanup(CONF.clear_override, "payload",
+                        group="user_defined")
+
+    def claim_all(self, template):
+        """Claims the request of every case of every test type
+
+        :returns: list of the (request key, test type) of each request sent
+        """
+        request = RequestCreator.create_request(
+            template, "http://localhost:8080")
+        plan = PayloadPlan(self.test_classes)
+        fanout = FanOut()
+        sent = []
+        for test_class in self.test_classes:
+            self.patch(test_class, "init_req", request)
+            cases = list(test_class.get_test_cases("t", template, None))
+            self.assertNotEqual([], cases, test_class.test_name)
+            for case in cases:
+                plan.assign(test_class, case)
+                self.assertGreater(case.shared_by, 1)
+                req = case.request
+                sender = fanout.claim("t", req, case.shared_by)[1]
+                if sender:
+                    sent.append(((req.method, req.url, req.headers,
+                                  req.params, req.data), test_class))
+        # Each request was asked for by as many cases as it was counted for
+        self.assertEqual({}, fanout.entries)
+        return sent
+
+    def test_shared_requests_identical(self):
+        groups = set(PayloadPlan.group(test_class)
+                     for test_class in self.test_classes)
+        for template in TEMPLATES:
+            spliced = self.claim_all(template)
+            self.assertEqual(groups, set(
+                PayloadPlan.group(test_class) for _, test_class in spliced))
+            self.patch(fuzz_datagen, "_splice_enabled", lambda: False)
+            self.assertEqual([key for key, _ in spliced],
+                             [key for key, _ in self.claim_all(template)])
+            self.patch(fuzz_datagen, "_splice_enabled", lambda: True)
@@ -11,10 +11,16 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import threading
+
 import testtools
 
 from syntribos.clients.http import parser
 from syntribos.clients.http import VariableObject
+from syntribos.clients.http.parser import _iterators
+from syntribos.clients.http.parser import _string_var_objs
+from syntribos.clients.http.parser import RequestHelperMixin
+from syntribos.clients.http.parser import TemplateParseException
 
 
 endpoint = "http://test.com"
@@ -104,6 +110,19 @@ class HTTPParserUnittest(testtools.TestCase):
         dat, dat_type = parser._parse_data(lines)
         self.assertEqual("var=val&var2=val2", dat)
 
+    def test_data_parse_content_type(self):
+        """Tests the body is parsed as its Content-Type says."""
+        lines = ['{"a": "val", "b": ["val2"]}']
+        dat, dat_type = parser._parse_data(lines, "application/x-yaml")
+        self.assertEqual("yaml", dat_type)
+        self.assertEqual({"a": "val", "b": ["val2"]}, dat)
+        self.assertEqual("a: val\nb:\n- val2\n",
+                         RequestHelperMixin._string_data(dat, dat_type))
+        self.assertRaises(TemplateParseException, parser._parse_data, lines,
+                          "application/xml")
+        dat, dat_type = parser._parse_data(lines, "text/plain")
+        self.assertEqual("json", dat_type)
+
     def test_call_external_get_uuid(self):
         """Tests calling 'get_uuid' in URL string."""
         string = 'GET /v1/CALL_EXTERNAL|'
@@ -128,6 +147,15 @@ class HTTPParserUnittest(testtools.TestCase):
         self.assertRaises(
             AttributeError, parser.call_external_functions, string)
 
+    def test_call_external_values_placed_as_is(self):
+        """Tests values returned are placed as they are, in one pass."""
+        string = ('GET /CALL_EXTERNAL|os.path:join:["a\\\\1", "b"]|/'
+                  'CALL_EXTERNAL|os.path:join:["c"]|')
+        parsed_string = parser.call_external_functions(string)
+        self.assertEqual("GET /a\\1/b/c", parsed_string)
+        self.assertIs(parser._get_callable("os.path", "join"),
+                      parser._get_callable("os.path", "join"))
+
     def test_create_var_obj_str(self):
         var_obj = parser._create_var_obj("str_var")
         self.assertIsInstance(var_obj, VariableObject)
@@ -184,3 +212,101 @@ class HTTPParserUnittest(testtools.TestCase):
         self.assertEqual(
             dic["test"].val,
             "syntribos.extensions.common_utils.client:hmac_it")
+
+    def test_template_parsed_once(self):
+        string = ("GET /v1/CALL_EXTERNAL|syntribos.extensions.random_data."
+                  "client:get_uuid:[]| HTTP/1.1\nX-Test: val\n\n")
+        self.addCleanup(setattr, parser, "meta_vars", parser.meta_vars)
+        compiled = parser.compile_template(string, endpoint)
+        self.assertIs(compiled, parser.compile_template(string, endpoint))
+        first = parser.create_request(string, endpoint)
+        second = parser.create_request(string, endpoint)
+        self.assertIsNot(first.headers, second.headers)
+        self.assertEqual(first.headers, second.headers)
+        # Each copy goes through a generator of its own
+        first_uuid = first.url.rsplit("/", 1)[1]
+        second_uuid = second.url.rsplit("/", 1)[1]
+        self.assertNotEqual(first_uuid, second_uuid)
+        self.assertIsNot(_iterators[first_uuid], _iterators[second_uuid])
+
+    def test_volatile_template_parsed_for_each_request(self):
+        """Tests functions called by a template are called again."""
+        string = "GET /v1/CALL_EXTERNAL|uuid:uuid4:[]| HTTP/1.1\n\n"
+        compiled = parser.hold_template(string, endpoint)
+        self.addCleanup(compiled.release)
+        self.assertTrue(compiled.volatile)
+        first = parser.create_request(string, endpoint)
+        second = parser.create_request(string, endpoint)
+        # The function is only called again for later requests
+        self.assertEqual(compiled.request.url, first.url)
+        self.assertNotEqual(first.url, second.url)
+        self.assertFalse(parser.compile_template(
+            "GET /v1/|str_var| HTTP/1.1\n\n", endpoint,
+            {"str_var": {"val": "test"}}).volatile)
+
+    def test_may_be_volatile(self):
+        """Tests volatile templates are found without parsing them."""
+        meta_vars = {"str_var": {"val": "test"},
+                     "token": {"type": "function", "val": "uuid:uuid4"}}
+        self.assertTrue(parser.may_be_volatile(
+            "GET /v1/CALL_EXTERNAL|uuid:uuid4:[]| HTTP/1.1\n\n"))
+        self.assertTrue(parser.may_be_volatile(
+            "GET /v1 HTTP/1.1\nX-Auth-Token: |token|\n\n", meta_vars))
+        self.assertFalse(parser.may_be_volatile(
+            "GET /v1/|str_var| HTTP/1.1\n\n", meta_vars))
+
+    def test_template_scope_released(self):
+        string = ("GET /v1/CALL_EXTERNAL|syntribos.extensions.random_data."
+                  "client:get_uuid:[]|/|str_var| HTTP/1.1\n\n")
+        meta_vars = {"str_var": {"val": "test"}}
+        compiled = parser.hold_template(string, endpoint, meta_vars)
+        self.assertIs(compiled, parser.hold_template(string, endpoint,
+                                                     meta_vars))
+        parser.create_request(string, endpoint, meta_vars)
+        # Later requests parse the template again, in the same scope
+        second = parser.create_request(string, endpoint, meta_vars)
+        self.assertEqual(4, len(compiled.scope.keys))
+        iterator_uuid, var_uuid = compiled.request.url.split("/")[-2:]
+        self.assertIn(var_uuid, _string_var_objs)
+        self.assertRegex(RequestHelperMixin._replace_iter(second.url),
+                         r"/v1/[a-f0-9\-]+/test$")
+        compiled.release()
+        self.assertIn(iterator_uuid, _iterators)
+        keys = list(compiled.scope.keys)
+        compiled.release()
+        for key in keys:
+            self.assertNotIn(key, _iterators)
+            self.assertNotIn(key, _string_var_objs)
+        self.assertIsNot(compiled, parser.compile_template(string, endpoint,
+                                                           meta_vars))
+
+    def test_templates_compiled_concurrently(self):
+        """Tests templates parsed by several threads get their own vars."""
+        meta_vars = parser.meta_vars
+        string = "GET /v1/|str_var| HTTP/1.1\n\n"
+        results = {}
+
+        def hold(num):
+            results[num] = parser.hold_template(
+                string, endpoint, {"str_var": {"val": str(num)}})
+
+        threads = [threading.Thread(target=hold, args=(num,))
+                   for num in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        for num, compiled in results.items():
+            self.addCleanup(compiled.release)
+            self.assertEqual(
+                "http://test.com/v1/{0}".format(num),
+                RequestHelperMixin._replace_iter(compiled.request.url))
+        self.assertEqual(8, len(results))
+        self.assertIs(meta_vars, parser.meta_vars)
+
+    def test_replace_iter_placeholder_in_hex(self):
+        """Tests placeholders next to other hex digits are replaced."""
+        self.addCleanup(_string_var_objs.pop, "a" * 32, None)
+        _string_var_objs["a" * 32] = VariableObject("v", val="x")
+        self.assertEqual("0fx/x/" + "b" * 32, RequestHelperMixin._replace_iter(
+            "0f" + "a" * 32 + "/" + "a" * 32 + "/" + "b" * 32))
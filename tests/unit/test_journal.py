@@ -0,0 +1,75 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import shutil
+import tempfile
+
+import testtools
+
+from syntribos.journal import Journal
+
+SUCCESS = [{"test": "t", "test_type": "SQL", "outcome": "success",
+            "ran": True}]
+
+
+class JournalTestCase(testtools.TestCase):
+
+    def setUp(self):
+        super(JournalTestCase, self).setUp()
+        self.log_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.log_path)
+
+    def reopen(self, journal):
+        journal.close()
+        journal = Journal(self.log_path)
+        self.addCleanup(journal.close)
+        return journal
+
+    def test_entries_reloaded(self):
+        journal = Journal(self.log_path)
+        self.assertFalse(journal.start_run({"test_types": ["SQL"]}))
+        journal.add_case("a.template", "SQL", 1, SUCCESS)
+        journal.add_case("a.template", "SQL", 0, [])
+        journal.add_test_type("a.template", "SQL")
+        journal.add_template("b.template", {"records": SUCCESS})
+
+        journal = self.reopen(journal)
+        self.assertEqual(SUCCESS, journal.get_case("a.template", "SQL", 1))
+        self.assertIsNone(journal.get_case("a.template", "SQL", 2))
+        self.assertTrue(journal.is_test_type_done("a.template", "SQL"))
+        self.assertEqual([[], SUCCESS], journal.get_test_type_records(
+            "a.template", "SQL"))
+        self.assertEqual({"records": SUCCESS},
+                         journal.get_template("b.template"))
+        self.assertFalse(journal.start_run({"test_types": ["SQL"]}))
+        self.assertTrue(journal.start_run({"test_types": ["XSS"]}))
+
+    def test_partial_line_dropped(self):
+        journal = Journal(self.log_path)
+        journal.add_case("a.template", "SQL", 0, SUCCESS)
+        journal.file.write('{"case": ["a.template", "SQL", 1], "rec')
+        journal = self.reopen(journal)
+        self.assertIsNone(journal.get_case("a.template", "SQL", 1))
+
+        journal.add_case("a.template", "SQL", 1, SUCCESS)
+        journal = self.reopen(journal)
+        self.assertEqual(SUCCESS, journal.get_case("a.template", "SQL", 0))
+        self.assertEqual(SUCCESS, journal.get_case("a.template", "SQL", 1))
+
+    def test_test_type_recorded_once(self):
+        journal = Journal(self.log_path)
+        journal.add_test_type("a.template", "SQL")
+        journal.add_test_type("a.template", "SQL")
+        journal.close()
+        with open(journal.path) as journal_file:
+            self.assertEqual(1, len(journal_file.readlines()))
@@ -0,0 +1,119 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import shutil
+import tempfile
+
+import testtools
+
+from syntribos.utils.payloads import MappedPayloads
+from syntribos.utils.payloads import PayloadIndex
+
+
+class PayloadIndexTestCase(testtools.TestCase):
+
+    def setUp(self):
+        super(PayloadIndexTestCase, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.payload_dir = os.path.join(self.root, "payloads-master", "data")
+        os.makedirs(self.payload_dir)
+        self.write("sql.txt", "' OR 1=1\n\" OR 1=1\n")
+        with open(os.path.join(self.root, "README"), "w") as fp:
+            fp.write("not a payload")
+
+    def write(self, file_name, content):
+        path = os.path.join(self.payload_dir, file_name)
+        with open(path, "w") as fp:
+            fp.write(content)
+        return path
+
+    def test_directory_found(self):
+        index = PayloadIndex(self.root)
+        self.assertEqual(self.payload_dir, index.directory)
+        self.assertEqual(("' OR 1=1", "\" OR 1=1"),
+                         index.get_strings("sql.txt"))
+
+    def test_file_read_once(self):
+        index = PayloadIndex(self.root)
+        strings = index.get_strings("sql.txt")
+        self.assertIs(strings, index.get_strings("sql.txt"))
+        path = os.path.join(self.payload_dir, "sql.txt")
+        self.assertIs(strings, index.get_strings(path))
+
+    def test_changed_file_read_again(self):
+        index = PayloadIndex(self.root)
+        strings = index.get_strings("sql.txt")
+        path = self.write("sql.txt", "a\nb\nc\n")
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+        self.assertIsNot(strings, index.get_strings("sql.txt"))
+        self.assertEqual(("a", "b", "c"), index.get_strings("sql.txt"))
+
+    def test_missing_file(self):
+        index = PayloadIndex(self.root)
+        self.assertRaises(EnvironmentError, index.get_strings, "xss.txt")
+
+    def test_large_file_mapped(self):
+        index = PayloadIndex(self.root, mmap_size=1)
+        strings = index.get_strings("sql.txt")
+        self.assertIsInstance(strings, MappedPayloads)
+        self.assertEqual(["' OR 1=1", "\" OR 1=1"], list(strings))
+
+    def test_mapped_files_closed(self):
+        index = PayloadIndex(self.root, mmap_size=1)
+        strings = index.get_strings("sql.txt")
+        path = self.write("sql.txt", "a\nb\nc\n")
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+        changed = index.get_strings("sql.txt")
+        self.assertTrue(strings._map.closed)
+        self.assertEqual(["a", "b", "c"], list(changed))
+        index.clear()
+        self.assertTrue(changed._map.closed)
+        self.assertIsNot(changed, index.get_strings("sql.txt"))
+        self.addCleanup(index.clear)
+
+
+class MappedPayloadsTestCase(testtools.TestCase):
+
+    def make_payloads(self, content, stride=3):
+        fd, path = tempfile.mkstemp()
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(content)
+        payloads = MappedPayloads(path, stride=stride)
+        self.addCleanup(payloads.close)
+        return payloads
+
+    def test_lines(self):
+        lines = ["line{0}".format(i) for i in range(10)] + ["", "last"]
+        content = "\r\n".join(lines).encode("utf-8")
+        payloads = self.make_payloads(content)
+        self.assertEqual(len(lines), len(payloads))
+        self.assertEqual(lines, list(payloads))
+        self.assertEqual(lines[4], payloads[4])
+        self.assertEqual(lines[-1], payloads[-1])
+        self.assertEqual(lines[2:9:3], payloads[2:9:3])
+        self.assertEqual(lines[7:], list(payloads.iter_range(7)))
+        self.assertRaises(IndexError, payloads.__getitem__, len(lines))
+
+    def test_trailing_newline(self):
+        payloads = self.make_payloads(b"a\nb\n")
+        self.assertEqual(["a", "b"], list(payloads))
+
+    def test_empty_file(self):
+        payloads = self.make_payloads(b"")
+        self.assertEqual(0, len(payloads))
+        self.assertEqual([], list(payloads))
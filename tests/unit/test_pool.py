@@ -0,0 +1,87 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+import testtools
+
+from syntribos.clients.http import pool
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = (self.headers.get("Cookie") or "").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Set-Cookie", "session=abc")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class SessionPoolUnittest(testtools.TestCase):
+
+    def setUp(self):
+        super(SessionPoolUnittest, self).setUp()
+        self.server = _Server(("127.0.0.1", 0), _Handler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = "http://127.0.0.1:{0}/".format(self.server.server_port)
+        self.pool = pool.SessionPool(2)
+        self.addCleanup(self.pool.close)
+        pool.stats.reset()
+
+    def test_connections_are_reused(self):
+        """Requests from every thread are sent over kept-alive connections."""
+        def send():
+            for _ in range(5):
+                self.pool.get_session().get(self.url)
+
+        threads = [threading.Thread(target=send) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = pool.stats.to_dict()
+        self.assertEqual(10, stats["requests"])
+        self.assertLessEqual(stats["connections_opened"], 2)
+        self.assertEqual(10 - stats["connections_opened"],
+                         stats["connections_reused"])
+
+    def test_one_session_per_thread(self):
+        sessions = []
+        thread = threading.Thread(
+            target=lambda: sessions.append(self.pool.get_session()))
+        thread.start()
+        thread.join()
+        self.assertIs(self.pool.get_session(), self.pool.get_session())
+        self.assertIsNot(self.pool.get_session(), sessions[0])
+
+    def test_cookies_are_not_kept(self):
+        """Cookies set by a response are not sent with later requests."""
+        session = self.pool.get_session()
+        session.get(self.url)
+        self.assertEqual(b"", session.get(self.url).content)
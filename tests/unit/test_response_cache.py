@@ -0,0 +1,119 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+
+import requests
+import testtools
+
+from syntribos.clients.http import pool
+from syntribos.clients.http.response_cache import request_key
+from syntribos.clients.http.response_cache import ResponseCache
+import syntribos.signal
+
+
+def make_response(status_code=200):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers["Content-Type"] = "application/json"
+    return response
+
+
+class FakeSender(object):
+
+    def __init__(self, response=None, wait=None):
+        self.response = response
+        self.wait = wait
+        self.sent = 0
+
+    def __call__(self):
+        self.sent += 1
+        if self.wait is not None:
+            self.wait.wait(5)
+        signals = syntribos.signal.SignalHolder()
+        if self.response is None:
+            signals.register(syntribos.signal.SynSignal(
+                slug="EXCEPTION_RAISED", strength=1))
+        return self.response, signals
+
+
+class ResponseCacheTestCase(testtools.TestCase):
+
+    def setUp(self):
+        super(ResponseCacheTestCase, self).setUp()
+        pool.stats.reset()
+        self.addCleanup(pool.stats.reset)
+
+    def test_request_key(self):
+        self.assertEqual(
+            request_key("get", "http://a/", {"b": "2", "a": "1"}, {}, None),
+            request_key("GET", "http://a/", {"a": "1", "b": "2"}, None, ""))
+        self.assertNotEqual(
+            request_key("POST", "http://a/", data="x"),
+            request_key("POST", "http://a/", data="y"))
+
+    def test_identical_request_sent_once(self):
+        cache = ResponseCache()
+        send = FakeSender(make_response())
+        key = request_key("GET", "http://a/")
+        first, first_signals = cache.send(key, send)
+        second, second_signals = cache.send(key, send)
+        self.assertEqual(1, send.sent)
+        self.assertIs(first, second)
+        self.assertEqual(1, cache.avoided)
+        self.assertEqual(1, pool.stats.to_dict()["requests_avoided"])
+        # Each request gets its own signals, computed from the response
+        self.assertIsNot(first_signals, second_signals)
+        self.assertIn("HTTP_STATUS_CODE_2XX", second_signals)
+        self.assertNotIn("EXCEPTION_RAISED", second_signals)
+
+    def test_concurrent_requests_coalesced(self):
+        cache = ResponseCache()
+        release = threading.Event()
+        send = FakeSender(make_response(), wait=release)
+        key = request_key("GET", "http://a/")
+        results = []
+
+        def request():
+            results.append(cache.send(key, send))
+
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(1, send.sent)
+        self.assertEqual(5, len(results))
+        self.assertEqual(4, cache.avoided)
+
+    def test_failed_request_not_kept(self):
+        cache = ResponseCache()
+        send = FakeSender()
+        key = request_key("GET", "http://a/")
+        cache.send(key, send)
+        response, signals = cache.send(key, send)
+        self.assertEqual(2, send.sent)
+        self.assertIsNone(response)
+        self.assertIn("EXCEPTION_RAISED", signals)
+
+    def test_least_recently_used_dropped(self):
+        cache = ResponseCache(max_entries=2)
+        send = FakeSender(make_response())
+        keys = [request_key("GET", "http://a/{0}".format(i))
+                for i in range(3)]
+        cache.send(keys[0], send)
+        cache.send(keys[1], send)
+        cache.send(keys[0], send)
+        cache.send(keys[2], send)
+        self.assertEqual([keys[0], keys[2]], list(cache.entries))
@@ -11,11 +11,21 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import json
+import pickle
+import sys
+
 import testtools
 
 import syntribos
+import syntribos.config
 from syntribos.issue import Issue
 from syntribos.result import IssueTestResult
+from syntribos.result import ResultRecorder
+from syntribos.signal import SynSignal
+from syntribos.tests.fuzz.base_fuzz import ImpactedParameter
+
+syntribos.config.register_opts()
 
 
 class FakeTest(object):
@@ -43,6 +53,9 @@ class FakeTest(object):
     def __str__(self):
         return self.name
 
+    def shortDescription(self):
+        return None
+
 
 class TestIssueTestResult(testtools.TestCase):
     """Class to test methods in IssueTestResult class."""
@@ -58,3 +71,44 @@ class TestIssueTestResult(testtools.TestCase):
         test = FakeTest("success")
         self.issue_result.addSuccess(test)
         self.assertEqual(self.issue_result.stats["successes"], 1)
+
+
+class TestResultRecords(testtools.TestCase):
+    """Tests results recorded in worker processes."""
+
+    def setUp(self):
+        super(TestResultRecords, self).setUp()
+        self.issue_result = IssueTestResult(None, False, 0)
+        self.issue_result.failures = []
+        self.issue_result.errors = []
+        self.issue_result.stats = {
+            "errors": 0, "unique_failures": 0, "successes": 0}
+        self.issue_result.output = {
+            "failures": {}, "errors": [],
+            "stats": {"severity": dict.fromkeys(syntribos.RANKING, 0)}}
+
+    def test_issue_record_round_trip(self):
+        issue = FakeTest("record").failures[0]
+        issue.impacted_parameter = ImpactedParameter(
+            method="GET", location="params", name="q", value="' OR 1=1")
+        issue.init_signals = [SynSignal(slug="HTTP_STATUS_CODE_2XX_200")]
+        record = issue.to_record()
+        self.assertEqual(record, json.loads(json.dumps(record)))
+        self.assertEqual(record, Issue.from_record(record).to_record())
+
+    def test_add_record(self):
+        """Recorded failures and errors are added like local ones."""
+        recorder = ResultRecorder()
+        recorder.addFailure(FakeTest("failure"), ())
+        try:
+            raise ValueError("oops")
+        except ValueError:
+            recorder.addError(FakeTest("error"), sys.exc_info())
+        records = pickle.loads(pickle.dumps(recorder.records))
+
+        self.assertEqual((2, 0), self.issue_result.add_record(records[0]))
+        self.assertEqual((0, 1), self.issue_result.add_record(records[1]))
+        self.assertEqual((0, 0), self.issue_result.add_record(records[0]))
+        self.assertEqual(2, self.issue_result.stats["unique_failures"])
+        self.assertEqual("ValueError: oops",
+                         self.issue_result.errors[0]["error"])
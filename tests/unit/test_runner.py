@@ -13,6 +13,7 @@
 # limitations under the License.
 import testtools
 
+from syntribos.clients.http.parser import RequestCreator
 import syntribos.config
 from syntribos.runner import Runner
 import syntribos.tests
@@ -132,3 +133,26 @@ class RunnerUnittest(testtools.TestCase):
     def test_dry_run_empty_tests(self):
         """Call Runner.dry_run with empty list for sanity check."""
         self.r.dry_run([], "", "", {})
+
+    def test_compile_templates(self):
+        """Check that templates calling functions are not parsed."""
+        calls = []
+        self.patch(RequestCreator, "_get_callable", staticmethod(
+            lambda *args: calls.append(args)))
+        self.patch(Runner, "meta_dir_dict", {})
+        self.patch(Runner, "journal", None)
+        syntribos.config.CONF.set_override(
+            "endpoint", "http://test.com", group="syntribos")
+        self.addCleanup(syntribos.config.CONF.clear_override, "endpoint",
+                        group="syntribos")
+        compiled, errors = self.r.compile_templates([
+            ("a.template", "GET /v1/CALL_EXTERNAL|uuid:uuid4:[]| HTTP/1.1"),
+            ("b.template", "GET /v1/b HTTP/1.1"),
+            ("c.template", "GET /v1/|missing| HTTP/1.1"),
+            ("d.txt", "GET /v1/d HTTP/1.1")])
+        for template in compiled.values():
+            self.addCleanup(template.release)
+        self.assertEqual(["b.template"], list(compiled))
+        self.assertEqual(1, compiled["b.template"].holders)
+        self.assertEqual(["c.template"], list(errors))
+        self.assertEqual([], calls)
@@ -0,0 +1,100 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+
+import testtools
+
+from syntribos.scheduler import Job
+from syntribos.scheduler import Scheduler
+
+
+class SchedulerUnittest(testtools.TestCase):
+
+    def test_job_done_after_close(self):
+        """Job is done only once closed and all items finished."""
+        done = []
+        job = Job("test", on_done=done.append)
+        job.add(2)
+        job.finish()
+        job.finish(failures=1)
+        self.assertEqual([], done)
+        job.close()
+        self.assertEqual([job], done)
+        self.assertEqual(1, job.failures)
+        self.assertEqual(2, job.tests)
+
+    def test_child_job_reports_to_parent(self):
+        """Finished child jobs are accounted for in their parent."""
+        done = []
+        parent = Job("template", on_done=done.append)
+        child = Job("test_type", parent=parent)
+        child.add()
+        child.finish(failures=2, errors=1)
+        child.close()
+        parent.close()
+        self.assertEqual([parent], done)
+        self.assertEqual(2, parent.failures)
+        self.assertEqual(1, parent.errors)
+        self.assertEqual(1, parent.tests)
+
+    def test_scheduler_runs_items_from_all_jobs(self):
+        """All items submitted to different jobs are run."""
+        scheduler = Scheduler(4)
+        ran = []
+        run_lock = threading.Lock()
+
+        def work(job_name, num):
+            with run_lock:
+                ran.append((job_name, num))
+            return 0, 0
+
+        jobs = [Job("job{0}".format(i)) for i in range(3)]
+        for job in jobs:
+            for num in range(10):
+                scheduler.submit(job, work, job.name, num)
+            job.close()
+        scheduler.join()
+        scheduler.shutdown()
+        self.assertEqual(30, len(ran))
+        for job in jobs:
+            self.assertTrue(job.done)
+            self.assertEqual(10, job.completed)
+
+    def test_scheduler_counts_exceptions_as_errors(self):
+        """An exception raised by an item is counted as an error."""
+        scheduler = Scheduler(1)
+        job = Job("job")
+
+        def work():
+            raise ValueError()
+
+        scheduler.submit(job, work)
+        job.close()
+        scheduler.join()
+        scheduler.shutdown()
+        self.assertEqual(1, job.errors)
+
+    def test_item_counted_before_run(self):
+        """Items are counted in their job before a worker can run them."""
+        scheduler = Scheduler(1)
+        job = Job("test")
+        seen = []
+
+        def work():
+            seen.append(job.submitted)
+
+        scheduler.submit(job, work)
+        scheduler.join()
+        scheduler.shutdown()
+        self.assertEqual([1], seen)
@@ -0,0 +1,85 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import shutil
+import tempfile
+
+import testtools
+
+from syntribos.clients.http import parser
+from syntribos.clients.http.parser import _string_var_objs
+from syntribos.clients.http.parser import RequestObject
+from syntribos.clients.http import template_cache
+from syntribos.clients.http.template_cache import TemplateCache
+from syntribos.clients.http import VariableObject
+import syntribos.tests.fuzz.datagen as datagen
+
+endpoint = "http://test.com"
+meta_vars = {"user": {"val": "alice"}}
+
+
+class TemplateCacheTestCase(testtools.TestCase):
+
+    def setUp(self):
+        super(TemplateCacheTestCase, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = TemplateCache(os.path.join(self.directory, "cache"))
+        self.addCleanup(setattr, template_cache, "_cache", None)
+        template_cache._cache = self.cache
+
+    def test_save_and_load(self):
+        key = ("GET / HTTP/1.1", endpoint, "null")
+        var_obj = VariableObject("v", var_type="function", val="a:b")
+        var_obj.function_return_value = "value"
+        request = RequestObject("GET", endpoint)
+        self.cache.save(key, request, {"a" * 32: var_obj})
+        entry = self.cache.load(key)
+        self.assertEqual(endpoint, entry["request"].url)
+        # Functions are called again when the template is loaded
+        self.assertIsNone(entry["var_objs"]["a" * 32].function_return_value)
+        self.assertEqual("value", var_obj.function_return_value)
+        self.assertIsNone(self.cache.load(key[:2] + ("{}",)))
+
+    def test_unreadable_entry(self):
+        key = ("GET / HTTP/1.1", endpoint, "null")
+        os.makedirs(self.cache.directory)
+        with open(self.cache.get_path(key), "wb") as fp:
+            fp.write(b"not a pickle")
+        self.assertIsNone(self.cache.load(key))
+
+    def test_template_loaded(self):
+        string = ('POST /v1/|user| HTTP/1.1\nContent-Type: application/json'
+                  '\n\n{"a": "b"}')
+        compiled = parser.hold_template(string, endpoint, meta_vars)
+        request = parser.create_request(string, endpoint, meta_vars)
+        datagen.get_index(request, "data")
+        compiled.release()
+        self.assertEqual(0, self.cache.loaded)
+
+        loaded = parser.hold_template(string, endpoint, meta_vars)
+        self.addCleanup(loaded.release)
+        self.assertIsNot(compiled, loaded)
+        self.assertEqual(1, self.cache.loaded)
+        self.assertIn("data", loaded.fuzz_index)
+        request = parser.create_request(string, endpoint, meta_vars)
+        placeholder = request.url.rsplit("/", 1)[1]
+        self.assertEqual("alice", _string_var_objs[placeholder].val)
+        self.assertEqual("http://test.com/v1/alice",
+                         request.get_prepared_copy().url)
+
+    def test_template_calling_functions_not_kept(self):
+        string = "GET /v1/CALL_EXTERNAL|uuid:uuid4:[]| HTTP/1.1\n\n"
+        parser.hold_template(string, endpoint).release()
+        self.assertEqual(0, self.cache.saved)
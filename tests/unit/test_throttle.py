@@ -0,0 +1,125 @@
+# Copyright 2016 Rackspace
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+import time
+
+import testtools
+
+from syntribos.clients.http import throttle
+
+
+class TokenBucketTestCase(testtools.TestCase):
+
+    def test_burst_then_spaced(self):
+        bucket = throttle.TokenBucket(10, burst=2)
+        self.assertEqual(0, bucket.reserve())
+        self.assertEqual(0, bucket.reserve())
+        self.assertAlmostEqual(0.1, bucket.reserve(), delta=0.02)
+        self.assertAlmostEqual(0.2, bucket.reserve(), delta=0.02)
+
+
+class HostLimiterTestCase(testtools.TestCase):
+
+    def run_window(self, limiter, latency=0.01, failed=False):
+        """Fills the limiter, then releases one window of requests."""
+        for _ in range(limiter.limit):
+            limiter.acquire()
+        for _ in range(max(limiter.limit, limiter.window_min)):
+            if not limiter.active:
+                limiter.acquire()
+            limiter.release(latency, failed)
+
+    def test_fixed_limit_blocks(self):
+        limiter = throttle.HostLimiter("example.com", 2)
+        limiter.acquire()
+        limiter.acquire()
+        acquired = threading.Event()
+
+        def acquire():
+            limiter.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        limiter.release(0.01)
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+        self.assertEqual(2, limiter.to_dict()["peak"])
+        self.assertEqual(1, limiter.to_dict()["throttled"])
+
+    def test_try_acquire_calls_waiter(self):
+        limiter = throttle.HostLimiter("example.com", 1)
+        woken = []
+        self.assertTrue(limiter.try_acquire(lambda: woken.append(1)))
+        self.assertFalse(limiter.try_acquire(lambda: woken.append(2)))
+        limiter.release(0.01)
+        self.assertEqual([2], woken)
+
+    def test_adaptive_raises_while_healthy(self):
+        limiter = throttle.HostLimiter("example.com", 16, adaptive=True)
+        self.assertEqual(1, limiter.limit)
+        self.run_window(limiter)
+        self.assertEqual(2, limiter.limit)
+        self.run_window(limiter)
+        self.assertEqual(4, limiter.limit)
+
+    def test_adaptive_lowers_on_errors(self):
+        limiter = throttle.HostLimiter("example.com", 16, adaptive=True)
+        for _ in range(4):
+            self.run_window(limiter)
+        self.assertEqual(16, limiter.limit)
+        limiter.reset_counts()
+        self.run_window(limiter, failed=True)
+        self.assertEqual(11, limiter.limit)
+        # Additive increase once the host has pushed back
+        self.run_window(limiter)
+        self.assertEqual(12, limiter.limit)
+        self.assertEqual(11, limiter.to_dict()["lowest"])
+
+    def test_adaptive_lowers_on_latency(self):
+        limiter = throttle.HostLimiter("example.com", 16, adaptive=True,
+                                       min_concurrency=8)
+        self.run_window(limiter, latency=0.01)
+        self.assertEqual(16, limiter.limit)
+        self.run_window(limiter, latency=0.5)
+        self.assertEqual(11, limiter.limit)
+
+    def test_rate_limit(self):
+        limiter = throttle.HostLimiter("example.com", 4, rate=20, burst=1)
+        start = time.time()
+        for _ in range(3):
+            limiter.acquire()
+        self.assertGreater(time.time() - start, 0.08)
+
+
+class RateControllerTestCase(testtools.TestCase):
+
+    def test_limiter_per_host(self):
+        controller = throttle.RateController(4)
+        limiter = controller.get_limiter("http://user@example.com:81/a")
+        self.assertIs(limiter, controller.get_limiter("http://example.com:81"))
+        self.assertIsNot(limiter, controller.get_limiter("http://example.com"))
+        self.assertEqual("example.com:81", limiter.host)
+
+    def test_merge(self):
+        controller = throttle.RateController(4)
+        host_stats = {"concurrency": 4, "lowest": 2, "peak": 4,
+                      "throttled": 3, "adjustments": 1}
+        controller.merge({"example.com": host_stats})
+        controller.merge({"example.com": dict(host_stats, concurrency=3,
+                                              lowest=3, peak=8)})
+        self.assertEqual({"concurrency": 3, "lowest": 2, "peak": 8,
+                          "throttled": 6, "adjustments": 2},
+                         controller.to_dict()["example.com"])